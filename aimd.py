@@ -0,0 +1,130 @@
+"""Control AIMD del número de RPC de ping en vuelo.
+
+``MAX_WORKERS = 10`` o ``len(HOSTS_LIST)`` eran valores fijos: pocos hilos
+alargan el ciclo y demasiados saturan mgd y la CPU del RE. ``AimdController``
+ajusta el límite durante la ejecución como el control de congestión de TCP:
+
+- tras cada ronda (``limit`` respuestas) suma ``increase`` si no hubo señales
+  de congestión (aumento aditivo);
+- multiplica por ``decrease`` si la tasa de timeouts supera
+  ``max_timeout_rate``, si la CPU del RE supera ``max_cpu`` o si la latencia
+  media de la ronda supera ``latency_tolerance`` veces la mejor latencia
+  observada (disminución multiplicativa).
+
+Como en TCP, tras un recorte se ignoran las respuestas de RPC lanzadas antes
+del recorte, para no reducir varias veces por la misma congestión.
+
+Cada decisión se guarda en ``decisions`` y se pasa a ``log`` para poder ver
+en qué valor converge cada equipo.
+"""
+
+import threading
+import time
+
+DEFAULT_INITIAL = 4
+DEFAULT_MINIMUM = 1
+DEFAULT_MAXIMUM = 50
+DEFAULT_INCREASE = 1
+DEFAULT_DECREASE = 0.5
+DEFAULT_MAX_TIMEOUT_RATE = 0.1     # Fracción de timeouts por ronda
+DEFAULT_MAX_CPU = 70.0             # % de CPU del RE
+DEFAULT_LATENCY_TOLERANCE = 1.5    # Latencia de ronda / mejor latencia observada
+MIN_ROUND = 4                      # Respuestas mínimas para decidir
+
+
+class AimdController:
+    """Límite de concurrencia con aumento aditivo y disminución multiplicativa."""
+
+    def __init__(self, initial=DEFAULT_INITIAL, minimum=DEFAULT_MINIMUM, maximum=DEFAULT_MAXIMUM,
+                 increase=DEFAULT_INCREASE, decrease=DEFAULT_DECREASE,
+                 max_timeout_rate=DEFAULT_MAX_TIMEOUT_RATE, max_cpu=DEFAULT_MAX_CPU,
+                 latency_tolerance=DEFAULT_LATENCY_TOLERANCE, cpu_fn=None, log=None):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.max_timeout_rate = max_timeout_rate
+        self.max_cpu = max_cpu
+        self.latency_tolerance = latency_tolerance
+        self.cpu_fn = cpu_fn
+        self.log = log
+        self.limit = max(minimum, min(initial, maximum))
+        self.decisions = []
+        self._lock = threading.Lock()
+        self._round = []
+        self._best_latency = None
+        self._peak = self.limit
+        self._started = time.monotonic()
+        self._last_decrease = None
+
+    def record(self, latency, timed_out=False, started=None):
+        """Registra una respuesta; al completar una ronda recalcula ``limit``.
+
+        ``started`` es el ``time.monotonic()`` de inicio de la RPC.
+        """
+        with self._lock:
+            if started is not None and self._last_decrease is not None and started < self._last_decrease:
+                return self.limit
+            self._round.append((latency, timed_out))
+            if len(self._round) < max(self.limit, MIN_ROUND):
+                return self.limit
+            observations, self._round = self._round, []
+            return self._decide(observations)
+
+    def _decide(self, observations):
+        answered = [latency for latency, timed_out in observations if not timed_out]
+        timeout_rate = 1 - len(answered) / len(observations)
+        latency = sum(answered) / len(answered) if answered else None
+        cpu = None
+        if self.cpu_fn is not None:
+            try:
+                cpu = self.cpu_fn()
+            except Exception:
+                cpu = None
+
+        if latency is not None and (self._best_latency is None or latency < self._best_latency):
+            self._best_latency = latency
+
+        if timeout_rate > self.max_timeout_rate:
+            reason = f"timeouts {timeout_rate:.0%}"
+        elif cpu is not None and cpu > self.max_cpu:
+            reason = f"CPU {cpu}%"
+        elif latency is not None and latency > self._best_latency * self.latency_tolerance:
+            reason = f"latencia {latency:.3f}s > {self.latency_tolerance}x {self._best_latency:.3f}s"
+        else:
+            reason = None
+
+        old = self.limit
+        if reason is None:
+            self.limit = min(self.maximum, old + self.increase)
+            reason = "sin congestión"
+        else:
+            self.limit = max(self.minimum, int(old * self.decrease))
+            self._last_decrease = time.monotonic()
+        self._peak = max(self._peak, self.limit)
+
+        decision = {
+            "t": round(time.monotonic() - self._started, 3),
+            "old": old,
+            "new": self.limit,
+            "reason": reason,
+            "latency": None if latency is None else round(latency, 4),
+            "timeout_rate": round(timeout_rate, 3),
+            "cpu": cpu,
+        }
+        self.decisions.append(decision)
+        if self.log is not None and old != self.limit:
+            self.log(f"[AIMD] En vuelo {old} -> {self.limit} ({reason}) | latencia={decision['latency']}s "
+                     f"timeouts={decision['timeout_rate']} cpu={cpu}")
+        return self.limit
+
+    def stats(self):
+        """Límite actual y máximo, decisiones tomadas y recortes por congestión."""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "peak": self._peak,
+                "decisions": len(self.decisions),
+                "decreases": sum(1 for d in self.decisions if d["new"] < d["old"]),
+                "best_latency": None if self._best_latency is None else round(self._best_latency, 4),
+            }
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+"""Benchmark de las estrategias de ping contra el simulador de ``sim/``.
+
+Cada estrategia reproduce el patrón de uno de los scripts (secuencial, hilos
+con un Device compartido, un Device por host, bloques, pool, motor asíncrono)
+con N hosts x M paquetes. Cada estrategia corre en un proceso hijo aislado
+que informa tiempo total, RPC/s, RSS máximo, hilos máximos y segundos de CPU.
+
+Ejemplo::
+
+    python bench.py --hosts 90 --count 5 --output bench_results.json
+
+Con ``--sinks`` se miden en su lugar las salidas de resultados (CSV
+formateado, texto libre por syslog y JSON lines con hilo escritor) con
+``--records`` resultados sintéticos: tiempo en el hilo productor (lo que paga
+el worker de ping), tiempo total hasta cerrar la salida, registros/s y bytes::
+
+    python bench.py --sinks csv,syslog,jsonl --records 100000
+
+Con ``--scripts`` se ejecutan los propios scripts (no su patrón) contra el
+simulador, cada uno en su proceso hijo, con ``/var/db/scripts/op`` redirigido
+a un directorio temporal. Los scripts usan su propia lista de hosts, así que
+``--hosts`` no aplica; se informa el número de RPC que hicieron::
+
+    python bench.py --scripts ping_v1.py,normal-thread.py,ping-rtt-workers.py --count 5
+
+Los hilos se cuentan al crearse (``Thread.start``), no muestreando: un hilo
+que vive unos milisegundos también cuenta.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.join(BASE_DIR, "sim")
+SCRIPTS_DIR = "/var/db/scripts/op"
+
+
+# ------------------ Conteo de hilos ------------------
+class ThreadCounter:
+    """Cuenta los hilos al arrancar (``Thread.start``) y el máximo vivo en ese momento."""
+
+    def __init__(self):
+        self.created = 0
+        self.peak = threading.active_count()
+        self._lock = threading.Lock()
+        self._start = threading.Thread.start
+
+    def install(self):
+        counter = self
+
+        def start(thread):
+            counter._start(thread)
+            # start() vuelve cuando el hilo ya está registrado como activo
+            with counter._lock:
+                counter.created += 1
+                counter.peak = max(counter.peak, threading.active_count())
+
+        threading.Thread.start = start
+        return self
+
+    def uninstall(self):
+        threading.Thread.start = self._start
+
+
+# ------------------ Estrategias ------------------
+def _ping(dev, host, count, timeout=None):
+    options = {} if timeout is None else {"dev_timeout": timeout}
+    result = dev.rpc.ping(host=host, count=str(count), **options)
+    return host, result.findtext("probe-results-summary/rtt-average", "N/A").strip()
+
+
+def sequential(hosts, count, opts):
+    """normal.py / ping_v1.py: un Device y un bucle."""
+    from jnpr.junos import Device
+    with Device(timeout=opts.rpc_timeout) as dev:
+        return [_ping(dev, host, count) for host in hosts]
+
+
+def threaded_shared(hosts, count, opts):
+    """normal.py con hilos: un Device compartido por ``workers`` hilos."""
+    from jnpr.junos import Device
+    with Device(timeout=opts.rpc_timeout) as dev, \
+            ThreadPoolExecutor(max_workers=opts.workers) as executor:
+        futures = [executor.submit(_ping, dev, host, count) for host in hosts]
+        return [f.result() for f in as_completed(futures)]
+
+
+def per_host_device(hosts, count, opts):
+    """normal-thread-devices.py original: un Device por host."""
+    from jnpr.junos import Device
+
+    def run(host):
+        with Device(timeout=opts.rpc_timeout) as dev:
+            return _ping(dev, host, count)
+
+    with ThreadPoolExecutor(max_workers=opts.workers) as executor:
+        return [f.result() for f in as_completed([executor.submit(run, h) for h in hosts])]
+
+
+def chunked(hosts, count, opts):
+    """ping-rttt-chunk.py: bloques secuenciales de ``chunk`` paquetes."""
+    from jnpr.junos import Device
+    results = []
+    with Device(timeout=opts.rpc_timeout) as dev:
+        for host in hosts:
+            for start in range(0, count, opts.chunk):
+                results.append(_ping(dev, host, min(opts.chunk, count - start)))
+    return results
+
+
+def pooled_threads(hosts, count, opts):
+    """normal-thread-devices.py actual: hilos sobre un ``SessionPool``."""
+    from session_pool import SessionPool
+
+    def run(pool, host):
+        with pool.session() as dev:
+            return _ping(dev, host, count)
+
+    with SessionPool(size=opts.sessions, timeout=opts.rpc_timeout) as pool, \
+            ThreadPoolExecutor(max_workers=opts.workers) as executor:
+        return [f.result() for f in as_completed([executor.submit(run, pool, h) for h in hosts])]
+
+
+def async_engine(hosts, count, opts):
+    """ping-rtt-workers.py: motor asíncrono sobre un ``SessionPool``."""
+    from probe_engine import run_probes
+    from session_pool import SessionPool
+
+    def run(pool, host):
+        with pool.session() as dev:
+            return _ping(dev, host, count, opts.rpc_timeout)[1]
+
+    with SessionPool(size=opts.sessions, timeout=opts.rpc_timeout) as pool:
+        return run_probes(lambda host: run(pool, host), hosts,
+                          concurrency=opts.workers, timeout=opts.rpc_timeout)
+
+
+STRATEGIES = {
+    "sequential": sequential,
+    "threaded_shared": threaded_shared,
+    "per_host_device": per_host_device,
+    "chunked": chunked,
+    "pooled_threads": pooled_threads,
+    "async_engine": async_engine,
+}
+
+
+# ------------------ Salidas de resultados ------------------
+def _synthetic_results(n):
+    """Resúmenes con las claves de ``rtt_stats.summarize_rtts``."""
+    for i in range(n):
+        base = 10.0 + (i % 97) * 0.37
+        yield f"10.0.{(i // 250) % 250}.{i % 250 + 1}", {
+            "sent": 5, "count": 5 - (i % 50 == 0), "loss": 20.0 if i % 50 == 0 else 0.0,
+            "min": base, "max": base * 1.8, "mean": base * 1.3, "p95": base * 1.7, "jitter": base * 0.1,
+        }
+
+
+def sink_csv(results, directory):
+    """system_usage.py original: floats formateados a texto y ``BatchCsvWriter``."""
+    from csv_writer import BatchCsvWriter
+    path = os.path.join(directory, "ping_results.csv")
+    writer = BatchCsvWriter(path, header=["Host", "RTT Min (ms)", "RTT Max (ms)", "RTT Prom (ms)", "Hora"])
+    start = time.perf_counter()
+    for host, summary in results:
+        writer.writerow([host, f"{summary['min']:.2f}", f"{summary['max']:.2f}", f"{summary['mean']:.2f}",
+                         time.strftime("%Y-%m-%d %H:%M:%S")])
+    produced = time.perf_counter() - start
+    writer.close()
+    return produced, path
+
+
+def sink_syslog(results, directory):
+    """Texto libre por ``jcs.syslog`` (el simulador solo lo guarda en memoria)."""
+    import jcs
+    import ping_sim
+    start = time.perf_counter()
+    for host, summary in results:
+        jcs.syslog("external.error",
+                   f"RTT para {host} a las {time.strftime('%a %b %d %H:%M:%S %Y')} | "
+                   f"Mín: {summary['min']} ms, Máx: {summary['max']} ms, Prom: {summary['mean']} ms")
+    produced = time.perf_counter() - start
+    path = os.path.join(directory, "syslog.txt")
+    with open(path, "w") as file:
+        file.writelines(f"{level}: {message}\n" for level, message in ping_sim.syslog_messages)
+    return produced, path
+
+
+def sink_jsonl(results, directory):
+    """json_sink.JsonLinesSink: encolar en el worker, codificar y escribir en su hilo."""
+    from json_sink import JsonLinesSink, probe_event
+    path = os.path.join(directory, "ping_results.jsonl")
+    # Cola del tamaño de la ráfaga: se mide el coste de encolar, no la espera al escritor
+    sink = JsonLinesSink(path, maxsize=len(results), overflow="block").start()
+    start = time.perf_counter()
+    for host, summary in results:
+        sink.emit(probe_event(host, summary))
+    produced = time.perf_counter() - start
+    sink.close()
+    return produced, path
+
+
+SINKS = {
+    "csv": sink_csv,
+    "syslog": sink_syslog,
+    "jsonl": sink_jsonl,
+}
+
+
+def run_sink(name, opts):
+    """Mide una salida de resultados (en el proceso hijo)."""
+    results = list(_synthetic_results(opts.records))
+    directory = tempfile.mkdtemp(prefix="bench-sink-")
+    try:
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        produced, path = SINKS[name](results, directory)
+        total = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        size = os.path.getsize(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "sink": name,
+        "records": opts.records,
+        "producer_seconds": round(produced, 4),
+        "producer_records_per_second": round(opts.records / produced, 2) if produced else None,
+        "total_seconds": round(total, 4),
+        "records_per_second": round(opts.records / total, 2) if total else None,
+        "bytes": size,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "cpu_seconds": round(cpu, 4),
+    }
+
+
+# ------------------ Medición en el proceso hijo ------------------
+def run_one(name, opts):
+    """Ejecuta una estrategia y devuelve sus métricas (en el proceso hijo)."""
+    import ping_sim
+
+    hosts = [f"10.0.{i // 250}.{i % 250 + 1}" for i in range(opts.hosts)]
+    threads = ThreadCounter().install()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        results = STRATEGIES[name](hosts, opts.count, opts)
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        threads.uninstall()
+
+    sim = ping_sim.stats()
+    return {
+        "strategy": name,
+        "hosts": opts.hosts,
+        "count": opts.count,
+        "results": len(results),
+        "wall_seconds": round(wall, 4),
+        "rpcs": sim["rpcs"],
+        "rpcs_per_second": round(sim["rpcs"] / wall, 2) if wall else None,
+        "sessions_opened": sim["opens"],
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_threads": threads.peak,
+        "threads_created": threads.created,
+        "cpu_seconds": round(cpu, 4),
+    }
+
+
+# ------------------ Scripts reales ------------------
+SCRIPT_ARGS = {
+    "ping_v1.py": ["--count", "{count}"],
+    "normal-thread.py": ["--count", "{count}"],
+    "normal-thread_v2.py": ["--count", "{count}"],
+    "ping-rttt-chunk.py": ["--count", "{count}", "--chunk", "{chunk}"],
+    "ping-rtt-chunk-thread.py": ["--count", "{count}", "--chunk", "{chunk}", "--sessions", "{sessions}"],
+    "ping-rtt-timeout.py": ["--count", "{count}", "--chunk", "{chunk}"],
+    "ping-rtt-max-monitor.py": ["--count", "{count}", "--max-time", "{max_time}"],
+    "ping-rtt-workers.py": ["--count", "{count}", "--max-time", "{max_time}", "--concurrency", "{workers}",
+                            "--sessions", "{sessions}"],
+}
+
+
+def run_script(name, opts):
+    """Ejecuta un script real con el simulador y devuelve sus métricas (en el proceso hijo)."""
+    import ping_sim
+
+    path = os.path.join(BASE_DIR, name)
+    directory = tempfile.mkdtemp(prefix="bench-script-")
+    with open(path) as file:
+        source = file.read().replace(SCRIPTS_DIR, directory)
+    argv = [arg.format(count=opts.count, chunk=opts.chunk, sessions=opts.sessions, workers=opts.workers,
+                       max_time=opts.max_time) for arg in SCRIPT_ARGS.get(name, ["--count", "{count}"])]
+    sys.argv = [path] + argv
+
+    threads = ThreadCounter().install()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    error = None
+    try:
+        exec(compile(source, path, "exec"), {"__name__": "__main__", "__file__": path})
+    except SystemExit as e:
+        error = None if e.code in (None, 0) else f"exit {e.code}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        threads.uninstall()
+        written = sum(os.path.getsize(os.path.join(root, f))
+                      for root, _, files in os.walk(directory) for f in files)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    sim = ping_sim.stats()
+    return {
+        "script": name,
+        "args": argv,
+        "error": error,
+        "wall_seconds": round(wall, 4),
+        "rpcs": sim["rpcs"],
+        "rpcs_per_second": round(sim["rpcs"] / wall, 2) if wall else None,
+        "sessions_opened": sim["opens"],
+        "syslog_messages": sim["syslog"],
+        "bytes_written": written,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_threads": threads.peak,
+        "threads_created": threads.created,
+        "cpu_seconds": round(cpu, 4),
+    }
+
+
+def spawn(name, opts, flag="--run"):
+    """Lanza ``bench.py --run`` en un proceso limpio con el simulador en el path."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([SIM_DIR, BASE_DIR, env.get("PYTHONPATH", "")])
+    env.setdefault("PING_SIM_SEED", "1")
+    cmd = [
+        sys.executable, os.path.abspath(__file__), flag, name,
+        "--hosts", str(opts.hosts), "--count", str(opts.count),
+        "--workers", str(opts.workers), "--sessions", str(opts.sessions),
+        "--chunk", str(opts.chunk), "--rpc-timeout", str(opts.rpc_timeout),
+        "--records", str(opts.records), "--max-time", str(opts.max_time),
+    ]
+    out = subprocess.run(cmd, env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+# ------------------ Entrada principal ------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de estrategias de ping contra el simulador")
+    parser.add_argument("--hosts", type=int, default=30, help="Número de hosts (N)")
+    parser.add_argument("--count", type=int, default=5, help="Paquetes por host (M)")
+    parser.add_argument("--workers", type=int, default=10, help="Hilos o concurrencia máxima")
+    parser.add_argument("--sessions", type=int, default=4, help="Sesiones del pool")
+    parser.add_argument("--chunk", type=int, default=10, help="Tamaño de bloque para 'chunked'")
+    parser.add_argument("--rpc-timeout", type=int, default=90, help="Timeout RPC en segundos")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help="Estrategias separadas por comas")
+    parser.add_argument("--sinks", help="Medir salidas de resultados (p. ej. csv,syslog,jsonl)")
+    parser.add_argument("--records", type=int, default=100000, help="Resultados sintéticos para --sinks")
+    parser.add_argument("--scripts", help="Ejecutar scripts reales (p. ej. ping_v1.py,ping-rtt-workers.py o 'all')")
+    parser.add_argument("--max-time", type=int, default=60, help="--max-time de los scripts con monitoreo")
+    parser.add_argument("--output", default="bench_results.json", help="Fichero JSON de resultados")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--run-sink", help=argparse.SUPPRESS)
+    parser.add_argument("--run-script", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    opts = parse_args()
+    if opts.run:
+        print(json.dumps(run_one(opts.run, opts)))
+        return
+    if opts.run_sink:
+        print(json.dumps(run_sink(opts.run_sink, opts)))
+        return
+    if opts.run_script:
+        metrics = run_script(opts.run_script, opts)
+        sys.stdout.flush()
+        print(json.dumps(metrics))
+        return
+
+    report = []
+    if opts.sinks:
+        for name in opts.sinks.split(","):
+            metrics = spawn(name, opts, flag="--run-sink")
+            report.append(metrics)
+            print(f"{name:8} productor {metrics['producer_records_per_second']:>11} reg/s  "
+                  f"total {metrics['records_per_second']:>11} reg/s  {metrics['bytes']:>10} bytes  "
+                  f"{metrics['cpu_seconds']:>7.3f} s CPU")
+        with open(opts.output, "w") as file:
+            json.dump({"generated": time.strftime("%Y-%m-%d %H:%M:%S"), "sinks": report}, file, indent=2)
+        return
+
+    if opts.scripts:
+        names = list(SCRIPT_ARGS) if opts.scripts == "all" else opts.scripts.split(",")
+        for name in names:
+            metrics = spawn(name, opts, flag="--run-script")
+            report.append(metrics)
+            print(f"{name:24} {metrics['wall_seconds']:>9.3f} s  {metrics['rpcs']:>5} rpc  "
+                  f"{metrics['rpcs_per_second']:>9} rpc/s  {metrics['peak_rss_kb']:>7} KB  "
+                  f"{metrics['peak_threads']:>4} hilos ({metrics['threads_created']} creados)  "
+                  f"{metrics['cpu_seconds']:>7.3f} s CPU" + (f"  ERROR {metrics['error']}" if metrics["error"] else ""))
+        with open(opts.output, "w") as file:
+            json.dump({"generated": time.strftime("%Y-%m-%d %H:%M:%S"), "scripts": report}, file, indent=2)
+        return
+
+    for name in opts.strategies.split(","):
+        metrics = spawn(name, opts)
+        report.append(metrics)
+        print(f"{name:16} {metrics['wall_seconds']:>9.3f} s  {metrics['rpcs_per_second']:>9} rpc/s  "
+              f"{metrics['peak_rss_kb']:>7} KB  {metrics['peak_threads']:>4} hilos "
+              f"({metrics['threads_created']} creados)  {metrics['cpu_seconds']:>7.3f} s CPU")
+
+    with open(opts.output, "w") as file:
+        json.dump({"generated": time.strftime("%Y-%m-%d %H:%M:%S"), "results": report}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Coalescencia de pings duplicados (single-flight).
+
+Cuando varias peticiones idénticas ``(host, count, opciones)`` están en vuelo
+al mismo tiempo, solo la primera ejecuta la RPC; las demás esperan y reciben
+el mismo resultado (o la misma excepción).
+
+``merge_repeats`` es el modo opcional que convierte las repeticiones
+deliberadas de un host en ``HOSTS_LIST`` en una sola prueba con más paquetes.
+"""
+
+import threading
+
+
+# ------------------ Clave de coalescencia ------------------
+def ping_key(host, count, **options):
+    """Clave que identifica una petición de ping equivalente."""
+    return host, str(count), tuple(sorted((k, str(v)) for k, v in options.items()))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# ------------------ Single-flight ------------------
+class SingleFlight:
+    """Comparte una única ejecución entre llamadas concurrentes con la misma clave."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn):
+        """Ejecuta ``fn()`` o espera al resultado de la llamada en vuelo con ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """RPC ejecutadas frente a resultados compartidos."""
+        with self._lock:
+            return dict(self._stats)
+
+
+# ------------------ Fusión de repeticiones ------------------
+def merge_repeats(hosts, count):
+    """Agrupa hosts repetidos en una sola prueba con ``count * repeticiones`` paquetes.
+
+    Devuelve una lista de ``(host, count_total, repeticiones)`` en el orden en
+    que aparece cada host por primera vez.
+    """
+    repeats = {}
+    for host in hosts:
+        repeats[host] = repeats.get(host, 0) + 1
+    return [(host, count * n, n) for host, n in repeats.items()]
@@ -0,0 +1,162 @@
+"""Escritor CSV por lotes con un único descriptor abierto.
+
+Sustituye el patrón ``open(csv_filename, mode="a")`` por fila: el fichero se
+abre una vez, las filas se acumulan en memoria y se escriben cuando el lote
+llega a ``batch_size`` filas o pasan ``flush_interval`` segundos. La política
+``fsync`` decide cuándo se fuerza el volcado a la flash del RE. Con
+``rotation`` (una ``segments.RotationPolicy``) el fichero se rota por tamaño
+y antigüedad y los segmentos cerrados se comprimen en segundo plano.
+
+Si el fichero existente tiene otra cabecera (p. ej. una columna nueva), no se
+añaden filas con las columnas nuevas bajo la cabecera vieja: el fichero se
+aparta (como segmento con ``rotation`` o renombrado con la fecha de su última
+escritura) y se empieza uno nuevo con la cabecera actual.
+"""
+
+import csv
+import os
+import threading
+import time
+
+from segments import SegmentManager
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 5.0   # Segundos máximos que una fila espera en memoria
+FSYNC_POLICIES = ("never", "flush", "close")
+
+
+class BatchCsvWriter:
+    """Escritor CSV con lotes por número de filas o por tiempo."""
+
+    def __init__(self, path, header=None, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, fsync="close", rotation=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Política fsync no válida: {fsync}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.header = header
+        self._lock = threading.Lock()
+        self._pending = []
+        self._segments = SegmentManager(path, rotation) if rotation is not None else None
+        self._stats = {"rows": 0, "flushes": 0, "flush_seconds": 0.0, "flush_max": 0.0, "header_changes": 0}
+        self._check_header()
+        self._open()
+        self._opened_at = time.monotonic()
+        self._last_flush = self._opened_at
+
+    def _check_header(self):
+        """Aparta el fichero existente si su cabecera no es ``header``."""
+        if not self.header or not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, newline="") as file:
+            current = next(csv.reader(file), None)
+        if current == [str(column) for column in self.header]:
+            return
+        last_write = os.path.getmtime(self.path)
+        if self._segments is not None:
+            # Pasa a ser un segmento más, con su rango temporal en el índice
+            self._segments.record_write(last_write)
+            self._segments.rotate()
+        else:
+            base, ext = os.path.splitext(self.path)
+            os.replace(self.path, f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(last_write))}{ext}")
+        self._stats["header_changes"] += 1
+
+    def _open(self):
+        self._file = open(self.path, mode="a", newline="")
+        self._writer = csv.writer(self._file)
+        if self.header and self._file.tell() == 0:
+            self._writer.writerow(self.header)
+
+    # ------------------ Escritura ------------------
+    def writerow(self, row):
+        with self._lock:
+            self._pending.append(row)
+            if self._due():
+                self._flush()
+
+    def writerows(self, rows):
+        with self._lock:
+            self._pending.extend(rows)
+            if self._due():
+                self._flush()
+
+    def _due(self):
+        return (len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def flush_if_due(self):
+        """Vuelca el lote si ya venció ``flush_interval`` (para escritores ociosos)."""
+        with self._lock:
+            if self._pending and self._due():
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        start = time.perf_counter()
+        wrote = bool(self._pending)
+        if self._pending:
+            self._writer.writerows(self._pending)
+            self._stats["rows"] += len(self._pending)
+            self._pending = []
+        self._file.flush()
+        if self.fsync == "flush":
+            os.fsync(self._file.fileno())
+        if self._segments is not None:
+            if wrote:
+                self._segments.record_write()
+            if self._segments.should_rotate(self._file.tell()):
+                self._rotate()
+        elapsed = time.perf_counter() - start
+        self._stats["flushes"] += 1
+        self._stats["flush_seconds"] += elapsed
+        self._stats["flush_max"] = max(self._stats["flush_max"], elapsed)
+        self._last_flush = time.monotonic()
+
+    def _rotate(self):
+        if self.fsync in ("flush", "close"):
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._segments.rotate()
+        self._open()
+
+    # ------------------ Cierre y métricas ------------------
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            if self.fsync in ("flush", "close"):
+                os.fsync(self._file.fileno())
+            self._file.close()
+        if self._segments is not None:
+            self._segments.close()
+
+    def stats(self):
+        """Filas escritas, filas/s y latencia media/máxima de volcado en ms."""
+        with self._lock:
+            elapsed = time.monotonic() - self._opened_at
+            flushes = self._stats["flushes"]
+            stats = {
+                "rows": self._stats["rows"],
+                "pending": len(self._pending),
+                "rows_per_second": round(self._stats["rows"] / elapsed, 2) if elapsed else 0.0,
+                "flushes": flushes,
+                "flush_avg_ms": round(1000 * self._stats["flush_seconds"] / flushes, 3) if flushes else 0.0,
+                "flush_max_ms": round(1000 * self._stats["flush_max"], 3),
+                "header_changes": self._stats["header_changes"],
+            }
+        if self._segments is not None:
+            stats["segments"] = self._segments.stats()
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
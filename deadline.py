@@ -0,0 +1,131 @@
+"""Plazo global de ejecución para los pings de un ciclo.
+
+``--max-time`` solo detenía el muestreo del sistema: los pings seguían en
+vuelo después y el script podía superar el límite de tiempo de los event
+scripts, que lo mata con los resultados aún en cola. ``RunDeadline`` fija un
+único instante de fin para todo el ciclo, menos una reserva para vaciar colas
+y cerrar ficheros:
+
+- los hosts se ordenan con ``prioritize`` para que los más importantes (y
+  los que se quedaron sin probar en el ciclo anterior) vayan primero;
+- antes de lanzar cada ping, ``admits()`` compara el tiempo restante con la
+  duración estimada (p90 de los pings ya terminados o ``estimate`` inicial);
+  si no cabe, el host se omite (``skip``);
+- un ping en vuelo nunca espera más que ``remaining()``; si vence por el plazo
+  global se cuenta como cancelado (``cancel``).
+
+``report()`` lista los hosts omitidos y cancelados, y ``save_pending`` los
+guarda para adelantarlos en el siguiente ciclo.
+"""
+
+import json
+import os
+import threading
+import time
+
+DEFAULT_RESERVE = 5.0        # Segundos reservados para vaciar colas y cerrar ficheros
+DEFAULT_PRIORITY = 100       # Prioridad de los hosts sin entrada (menor = antes)
+SKIPPED_RESULT = "Omitido"
+
+
+class RunDeadline:
+    """Instante de fin del ciclo, estimación de duración por ping y hosts no probados."""
+
+    def __init__(self, budget, reserve=DEFAULT_RESERVE, estimate=1.0, start=None):
+        start = time.monotonic() if start is None else start
+        self.budget = budget
+        self.reserve = min(reserve, budget / 2)
+        self.expires_at = start + budget - self.reserve
+        self.initial_estimate = estimate
+        self.skipped = []
+        self.cancelled = []
+        self._lock = threading.Lock()
+        self._observed = []
+
+    # ------------------ Tiempo ------------------
+    def remaining(self):
+        """Segundos hasta el fin del ciclo (sin la reserva); nunca negativo."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def estimate(self):
+        """Duración esperada de un ping: p90 observado o la estimación inicial."""
+        with self._lock:
+            if not self._observed:
+                return self.initial_estimate
+            observed = sorted(self._observed)
+        return observed[min(len(observed) - 1, int(0.9 * len(observed)))]
+
+    def admits(self):
+        """True si un ping de duración estimada cabe en el tiempo restante."""
+        return self.remaining() >= self.estimate()
+
+    def timeout(self, timeout):
+        """Plazo de un ping: el suyo propio acotado por el tiempo restante."""
+        return min(timeout, self.remaining())
+
+    # ------------------ Registro ------------------
+    def observe(self, seconds):
+        """Duración de un ping terminado (sin vencer el plazo)."""
+        with self._lock:
+            self._observed.append(seconds)
+
+    def skip(self, host):
+        """Host no lanzado porque no cabía en el tiempo restante."""
+        with self._lock:
+            self.skipped.append(host)
+
+    def cancel(self, host):
+        """Host en vuelo abandonado al llegar el fin del ciclo."""
+        with self._lock:
+            self.cancelled.append(host)
+
+    def pending(self):
+        """Hosts omitidos o cancelados, sin repetir y en orden."""
+        with self._lock:
+            return list(dict.fromkeys(self.skipped + self.cancelled))
+
+    def report(self):
+        """Presupuesto, tiempo restante, estimación y hosts no probados."""
+        estimate = self.estimate()
+        with self._lock:
+            return {
+                "budget": self.budget,
+                "reserve": self.reserve,
+                "remaining": round(self.remaining(), 3),
+                "estimate": round(estimate, 3),
+                "completed": len(self._observed),
+                "skipped": list(dict.fromkeys(self.skipped)),
+                "cancelled": list(dict.fromkeys(self.cancelled)),
+            }
+
+    def save_pending(self, path):
+        """Guarda los hosts no probados para adelantarlos en el siguiente ciclo."""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(self.pending(), file)
+        os.replace(tmp, path)
+
+
+# ------------------ Orden de los hosts ------------------
+def load_pending(path):
+    """Hosts no probados en el ciclo anterior (lista vacía si no hay fichero)."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def prioritize(hosts, priorities=None, promote=()):
+    """Ordena ``hosts`` por prioridad (menor primero) conservando el orden original.
+
+    A igual prioridad, los hosts de ``promote`` (p. ej. los no probados en
+    el ciclo anterior) van delante, para que un plazo corto no deje siempre
+    sin probar a los mismos.
+    """
+    priorities = priorities or {}
+    promote = set(promote)
+    return sorted(hosts, key=lambda host: (priorities.get(host, DEFAULT_PRIORITY), host not in promote))
@@ -0,0 +1,150 @@
+"""Freno de recursos para que el monitoreo no sature el RE.
+
+Los scripts corren en el routing engine junto a rpd y mgd.
+``ResourceGovernor`` compara la última muestra del sistema (CPU y memoria
+del RE) y el consumo del propio script (CPU de proceso como % de un núcleo
+y RSS) con sus techos. Antes de cada ping o escritura se llama a
+``throttle()``: si algún techo está superado, el hilo espera en pasos de
+``check_interval`` hasta que baje o hasta ``max_pause`` segundos, y después
+continúa. Así el monitoreo se frena bajo carga, nunca se detiene del todo y
+queda registrado cuánto tiempo se frenó y por qué.
+
+``athrottle()`` es la misma espera para corutinas (``await asyncio.sleep``),
+para frenar en el motor asíncrono antes de tomar hueco de concurrencia.
+"""
+
+import asyncio
+import threading
+import time
+
+import psutil
+
+DEFAULT_MAX_CPU = 80.0          # % de CPU del RE
+DEFAULT_MAX_MEM = 90.0          # % de memoria del RE
+DEFAULT_MAX_SELF_CPU = 25.0     # % de un núcleo usado por el script
+DEFAULT_MAX_RSS_MB = 256.0      # RSS del script
+DEFAULT_CHECK_INTERVAL = 0.5    # Segundos entre comprobaciones
+DEFAULT_MAX_PAUSE = 5.0         # Espera máxima por llamada a throttle()
+
+
+class ResourceGovernor:
+    """Techos de CPU/memoria del RE y CPU/RSS del script con pausas medidas."""
+
+    def __init__(self, sample_fn, max_cpu=DEFAULT_MAX_CPU, max_mem=DEFAULT_MAX_MEM,
+                 max_self_cpu=DEFAULT_MAX_SELF_CPU, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 check_interval=DEFAULT_CHECK_INTERVAL, max_pause=DEFAULT_MAX_PAUSE, log=None):
+        self.sample_fn = sample_fn
+        self.max_cpu = max_cpu
+        self.max_mem = max_mem
+        self.max_self_cpu = max_self_cpu
+        self.max_rss_mb = max_rss_mb
+        self.check_interval = check_interval
+        self.max_pause = max_pause
+        self.log = log
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+        self._checked_at = None
+        # La primera comprobación solo fija la marca: el arranque (imports, hilos) no cuenta
+        self._cpu_mark = None
+        self._reason = None
+        self._stats = {"checks": 0, "throttles": 0, "timeouts": 0,
+                       "throttled_seconds": {}, "reasons": {}}
+
+    # ------------------ Comprobación ------------------
+    def _self_cpu(self):
+        """CPU del proceso (% de un núcleo) desde la comprobación anterior."""
+        now, cpu = time.monotonic(), time.process_time()
+        mark, self._cpu_mark = self._cpu_mark, (now, cpu)
+        if mark is None:
+            return 0.0
+        then, cpu_then = mark
+        return 100.0 * (cpu - cpu_then) / (now - then) if now > then else 0.0
+
+    def check(self):
+        """Devuelve el motivo de freno vigente o None (se recalcula cada ``check_interval``).
+
+        ``reasons`` cuenta las comprobaciones en que se superó cada techo.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self._reason
+            self._checked_at = now
+            self._stats["checks"] += 1
+
+            reason = kind = None
+            snapshot = self.sample_fn()
+            self_cpu = self._self_cpu()
+            rss_mb = self._process.memory_info().rss / (1024 * 1024)
+            if snapshot is not None and snapshot.cpu_percent > self.max_cpu:
+                kind, reason = "re_cpu", f"CPU RE {snapshot.cpu_percent}% > {self.max_cpu}%"
+            elif snapshot is not None and snapshot.mem_percent > self.max_mem:
+                kind, reason = "re_mem", f"memoria RE {snapshot.mem_percent}% > {self.max_mem}%"
+            elif self_cpu > self.max_self_cpu:
+                kind, reason = "self_cpu", f"CPU script {self_cpu:.1f}% > {self.max_self_cpu}%"
+            elif rss_mb > self.max_rss_mb:
+                kind, reason = "self_rss", f"RSS script {rss_mb:.1f} MB > {self.max_rss_mb} MB"
+
+            if reason is not None and self._reason is None and self.log is not None:
+                self.log(f"[GOVERNOR] Frenando: {reason}")
+            elif reason is None and self._reason is not None and self.log is not None:
+                self.log("[GOVERNOR] Recursos por debajo de los techos, se reanuda")
+            if kind is not None:
+                self._stats["reasons"][kind] = self._stats["reasons"].get(kind, 0) + 1
+            self._reason = reason
+            return reason
+
+    # ------------------ Freno ------------------
+    def _pauses(self, kind, max_wait):
+        """Genera las esperas de un freno y devuelve los segundos esperados (común a las dos variantes)."""
+        reason = self.check()
+        if reason is None:
+            return 0.0
+        start = time.monotonic()
+        deadline = start + (self.max_pause if max_wait is None else min(self.max_pause, max_wait))
+        while reason is not None and time.monotonic() < deadline:
+            yield min(self.check_interval, max(deadline - time.monotonic(), 0.0))
+            reason = self.check()
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats["throttles"] += 1
+            seconds = self._stats["throttled_seconds"]
+            seconds[kind] = seconds.get(kind, 0.0) + waited
+            if reason is not None:
+                self._stats["timeouts"] += 1
+        return waited
+
+    def throttle(self, kind="probe", max_wait=None):
+        """Espera mientras haya un techo superado (hasta ``max_pause``); devuelve los segundos esperados.
+
+        ``kind`` identifica lo frenado (``probe``, ``write``) en ``throttled_seconds``;
+        si se agota ``max_pause`` con el techo aún superado se cuenta en ``timeouts``.
+        ``max_wait`` acota además la espera (p. ej. al tiempo restante del ciclo).
+        """
+        pauses = self._pauses(kind, max_wait)
+        try:
+            while True:
+                time.sleep(next(pauses))
+        except StopIteration as done:
+            return done.value
+
+    async def athrottle(self, kind="probe", max_wait=None):
+        """Igual que ``throttle`` pero sin bloquear el bucle de eventos."""
+        pauses = self._pauses(kind, max_wait)
+        try:
+            while True:
+                await asyncio.sleep(next(pauses))
+        except StopIteration as done:
+            return done.value
+
+    def stats(self):
+        """Comprobaciones, frenos, esperas agotadas, segundos frenados por tipo y techos superados."""
+        with self._lock:
+            return {
+                "checks": self._stats["checks"],
+                "throttles": self._stats["throttles"],
+                "timeouts": self._stats["timeouts"],
+                "throttled_seconds": {k: round(v, 3) for k, v in self._stats["throttled_seconds"].items()},
+                "reasons": dict(self._stats["reasons"]),
+                "active": self._reason,
+            }
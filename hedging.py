@@ -0,0 +1,186 @@
+"""Plazos por RPC de ping y pings de respaldo (hedging) para los rezagados.
+
+Con ``RPC_TIMEOUT = 90`` en el ``Device``, un host inalcanzable retenía un
+hilo 90 s mientras el resto del lote esperaba en ``as_completed``. Un ping de
+``count`` paquetes no puede tardar más que el envío (``count * interval``),
+la espera tras el último paquete (``wait``, que se pasa a la RPC) y un margen
+para mgd; ``ping_timeout`` calcula ese plazo y se usa como ``dev_timeout`` de
+cada llamada. Si ese plazo supera el techo de la RPC (``max_timeout``), el
+ping vencería siempre: ``max_count`` da el ``count`` máximo que cabe y
+``HedgedPinger`` rechaza los que no caben en vez de lanzarlos.
+
+``HedgedPinger`` ejecuta cada ping con una sesión del pool y, si tarda más que
+el p95 de las RPC del mismo tamaño (``LatencyTracker``), lanza una copia en
+otra sesión y se queda con la primera respuesta. El p95 se cuenta desde que
+la primaria obtiene su sesión, no desde que se encola: la espera por una
+sesión libre no es lentitud del ping, y una copia tampoco tendría sesión. Las copias se limitan a una
+fracción de las llamadas (``max_hedge_ratio``) para no duplicar la carga
+cuando todo el lote va lento.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_INTERVAL = 1.0       # Segundos entre paquetes (valor por defecto de Junos)
+DEFAULT_WAIT = 2             # Segundos de espera tras el último paquete (se pasa a la RPC)
+DEFAULT_SLACK = 3.0          # Margen para el procesado de la RPC en mgd
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_MIN_SAMPLES = 5      # RPC del mismo tamaño necesarias antes de lanzar copias
+DEFAULT_WINDOW = 200         # Latencias recientes guardadas por tamaño
+DEFAULT_MAX_HEDGE_RATIO = 0.1
+
+
+def ping_timeout(count, interval=DEFAULT_INTERVAL, wait=DEFAULT_WAIT, slack=DEFAULT_SLACK):
+    """Plazo de una RPC de ping de ``count`` paquetes: envío + espera del último + margen."""
+    return count * interval + wait + slack
+
+
+def max_count(max_timeout, interval=DEFAULT_INTERVAL, wait=DEFAULT_WAIT, slack=DEFAULT_SLACK):
+    """Mayor ``count`` cuyo ``ping_timeout`` cabe en ``max_timeout``."""
+    return int((max_timeout - wait - slack) // interval)
+
+
+# ------------------ Latencias por tamaño ------------------
+class LatencyTracker:
+    """Latencias recientes de RPC correctas agrupadas por número de paquetes."""
+
+    def __init__(self, percentile=DEFAULT_PERCENTILE, min_samples=DEFAULT_MIN_SAMPLES,
+                 window=DEFAULT_WINDOW):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies = {}
+
+    def record(self, count, seconds):
+        with self._lock:
+            latencies = self._latencies.get(count)
+            if latencies is None:
+                latencies = self._latencies[count] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def quantile(self, count):
+        """Percentil de latencia para ``count`` paquetes, o None sin muestras suficientes."""
+        with self._lock:
+            latencies = self._latencies.get(count)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def stats(self):
+        """Muestras y percentil por tamaño."""
+        with self._lock:
+            counts = {count: len(latencies) for count, latencies in self._latencies.items()}
+        key = f"p{round(100 * self.percentile)}"
+        stats = {}
+        for count, samples in counts.items():
+            quantile = self.quantile(count)
+            stats[count] = {"samples": samples, key: None if quantile is None else round(quantile, 3)}
+        return stats
+
+
+# ------------------ Pings con copia de respaldo ------------------
+class HedgedPinger:
+    """Pings con plazo propio por llamada y copia en otra sesión del pool para los rezagados."""
+
+    def __init__(self, pool, hedge=True, tracker=None, interval=DEFAULT_INTERVAL, wait=DEFAULT_WAIT,
+                 slack=DEFAULT_SLACK, max_timeout=None, max_hedge_ratio=DEFAULT_MAX_HEDGE_RATIO,
+                 max_workers=None):
+        self.pool = pool
+        self.hedge = hedge
+        self.tracker = tracker or LatencyTracker()
+        self.interval = interval
+        self.wait = wait
+        self.slack = slack
+        self.max_timeout = max_timeout
+        self.max_hedge_ratio = max_hedge_ratio
+        # Primaria y copia de cada ping en vuelo
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 2 * pool.size,
+                                            thread_name_prefix="hedged-ping")
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "skipped_hedges": 0, "errors": 0}
+
+    def timeout(self, count):
+        """Plazo de la RPC para ``count`` paquetes; ``ValueError`` si no cabe en ``max_timeout``."""
+        timeout = ping_timeout(count, self.interval, self.wait, self.slack)
+        if self.max_timeout is not None and timeout > self.max_timeout:
+            raise ValueError(f"count={count} necesita {timeout} s por ping y el techo es {self.max_timeout} s "
+                             f"(máximo count={max_count(self.max_timeout, self.interval, self.wait, self.slack)})")
+        return timeout
+
+    def _call(self, host, count, timeout, started=None):
+        try:
+            with self.pool.session() as dev:
+                if started is not None:
+                    started.set()
+                start = time.monotonic()
+                result = dev.rpc.ping(host=host, count=str(count), wait=str(self.wait), dev_timeout=timeout)
+        finally:
+            # También si falla al obtener la sesión, para no dejar esperando a ping()
+            if started is not None:
+                started.set()
+        self.tracker.record(count, time.monotonic() - start)
+        return result
+
+    def _may_hedge(self):
+        with self._lock:
+            if self._stats["hedges"] + 1 > max(1, self.max_hedge_ratio * self._stats["calls"]):
+                self._stats["skipped_hedges"] += 1
+                return False
+            self._stats["hedges"] += 1
+            return True
+
+    def ping(self, host, count):
+        """Devuelve la primera respuesta correcta; si ambas fallan, relanza el error de la primaria."""
+        with self._lock:
+            self._stats["calls"] += 1
+        timeout = self.timeout(count)
+        started = threading.Event()
+        primary = self._executor.submit(self._call, host, count, timeout, started)
+        delay = self.tracker.quantile(count) if self.hedge else None
+        if delay is None:
+            return self._result(primary)
+        # El plazo de la copia empieza cuando la primaria tiene sesión
+        started.wait()
+        if wait([primary], timeout=delay).done or not self._may_hedge():
+            return self._result(primary)
+
+        backup = self._executor.submit(self._call, host, count, timeout)
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self._stats["hedge_wins"] += 1
+                    return future.result()
+        return self._result(primary)
+
+    def _result(self, future):
+        try:
+            return future.result()
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+
+    def close(self):
+        """No espera a las copias perdedoras: terminan solas dentro de su plazo."""
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        """Llamadas, copias lanzadas, copias que respondieron antes, copias omitidas y errores."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["latency"] = self.tracker.stats()
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
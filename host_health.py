@@ -0,0 +1,153 @@
+"""Estado de salud por host, persistente entre ejecuciones, con backoff exponencial.
+
+Un host caído recibía en cada ciclo el ping completo de ``--count`` paquetes,
+se esperaban todos sus timeouts ICMP y se guardaban RTT a cero como si fueran
+medidas. ``HostHealth`` guarda en un JSON el estado de cada host:
+
+- ``up``: responde; se prueba con el ``count`` normal;
+- ``failing``: ha fallado menos de ``failure_threshold`` ciclos seguidos;
+  se sigue probando con el ``count`` normal;
+- ``down``: ha fallado ``failure_threshold`` ciclos seguidos; solo se
+  comprueba con ``check_count`` paquetes cuando vence su espera, que empieza
+  en ``base_backoff`` segundos y se duplica con cada comprobación fallida
+  hasta ``max_backoff``. Una respuesta lo devuelve a ``up``.
+
+Los resultados de un ciclo se acumulan con ``observe`` (un host repetido en la
+lista cuenta como correcto si alguna de sus pruebas respondió) y se aplican
+con ``commit``, que devuelve las transiciones para registrarlas una sola vez.
+Varios scripts pueden compartir el fichero: ``commit`` lo relee bajo un
+``flock`` exclusivo y aplica solo los hosts observados en este ciclo, así no
+pisa lo que otro script guardó mientras tanto.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+
+UP = "up"
+FAILING = "failing"
+DOWN = "down"
+
+DEFAULT_FAILURE_THRESHOLD = 3    # Ciclos fallidos seguidos para pasar a down
+DEFAULT_BASE_BACKOFF = 120       # Segundos hasta la primera comprobación de un host down
+DEFAULT_MAX_BACKOFF = 6 * 3600
+DEFAULT_CHECK_COUNT = 1          # Paquetes de la comprobación de un host down
+DOWN_RESULT = "Caído"            # Resultado de un host down no probado en este ciclo
+
+
+class HostHealth:
+    """Máquina de estados up/failing/down por host guardada en ``path``."""
+
+    def __init__(self, path, failure_threshold=DEFAULT_FAILURE_THRESHOLD, base_backoff=DEFAULT_BASE_BACKOFF,
+                 max_backoff=DEFAULT_MAX_BACKOFF, check_count=DEFAULT_CHECK_COUNT):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.check_count = check_count
+        self._lock = threading.Lock()
+        self._hosts = self._load()
+        self._observed = {}
+        self._stats = {"probes": 0, "checks": 0, "skipped": 0}
+
+    def _load(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _entry(self, host):
+        return self._hosts.get(host) or {"state": UP, "failures": 0, "backoff": 0, "next_check": 0.0,
+                                         "last_ok": None}
+
+    # ------------------ Planificación ------------------
+    def state(self, host):
+        with self._lock:
+            return self._entry(host)["state"]
+
+    def plan(self, host, count, now=None):
+        """Paquetes a enviar a ``host`` en este ciclo, o None si está down y en espera."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entry(host)
+            if entry["state"] != DOWN:
+                self._stats["probes"] += 1
+                return count
+            if now < entry["next_check"]:
+                self._stats["skipped"] += 1
+                return None
+            self._stats["checks"] += 1
+            return min(count, self.check_count)
+
+    def next_check(self, host):
+        """Época de la próxima comprobación de un host down (None si no lo está)."""
+        with self._lock:
+            entry = self._entry(host)
+            return entry["next_check"] if entry["state"] == DOWN else None
+
+    # ------------------ Resultados ------------------
+    def observe(self, host, ok):
+        """Acumula el resultado de una prueba del ciclo (``ok``: recibió alguna respuesta)."""
+        with self._lock:
+            self._observed[host] = self._observed.get(host, False) or bool(ok)
+
+    def commit(self, now=None):
+        """Aplica los resultados del ciclo, guarda el estado y devuelve las transiciones.
+
+        Cada transición es ``(host, estado_anterior, estado_nuevo, entrada)``.
+        """
+        now = time.time() if now is None else now
+        transitions = []
+        with self._lock, open(self.path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Estado actual del fichero, no el leído al arrancar: otro script puede haberlo cambiado
+            self._hosts = self._load()
+            observed, self._observed = self._observed, {}
+            for host, ok in observed.items():
+                entry = dict(self._entry(host))
+                old = entry["state"]
+                if ok:
+                    entry.update(state=UP, failures=0, backoff=0, next_check=0.0, last_ok=now)
+                else:
+                    entry["failures"] += 1
+                    if old == DOWN:
+                        entry["backoff"] = min(self.max_backoff, 2 * entry["backoff"])
+                    elif entry["failures"] >= self.failure_threshold:
+                        entry.update(state=DOWN, backoff=self.base_backoff)
+                    else:
+                        entry["state"] = FAILING
+                    if entry["state"] == DOWN:
+                        entry["next_check"] = now + entry["backoff"]
+                self._hosts[host] = entry
+                if entry["state"] != old:
+                    transitions.append((host, old, entry["state"], dict(entry)))
+            self._save()
+        return transitions
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(self._hosts, file, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def stats(self):
+        """Hosts por estado y pruebas completas, comprobaciones y omisiones del ciclo."""
+        with self._lock:
+            stats = dict(self._stats)
+            for state in (UP, FAILING, DOWN):
+                stats[state] = sum(1 for entry in self._hosts.values() if entry["state"] == state)
+        return stats
+
+
+def describe(transition):
+    """Texto de una transición para syslog."""
+    host, old, new, entry = transition
+    if new == DOWN:
+        return (f"Host {host} DOWN tras {entry['failures']} ciclos sin respuesta; "
+                f"próxima comprobación en {entry['backoff']} s")
+    if new == UP:
+        return f"Host {host} recuperado ({old} -> up)"
+    return f"Host {host} {old} -> {new} ({entry['failures']} fallos seguidos)"
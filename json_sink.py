@@ -0,0 +1,131 @@
+"""Salida estructurada de resultados en JSON lines.
+
+Los resultados acababan como texto libre en syslog (``"RTT para ... Mín: ..."``),
+filas CSV ad hoc o ``print()``; los colectores tenían que usar expresiones
+regulares. ``JsonLinesSink`` escribe un objeto JSON por línea con campos fijos
+(``type``, ``ts``, ``host``, RTT y pérdida). Un host sin respuestas lleva
+los RTT a ``null``: no hay medida, no es 0 ms.
+
+``emit()`` solo encola el diccionario en un ``RecordPipeline``; un hilo
+dedicado lo codifica con un ``JSONEncoder`` creado una vez (sin comprobación
+de ciclos ni espacios) y escribe los lotes con un único descriptor abierto.
+"""
+
+import json
+import threading
+import time
+
+from pipeline import RecordPipeline
+from segments import SegmentManager
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_LATENCY = 1.0   # Segundos máximos que un registro espera antes de escribirse
+
+# Codificador reutilizado por el hilo escritor
+ENCODER = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+PROBE_EVENT = "probe"
+
+
+# ------------------ Registros ------------------
+def probe_event(host, summary, ts=None, **extra):
+    """Registro ``probe`` a partir de un resumen de ``rtt_stats.summarize_rtts``."""
+    # summarize_rtts deja los RTT a 0.0 sin respuestas; en JSON van como null
+    answered = summary["count"] > 0
+    event = {
+        "type": PROBE_EVENT,
+        "ts": time.time() if ts is None else ts,
+        "host": host,
+        "sent": summary["sent"],
+        "received": summary["count"],
+        "loss": summary["loss"],
+        "rtt_min": summary["min"] if answered else None,
+        "rtt_max": summary["max"] if answered else None,
+        "rtt_avg": summary["mean"] if answered else None,
+        "rtt_p95": summary["p95"] if answered else None,
+        "jitter": summary["jitter"] if answered else None,
+    }
+    event.update(extra)
+    return event
+
+
+def probe_error(host, sent, error, ts=None, **extra):
+    """Registro ``probe`` de un ping fallido (pérdida total, sin RTT)."""
+    event = {"type": PROBE_EVENT, "ts": time.time() if ts is None else ts, "host": host,
+             "sent": sent, "received": 0, "loss": 100.0, "error": str(error)}
+    event.update(extra)
+    return event
+
+
+# ------------------ Escritura ------------------
+class JsonLinesSink:
+    """Cola de eventos con un hilo que los codifica y escribe en JSON lines."""
+
+    def __init__(self, path, maxsize=10000, overflow="drop-oldest", batch_size=DEFAULT_BATCH_SIZE,
+                 max_latency=DEFAULT_MAX_LATENCY, rotation=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self._pipeline = RecordPipeline(maxsize=maxsize, overflow=overflow)
+        self._segments = SegmentManager(path, rotation) if rotation is not None else None
+        self._file = open(path, "a", encoding="utf-8")
+        self._stats = {"bytes": 0, "encode_seconds": 0.0, "write_seconds": 0.0}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="jsonl-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def emit(self, event):
+        """Encola un evento (dict); no codifica ni escribe en el hilo que llama."""
+        return self._pipeline.put(event)
+
+    def _run(self):
+        self._pipeline.drain(self._write_batch, batch_size=self.batch_size, max_latency=self.max_latency)
+
+    def _write_batch(self, events):
+        start = time.perf_counter()
+        encode = ENCODER.encode
+        data = "\n".join([encode(event) for event in events]) + "\n"
+        encoded = time.perf_counter()
+        self._file.write(data)
+        self._file.flush()
+        self._stats["bytes"] += len(data)
+        self._stats["encode_seconds"] += encoded - start
+        self._stats["write_seconds"] += time.perf_counter() - encoded
+        if self._segments is not None:
+            self._segments.record_write()
+            if self._segments.should_rotate(self._file.tell()):
+                self._file.close()
+                self._segments.rotate()
+                self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        """Escribe lo pendiente, cierra el fichero y espera la compresión."""
+        if self._thread is not None:
+            self._pipeline.close()
+            self._thread.join()
+            self._thread = None
+        if not self._file.closed:
+            self._file.close()
+        if self._segments is not None:
+            self._segments.close()
+
+    def stats(self):
+        """Eventos, bytes, descartes y segundos de codificación y escritura."""
+        pipeline = self._pipeline.stats()
+        return {
+            "events": pipeline["records"],
+            "bytes": self._stats["bytes"],
+            "dropped": pipeline["dropped"],
+            "encode_seconds": round(self._stats["encode_seconds"], 4),
+            "write_seconds": round(self._stats["write_seconds"], 4),
+            "latency_avg_ms": pipeline["latency_avg_ms"],
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
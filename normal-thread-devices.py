@@ -1,19 +1,28 @@
 import argparse
 import time
 import jcs
-from jnpr.junos import Device
 from junos import Junos_Context
+from lxml import etree
+from session_pool import SessionPool
+from hedging import HedgedPinger, max_count, ping_timeout
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ------------------ Configuración global ------------------
-RPC_TIMEOUT = 90  # Timeout en segundos para los RPC
+RPC_TIMEOUT = 90  # Techo del timeout de cada RPC; el plazo real sale de count y wait
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para hacer ping con RTT en Junos (on-box)")
 parser.add_argument("--count", type=int, required=True, help="Número de paquetes de ping por host")
+parser.add_argument("--sessions", type=int, default=4, help="Número de sesiones NETCONF en el pool")
+parser.add_argument("--hedge", action="store_true", help="Repite en otra sesión los pings que superan el p95 de su tamaño")
 args = parser.parse_args()
 
 COUNT = args.count
+POOL_SIZE = args.sessions
+# Un ping que no cabe en RPC_TIMEOUT vencería siempre: se rechaza antes de conectar
+if ping_timeout(COUNT) > RPC_TIMEOUT:
+    parser.error(f"--count {COUNT} necesita {ping_timeout(COUNT)} s por ping y RPC_TIMEOUT es {RPC_TIMEOUT} s "
+                 f"(máximo --count {max_count(RPC_TIMEOUT)})")
 
 # ------------------ Lista de hosts ------------------
 HOSTS_LIST = [
@@ -33,14 +42,11 @@ def log_syslog(message, level="info"):
     }
     jcs.syslog(level_map.get(level, "external.info"), message)
 
-# ------------------ Función para ejecutar ping con conexión propia ------------------
-def ping_host_with_connection(host, count):
+# ------------------ Función para ejecutar ping con una sesión del pool ------------------
+def ping_host_with_connection(pinger, host, count):
     try:
-        dev = Device(timeout=RPC_TIMEOUT)
-        dev.open()
-        log_syslog(f"Conexión abierta para host: {host}", level="info")
-
-        result = dev.rpc.ping(host=host, count=str(count))
+        # Plazo propio según count y wait; con --hedge, copia en otra sesión si se retrasa
+        result = pinger.ping(host, count)
         print(etree.tostring(result, pretty_print=True).decode())
 
         target_host = result.findtext("target-host", host).strip()
@@ -54,9 +60,6 @@ def ping_host_with_connection(host, count):
         )
         log_syslog(message, level="info")
 
-        dev.close()
-        log_syslog(f"Conexión cerrada para host: {host}", level="info")
-
         return message
 
     except Exception as e:
@@ -69,18 +72,25 @@ def ping_host_with_connection(host, count):
 
 # ------------------ Función principal ------------------
 def main():
-    log_syslog("Iniciando pruebas de conectividad paralelas (una conexión por host)", level="info")
+    log_syslog(f"Iniciando pruebas de conectividad paralelas (pool de {POOL_SIZE} sesiones)", level="info")
     output_messages = []
     start_time = time.time()
 
     try:
-        with ThreadPoolExecutor(max_workers=len(HOSTS_LIST)) as executor:
-            future_to_host = {executor.submit(ping_host_with_connection, host, COUNT): host for host in HOSTS_LIST}
+        with SessionPool(size=POOL_SIZE, timeout=RPC_TIMEOUT) as pool, \
+                HedgedPinger(pool, hedge=args.hedge, max_timeout=RPC_TIMEOUT,
+                             max_workers=2 * len(HOSTS_LIST)) as pinger, \
+                ThreadPoolExecutor(max_workers=len(HOSTS_LIST)) as executor:
+            log_syslog(f"Timeout por RPC: {pinger.timeout(COUNT)} segundos (count={COUNT})", level="info")
+            future_to_host = {executor.submit(ping_host_with_connection, pinger, host, COUNT): host for host in HOSTS_LIST}
 
             for future in as_completed(future_to_host):
                 result = future.result()
                 output_messages.append(result)
 
+            log_syslog(f"Estadísticas del pool de sesiones: {pool.stats()}", level="info")
+            log_syslog(f"Plazos y copias de ping: {pinger.stats()}", level="info")
+
         end_time = time.time()
         duration = round(end_time - start_time, 2)
         log_syslog(f"Tiempo total de ejecución del script: {duration} segundos", level="info")
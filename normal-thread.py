@@ -2,19 +2,31 @@ import argparse
 import time
 import os
 import jcs
-from jnpr.junos import Device
 from junos import Junos_Context
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from jnpr.junos.exception import RpcTimeoutError
+from coalesce import SingleFlight, ping_key
+from probe_engine import run_probes
+from aimd import AimdController
+from rtt_stats import parse_probe_rtts, summarize_rtts
+from json_sink import JsonLinesSink, probe_event, probe_error
+from hedging import DEFAULT_WAIT, max_count, ping_timeout
+from session_pool import SessionPool
 
 # ------------------ Configuracion global ------------------
-RPC_TIMEOUT = 90  # Timeout para RPC en segundos
+RPC_TIMEOUT = 90  # Techo del timeout de cada RPC; el plazo real sale de count y wait
+JSONL_FILENAME = "/var/db/scripts/op/ping_results.jsonl"  # Un resultado JSON por linea
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para hacer ping con RTT en Junos (on-box)")
 parser.add_argument("--count", type=int, required=True, help="Numero de paquetes de ping por host")
 args = parser.parse_args()
 COUNT = args.count
+# Plazo por ping: envio de COUNT paquetes + espera del ultimo + margen. Si no cabe en
+# RPC_TIMEOUT el ping venceria siempre: se rechaza antes de lanzar nada
+PROBE_TIMEOUT = ping_timeout(COUNT)
+if PROBE_TIMEOUT > RPC_TIMEOUT:
+    parser.error(f"--count {COUNT} necesita {PROBE_TIMEOUT} s por ping y RPC_TIMEOUT es {RPC_TIMEOUT} s "
+                 f"(maximo --count {max_count(RPC_TIMEOUT)})")
 
 # ------------------ Lista de hosts ------------------
 HOSTS_LIST = [
@@ -22,8 +34,16 @@ HOSTS_LIST = [
 ]*5
 
 # ------------------ Numero de hilos ------------------
+# Techo de RPC en vuelo; el control AIMD decide cuantas usar dentro del techo
 MAX_WORKERS = len(HOSTS_LIST)
 
+# ------------------ Coalescencia de pings duplicados ------------------
+single_flight = SingleFlight()
+
+# ------------------ Salida estructurada (hilo escritor propio) ------------------
+# Son resultados, no telemetria: con la cola llena el hilo espera en vez de descartar
+result_sink = JsonLinesSink(JSONL_FILENAME, overflow="block")
+
 # ------------------ Funcion de log ------------------
 def log_syslog(message, thread_id=None, level="info"):
     level_map = {
@@ -37,15 +57,25 @@ def log_syslog(message, thread_id=None, level="info"):
 
 # ------------------ Funcion para hacer ping ------------------
 def ping_host(dev_params):
-    dev, host, count, thread_id = dev_params
+    pool, host, count, thread_id = dev_params
+
+    def rpc():
+        # Cada RPC usa una sesion propia del pool: un Device no admite RPC concurrentes
+        with pool.session() as dev:
+            return dev.rpc.ping(host=host, count=str(count), wait=str(DEFAULT_WAIT),
+                                dev_timeout=ping_timeout(count))
+
     try:
         log_syslog(f"Iniciando ping a {host}", thread_id, level="info")
-        result = dev.rpc.ping(host=host, count=str(count))
+        # Los pings identicos en vuelo comparten una sola RPC
+        result = single_flight.do(ping_key(host, count), rpc)
 
         target_host = result.findtext("target-host", host).strip()
         rtt_min = result.findtext("probe-results-summary/rtt-minimum", "N/A").strip()
         rtt_max = result.findtext("probe-results-summary/rtt-maximum", "N/A").strip()
         rtt_avg = result.findtext("probe-results-summary/rtt-average", "N/A").strip()
+        rtts, sent = parse_probe_rtts(result)
+        result_sink.emit(probe_event(target_host, summarize_rtts(rtts, sent), thread=thread_id))
 
         message = (
             f"Ping a {target_host} | Hora: {Junos_Context.get('localtime', 'N/A')} | "
@@ -59,6 +89,7 @@ def ping_host(dev_params):
             f"Timeout en ping a {host} | Hora: {Junos_Context.get('localtime', 'N/A')} | Detalle: {str(e)}"
         )
         log_syslog(message, thread_id, level="error")
+        result_sink.emit(probe_error(host, count, "timeout", thread=thread_id))
         return f"{host} | Timeout"
 
     except Exception as e:
@@ -66,6 +97,7 @@ def ping_host(dev_params):
             f"Error en ping a {host} | Hora: {Junos_Context.get('localtime', 'N/A')} | Detalle: {str(e)}"
         )
         log_syslog(message, thread_id, level="error")
+        result_sink.emit(probe_error(host, count, e, thread=thread_id))
         return f"{host} | Error: {str(e)}"
 
 # ------------------ Funcion principal ------------------
@@ -73,26 +105,31 @@ def main():
     log_syslog("Inicio de pruebas de conectividad", level="info")
     start_time = time.time()
     output_messages = []
+    result_sink.start()
 
     try:
-        dev = Device(timeout=RPC_TIMEOUT, gather_facts=True)
-        dev.open()
-        log_syslog("Conexion establecida con el dispositivo", level="info")
-        log_syslog(f"Timeout RPC: {dev.timeout} segundos", level="info")
-        log_syslog(f"Numero de hilos paralelos: {MAX_WORKERS}", level="info")
-
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {
-                executor.submit(ping_host, (dev, host, COUNT, idx + 1)): host
-                for idx, host in enumerate(HOSTS_LIST)
-            }
-
-            for i, future in enumerate(as_completed(futures), start=1):
-                msg = future.result()
+        with SessionPool(size=MAX_WORKERS, timeout=RPC_TIMEOUT) as pool:
+            with pool.session():
+                log_syslog("Conexion establecida con el dispositivo", level="info")
+            log_syslog(f"Timeout RPC: {pool.timeout} segundos (por ping: {PROBE_TIMEOUT})", level="info")
+            log_syslog(f"Numero maximo de hilos paralelos: {MAX_WORKERS}", level="info")
+
+            controller = AimdController(maximum=MAX_WORKERS, log=lambda message: log_syslog(message, level="info"))
+            results = run_probes(
+                ping_host,
+                [(pool, host, COUNT, idx + 1) for idx, host in enumerate(HOSTS_LIST)],
+                concurrency=MAX_WORKERS,
+                timeout=PROBE_TIMEOUT,
+                on_timeout=lambda params: f"{params[1]} | Timeout",
+                controller=controller,
+            )
+            for i, (_, msg) in enumerate(results, start=1):
                 output_messages.append(f"{i}. {msg}")
 
-        dev.close()
         log_syslog("Conexion cerrada con el dispositivo", level="info")
+        log_syslog(f"Estadisticas del pool de sesiones: {pool.stats()}", level="info")
+        log_syslog(f"Coalescencia de pings: {single_flight.stats()}", level="info")
+        log_syslog(f"Concurrencia AIMD: {controller.stats()}", level="info")
 
         end_time = time.time()
         duration = round(end_time - start_time, 2)
@@ -106,6 +143,10 @@ def main():
     except Exception as e:
         log_syslog(f"Error al conectar con el dispositivo: {str(e)}", level="error")
         print(f"Error al conectar con el dispositivo: {str(e)}")
+    finally:
+        # El hilo escritor siempre recibe el fin de flujo
+        result_sink.close()
+    log_syslog(f"Resultados JSON: {result_sink.stats()}", level="info")
 
 # ------------------ Entrada principal ------------------
 if __name__ == "__main__":
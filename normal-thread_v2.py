@@ -1,12 +1,13 @@
 import argparse
 import time
 import jcs
-from jnpr.junos import Device
 from junos import Junos_Context
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from session_pool import SessionPool
 
 # ------------------ Configuración global ------------------
 RPC_TIMEOUT = 90  # Timeout en segundos para los RPC
+POOL_SIZE = 4     # Sesiones NETCONF abiertas a la vez (y pings en paralelo)
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para hacer ping con RTT en Junos (on-box)")
@@ -34,9 +35,11 @@ def log_syslog(message, level="info"):
     jcs.syslog(level_map.get(level, "external.info"), message)
 
 # ------------------ Función para ejecutar ping ------------------
-def ping_host(dev, host, count):
+def ping_host(pool, host, count):
     try:
-        result = dev.rpc.ping(host=host, count=str(count))
+        # Un Device no admite RPC concurrentes: cada hilo toma su propia sesión del pool
+        with pool.session() as dev:
+            result = dev.rpc.ping(host=host, count=str(count))
 
         target_host = result.findtext("target-host", host).strip()
         rtt_min = result.findtext("probe-results-summary/rtt-minimum", "N/A").strip()
@@ -65,20 +68,20 @@ def main():
     start_time = time.time()
 
     try:
-        dev = Device(timeout=RPC_TIMEOUT)
-        dev.open()
-        log_syslog("Conexión abierta con el dispositivo", level="info")
-        log_syslog(f"Timeout RPC configurado: {dev.timeout} segundos", level="info")
+        with SessionPool(size=POOL_SIZE, timeout=RPC_TIMEOUT) as pool:
+            with pool.session():
+                log_syslog("Conexión abierta con el dispositivo", level="info")
+            log_syslog(f"Timeout RPC configurado: {pool.timeout} segundos", level="info")
 
-        with ThreadPoolExecutor(max_workers=len(HOSTS_LIST)) as executor:
-            future_to_host = {executor.submit(ping_host, dev, host, COUNT): host for host in HOSTS_LIST}
+            with ThreadPoolExecutor(max_workers=POOL_SIZE) as executor:
+                future_to_host = {executor.submit(ping_host, pool, host, COUNT): host for host in HOSTS_LIST}
 
-            for future in as_completed(future_to_host):
-                result = future.result()
-                output_messages.append(result)
+                for future in as_completed(future_to_host):
+                    result = future.result()
+                    output_messages.append(result)
 
-        dev.close()
         log_syslog("Conexión cerrada con el dispositivo", level="info")
+        log_syslog(f"Estadísticas del pool de sesiones: {pool.stats()}", level="info")
 
         end_time = time.time()
         time_duration = round(end_time - start_time, 2)
@@ -1,34 +1,38 @@
 import argparse
-import jcs
 import psutil
-import csv
 import time
-import os
 import threading
-import queue
 import sys
 import subprocess
+from csv_writer import BatchCsvWriter
+from pipeline import RecordPipeline, OVERFLOW_POLICIES
+from syslog_emitter import SyslogEmitter
+from segments import RotationPolicy
 
 # Argumentos desde CLI
 parser = argparse.ArgumentParser(description="Monitoreo de sistema en JUNOS")
 parser.add_argument("--count", type=int, default=1, help="Numero de iteraciones")
 parser.add_argument("--max_time", type=int, default=60, help="Tiempo maximo de monitoreo en segundos")
+parser.add_argument("--queue_size", type=int, default=10000, help="Tamano maximo de la cola de registros")
+parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="drop-oldest", help="Politica al llenarse la cola")
 args = parser.parse_args()
 
 # Configuracion
 LOG_INTERVAL = 1
+BATCH_SIZE = 200         # Filas maximas por escritura
+MAX_WRITE_LATENCY = 1.0  # Segundos maximos que una fila espera antes de escribirse
 COUNT = args.count
 MAX_MONITOR_TIME = args.max_time
 csv_filename = "/var/db/scripts/op/system_monitor.csv"
+# Rotacion por tamano/antiguedad, gzip en segundo plano y presupuesto total de disco
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
 
-data_queue = queue.Queue()
+data_queue = RecordPipeline(maxsize=args.queue_size, overflow=args.overflow)
 monitoring_done = threading.Event()
+# Syslog agrupado y con limites por severidad, fuera del camino de los pings
+log = SyslogEmitter()
 
-# Verificar existencia del archivo CSV
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)"])
+CSV_HEADER = ["Timestamp", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)"]
 
 def convert_bytes(value, unit):
     """Convierte bytes a MB o GB."""
@@ -38,7 +42,7 @@ def convert_bytes(value, unit):
 def log_system_usage():
     """Registra CPU, memoria y disco en JUNOS."""
     start_time = time.time()
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
 
     while not monitoring_done.is_set():
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -57,46 +61,51 @@ def log_system_usage():
                    f"Disco: {disk_percent}% usado ({disk_free_gb} GB libres)")
         
         try:
-            jcs.syslog("external.warning", log_msg)
+            log.syslog("external.warning", log_msg, key="system-usage")
         except Exception as e:
-            jcs.syslog("external.error", f"Error en syslog: {str(e)}")
+            log.syslog("external.error", f"Error en syslog: {str(e)}")
 
         data_queue.put([timestamp, cpu_percent, memoria_porcentaje, memoria_usada, memoria_libre, disk_percent, disk_free_gb])
 
         if time.time() - start_time >= MAX_MONITOR_TIME:
-            jcs.syslog("external.warning", "[MONITOREO] Tiempo maximo alcanzado, deteniendo monitoreo.")
+            log.syslog("external.warning", "[MONITOREO] Tiempo maximo alcanzado, deteniendo monitoreo.")
             monitoring_done.set()
             break
 
-        time.sleep(LOG_INTERVAL)
+        monitoring_done.wait(LOG_INTERVAL)
 
 def write_to_csv():
-    """Escribe los datos en el archivo CSV."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
-    while not monitoring_done.is_set() or not data_queue.empty():
-        while not data_queue.empty():
+    """Escribe los datos en el archivo CSV a medida que llegan a la cola."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
+
+    # El escritor vuelca por su cuenta al llegar a BATCH_SIZE filas o MAX_WRITE_LATENCY segundos
+    with BatchCsvWriter(csv_filename, header=CSV_HEADER, rotation=ROTATION,
+                        batch_size=BATCH_SIZE, flush_interval=MAX_WRITE_LATENCY) as writer:
+        def write_batch(rows):
             try:
-                with open(csv_filename, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_queue.get())
+                writer.writerows(rows)
             except Exception as e:
-                jcs.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
-        time.sleep(1)
-    jcs.syslog("external.warning", "[MONITOREO] Escritura en CSV finalizada.")
+                log.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
+
+        # Bloquea hasta que hay registros; termina al recibir el fin de flujo
+        data_queue.drain(write_batch, batch_size=BATCH_SIZE, max_latency=MAX_WRITE_LATENCY)
+
+    log.syslog("external.warning", f"[MONITOREO] Escritura en CSV finalizada: {writer.stats()} | Cola: {data_queue.stats()}")
 
 def test_subprocess():
     """Ejecuta un comando y captura errores."""
     try:
         result = subprocess.run(["ls", "-l", "/var/db/scripts/op/"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        jcs.syslog("external.warning", f"Salida de ls: {result.stdout.strip()}")
+        log.syslog("external.warning", f"Salida de ls: {result.stdout.strip()}")
         if result.stderr:
-            jcs.syslog("external.error", f"Error en ls: {result.stderr.strip()}")
+            log.syslog("external.error", f"Error en ls: {result.stderr.strip()}")
     except Exception as e:
-        jcs.syslog("external.error", f"Fallo en subprocess: {str(e)}")
+        log.syslog("external.error", f"Fallo en subprocess: {str(e)}")
 
 def main():
     """Inicia el monitoreo."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando sistema...")
+    log.start()
+    log.syslog("external.warning", "[MONITOREO] Iniciando sistema...")
 
     start_time = time.time()
 
@@ -106,12 +115,17 @@ def main():
     thread_sys.start()
     thread_csv.start()
 
-    thread_sys.join()
-    monitoring_done.set()
-    thread_csv.join()
+    try:
+        thread_sys.join()
+    finally:
+        # El escritor siempre recibe el fin de flujo y no se queda bloqueado en drain
+        monitoring_done.set()
+        data_queue.close()
+        thread_csv.join()
 
     total_time = round(time.time() - start_time, 3)
-    jcs.syslog("external.warning", f"[FINALIZACION] Monitorizacion completa en {total_time} segundos.")
+    log.syslog("external.warning", f"[FINALIZACION] Monitorizacion completa en {total_time} segundos.")
+    log.close()
 
 if __name__ == "__main__":
     test_subprocess()  # Prueba ejecución de comandos
@@ -3,17 +3,22 @@
 import argparse
 import time
 import jcs
-from jnpr.junos import Device
+from session_pool import SessionPool
+from rtt_stats import parse_probe_rtts
+from rtt_sketch import RttSketch
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para pruebas de ping con RTT en Junos (multihilo)")
 parser.add_argument("--count", type=int, required=True, help="Numero total de paquetes por host")
 parser.add_argument("--chunk", type=int, default=10, help="Tamano de cada bloque de pings")
+parser.add_argument("--sessions", type=int, default=4, help="Numero de sesiones NETCONF en el pool")
 args = parser.parse_args()
 
 COUNT = args.count
 CHUNK_SIZE = args.chunk
+POOL_SIZE = args.sessions
+RPC_TIMEOUT = 120
 
 # ------------------ Lista de hosts ------------------
 HOSTS_LIST = [
@@ -30,38 +35,33 @@ def log_syslog(msg, level="info"):
     jcs.syslog(levels.get(level, "external.info"), msg)
 
 # ------------------ Funcion de ejecucion de ping ------------------
-def ejecutar_ping(dev_timeout, host, chunk_id, start_pkt, count):
+def ejecutar_ping(pool, host, chunk_id, start_pkt, count):
     try:
-        dev = Device()
-        dev.timeout = dev_timeout
-        dev.open()
-
-        result = dev.rpc.ping(host=host, count=str(count))
+        with pool.session() as dev:
+            result = dev.rpc.ping(host=host, count=str(count))
 
         rtt_min = float(result.findtext("probe-results-summary/rtt-minimum", "0").strip())
         rtt_max = float(result.findtext("probe-results-summary/rtt-maximum", "0").strip())
         rtt_avg = float(result.findtext("probe-results-summary/rtt-average", "0").strip())
-
-        dev.close()
+        rtts, enviados = parse_probe_rtts(result)
 
         log_syslog(
             f"OK - Chunk {chunk_id} ({start_pkt + 1}-{start_pkt + count}) ping a {host} | Min: {rtt_min} ms | Max: {rtt_max} ms | Prom: {rtt_avg} ms"
         )
 
-        return {"min": rtt_min, "max": rtt_max, "avg": rtt_avg}
+        return RttSketch().add_probe(rtts, enviados)
 
     except Exception as e:
         log_syslog(
             f"ERROR - Chunk {chunk_id} ({start_pkt + 1}-{start_pkt + count}) fallo ping a {host} | Detalle: {str(e)}",
             level="error"
         )
-        return {"min": 0.0, "max": 0.0, "avg": 0.0}
+        return RttSketch().add_probe((), count)
 
 # ------------------ Funcion de resumen RTT ------------------
-def calcular_resumen(mins, maxs, avgs):
-    if not mins or not maxs or not avgs:
-        return "0", "0", "0"
-    return str(min(mins)), str(max(maxs)), str(round(sum(avgs) / len(avgs), 2))
+def calcular_resumen(sketch):
+    """Resumen a partir del sketch combinado de todos los bloques."""
+    return sketch.summary()
 
 # ------------------ Funcion principal ------------------
 def main():
@@ -69,50 +69,47 @@ def main():
     inicio = time.time()
 
     try:
-        dev = Device()
-        dev.timeout = 120
-        dev.open()
-        log_syslog("Conexion con el dispositivo exitosa")
-        dev.close()
-
-        for host in HOSTS_LIST:
-            total_chunks = (COUNT + CHUNK_SIZE - 1) // CHUNK_SIZE
-            log_syslog(f"Iniciando ping a {host} con {COUNT} paquetes en {total_chunks} bloques")
-
-            resultados_min = []
-            resultados_max = []
-            resultados_avg = []
-
-            dev_timeout = 120
-
-            with ThreadPoolExecutor(max_workers=total_chunks) as executor:
-                futures = []
-
-                for i in range(total_chunks):
-                    inicio_chunk = i * CHUNK_SIZE
-                    cantidad = min(CHUNK_SIZE, COUNT - inicio_chunk)
-                    futures.append(
-                        executor.submit(
-                            ejecutar_ping,
-                            dev_timeout,
-                            host,
-                            i + 1,
-                            inicio_chunk,
-                            cantidad
+        with SessionPool(size=POOL_SIZE, timeout=RPC_TIMEOUT) as pool:
+            with pool.session():
+                log_syslog("Conexion con el dispositivo exitosa")
+
+            for host in HOSTS_LIST:
+                total_chunks = (COUNT + CHUNK_SIZE - 1) // CHUNK_SIZE
+                log_syslog(f"Iniciando ping a {host} con {COUNT} paquetes en {total_chunks} bloques")
+
+                sketch = RttSketch()
+
+                with ThreadPoolExecutor(max_workers=min(total_chunks, POOL_SIZE)) as executor:
+                    futures = []
+
+                    for i in range(total_chunks):
+                        inicio_chunk = i * CHUNK_SIZE
+                        cantidad = min(CHUNK_SIZE, COUNT - inicio_chunk)
+                        futures.append(
+                            executor.submit(
+                                ejecutar_ping,
+                                pool,
+                                host,
+                                i + 1,
+                                inicio_chunk,
+                                cantidad
+                            )
                         )
-                    )
 
-                for future in as_completed(futures):
-                    r = future.result()
-                    resultados_min.append(r["min"])
-                    resultados_max.append(r["max"])
-                    resultados_avg.append(r["avg"])
+                    for future in as_completed(futures):
+                        sketch.merge(future.result())
+
+                resumen = calcular_resumen(sketch)
 
-            final_min, final_max, final_avg = calcular_resumen(resultados_min, resultados_max, resultados_avg)
+                log_syslog(
+                    f"RESUMEN - Host: {host} | Minimo: {resumen['min']} ms | Maximo: {resumen['max']} ms | "
+                    f"Promedio: {round(resumen['mean'], 2)} ms | Desv: {round(resumen['stddev'], 2)} ms | "
+                    f"P50: {round(resumen['p50'], 2)} ms | P95: {round(resumen['p95'], 2)} ms | "
+                    f"P99: {round(resumen['p99'], 2)} ms | Jitter: {round(resumen['jitter'], 2)} ms | "
+                    f"Perdida: {resumen['loss']}%"
+                )
 
-            log_syslog(
-                f"RESUMEN - Host: {host} | Minimo: {final_min} ms | Maximo: {final_max} ms | Promedio: {final_avg} ms"
-            )
+        log_syslog(f"Estadisticas del pool de sesiones: {pool.stats()}")
 
         fin = time.time()
         log_syslog(f"Tiempo total de ejecucion: {round(fin - inicio, 2)} segundos")
@@ -1,100 +1,116 @@
-import jcs
-import psutil
-import csv
 import time
-import os
 import threading
-import queue
 import argparse
 from jnpr.junos import Device
+from system_sampler import SystemSampler
+from records import StreamWriters, system_record, probe_record
+from pipeline import RecordPipeline, OVERFLOW_POLICIES
+from syslog_emitter import SyslogEmitter
+from segments import RotationPolicy
+from governor import ResourceGovernor
+from deadline import RunDeadline, SKIPPED_RESULT, load_pending, prioritize
 
 # Configuración de argumentos
 parser = argparse.ArgumentParser(description="Monitoreo de sistema y ping a hosts.")
 parser.add_argument("--count", type=int, default=1, help="Número de pings por host.")
 parser.add_argument("--max-time", type=int, default=60, help="Tiempo máximo de monitoreo en segundos.")
+parser.add_argument("--queue-size", type=int, default=10000, help="Tamaño máximo de la cola de registros.")
+parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="drop-oldest", help="Política al llenarse la cola.")
+parser.add_argument("--max-cpu", type=float, default=80.0, help="CPU del RE (%%) a partir de la cual se frenan pings y escrituras.")
+parser.add_argument("--max-mem", type=float, default=90.0, help="Memoria del RE (%%) a partir de la cual se frenan pings y escrituras.")
+parser.add_argument("--max-self-cpu", type=float, default=25.0, help="CPU del propio script (%% de un núcleo) a partir de la cual se frena.")
+parser.add_argument("--max-rss-mb", type=float, default=256.0, help="RSS del propio script (MB) a partir de la cual se frena.")
+parser.add_argument("--reserve", type=float, default=5.0, help="Segundos de --max-time reservados para vaciar colas y cerrar ficheros.")
 args = parser.parse_args()
 
 COUNT = args.count
 MAX_MONITOR_TIME = args.max_time
 LOG_INTERVAL = 1
-csv_filename = "/var/db/scripts/op/system_monitor.csv"
-
-# Lista de hosts
+BATCH_SIZE = 200         # Filas máximas por escritura
+MAX_WRITE_LATENCY = 1.0  # Segundos máximos que una fila espera antes de escribirse
+system_filename = "/var/db/scripts/op/system_samples.csv"
+probe_filename = "/var/db/scripts/op/probe_results.csv"
+# Rotación por tamaño/antigüedad, gzip en segundo plano y un presupuesto común a los dos flujos
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
+# Hosts no probados en el ciclo anterior por falta de tiempo (se prueban antes en el siguiente)
+pending_filename = "/var/db/scripts/op/pending_hosts_max_monitor.json"
+
+# Lista de hosts y prioridad opcional por host (menor = antes; sin entrada = 100)
 HOSTS_LIST = ["204.124.107.82", "204.124.107.83", "204.124.107.84"]
+HOST_PRIORITY = {}
 
-data_queue = queue.Queue()
+data_queue = RecordPipeline(maxsize=args.queue_size, overflow=args.overflow)
 monitoring_done = threading.Event()
-
-# Crear archivo CSV si no existe
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "CPU (%)", "Memoria (%)", "Disco (%)", "Host", "Ping"])
+# Cada muestra se escribe en el flujo system desde el propio hilo del muestreador
+sampler = SystemSampler(interval=LOG_INTERVAL, on_sample=lambda snapshot: record_sample(snapshot))
+# Syslog agrupado y con límites por severidad, fuera del camino de los pings
+log = SyslogEmitter()
+# Frena pings y escrituras mientras el RE o el propio script superan sus techos
+governor = ResourceGovernor(
+    # Sin esperar a la primera muestra: hasta entonces solo cuentan los techos del propio script
+    sample_fn=lambda: sampler.latest(wait=False)[0],
+    max_cpu=args.max_cpu,
+    max_mem=args.max_mem,
+    max_self_cpu=args.max_self_cpu,
+    max_rss_mb=args.max_rss_mb,
+    log=lambda message: log.syslog("external.notice", message, key="governor"),
+)
+# Plazo global: los pings terminan antes de --max-time menos la reserva de vaciado
+deadline = RunDeadline(MAX_MONITOR_TIME, reserve=args.reserve, estimate=COUNT + 1)
 
 def get_system_usage():
-    """Obtiene métricas del sistema (CPU, Memoria y Disco)."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    cpu_percent = round(psutil.cpu_percent(interval=1), 2)
-    
-    mem = psutil.virtual_memory()
-    mem_percent = round((mem.used / mem.total) * 100, 2) if mem.total > 0 else 0.00
-    
-    disk = psutil.disk_usage('/')
-    disk_percent = round(disk.percent, 2)
-    
-    return timestamp, cpu_percent, mem_percent, disk_percent
-
-def log_system_usage():
-    """Registra el uso del sistema y lo guarda en la cola."""
-    start_time = time.time()
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
-
-    while not monitoring_done.is_set():
-        timestamp, cpu_percent, mem_percent, disk_percent = get_system_usage()
-        jcs.syslog("external.warning", f"[{timestamp}] CPU: {cpu_percent}%, Memoria: {mem_percent}%, Disco: {disk_percent}%")
+    """Devuelve la última muestra del sistema (CPU, Memoria y Disco) y su edad, sin esperar."""
+    return sampler.latest()
 
-        for host in HOSTS_LIST:
-            data_queue.put((timestamp, cpu_percent, mem_percent, disk_percent, host, "N/A"))
+def record_sample(snapshot):
+    """Registra cada muestra del sistema una sola vez; la llama el muestreador al publicarla."""
+    log.syslog("external.warning", f"[{snapshot.timestamp}] CPU: {snapshot.cpu_percent}%, Memoria: {snapshot.mem_percent}%, Disco: {snapshot.disk_percent}%", key="system-usage")
+    data_queue.put(system_record(snapshot))
 
-        if time.time() - start_time >= MAX_MONITOR_TIME:
-            jcs.syslog("external.warning", "[MONITOREO] Tiempo máximo alcanzado, deteniendo monitoreo.")
-            monitoring_done.set()
-            break
-
-        time.sleep(LOG_INTERVAL)
+def log_system_usage():
+    """Detiene el monitoreo al alcanzar el tiempo máximo (las muestras las entrega el muestreador)."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
+    if not monitoring_done.wait(MAX_MONITOR_TIME):
+        log.syslog("external.warning", "[MONITOREO] Tiempo máximo alcanzado, deteniendo monitoreo.")
+        monitoring_done.set()
 
-def ping_host(dev, host):
+def ping_host(dev, host, timeout):
     """Realiza un ping a un host y guarda el resultado."""
     try:
-        result = dev.rpc.ping(host=host, count=str(COUNT))
+        result = dev.rpc.ping(host=host, count=str(COUNT), dev_timeout=max(1, timeout))
         target_host = result.findtext("target-host", host).strip()
-        jcs.syslog("external.warning", f"Ping exitoso a {target_host}")
+        log.syslog("external.warning", f"Ping exitoso a {target_host}", key="ping-ok", host=host)
         return "Éxito"
     except Exception as e:
-        jcs.syslog("external.crit", f"Error en ping a {host}: {e}")
+        log.syslog("external.crit", f"Error en ping a {host}: {e}")
         return "Fallo"
 
 def write_to_csv():
-    """Escribe los datos en el archivo CSV en tiempo real."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
-
-    while not monitoring_done.is_set() or not data_queue.empty():
-        while not data_queue.empty():
+    """Escribe muestras y resultados en sus archivos CSV a medida que llegan a la cola."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
+
+    with StreamWriters(system_filename, probe_filename, rotation=ROTATION,
+                       batch_size=BATCH_SIZE, flush_interval=MAX_WRITE_LATENCY) as writers:
+        def write_batch(records):
+            # Tras el fin del ciclo las escrituras ya no se frenan: hay que vaciar la cola
+            governor.throttle("write", max_wait=deadline.remaining())
             try:
-                with open(csv_filename, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(data_queue.get())
+                writers.write_batch(records)
             except Exception as e:
-                jcs.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
-        time.sleep(1)
+                log.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
 
-    jcs.syslog("external.warning", "[MONITOREO] Escritura en CSV finalizada.")
+        # Bloquea hasta que hay registros; termina al recibir el fin de flujo
+        data_queue.drain(write_batch, batch_size=BATCH_SIZE, max_latency=MAX_WRITE_LATENCY)
+
+    log.syslog("external.warning", f"[MONITOREO] Escritura en CSV finalizada: {writers.stats()} | Cola: {data_queue.stats()}")
 
 def main():
     """Inicia monitoreo y ejecuta ping a cada host en `HOSTS_LIST`."""
-    jcs.syslog("external.warning", f"[MONITOREO] Iniciando con COUNT={COUNT}, MAX_TIME={MAX_MONITOR_TIME}s")
+    log.start()
+    log.syslog("external.warning", f"[MONITOREO] Iniciando con COUNT={COUNT}, MAX_TIME={MAX_MONITOR_TIME}s")
 
     start_time = time.time()
+    sampler.start()
     thread_sys = threading.Thread(target=log_system_usage)
     thread_csv = threading.Thread(target=write_to_csv)
 
@@ -105,23 +121,46 @@ def main():
         dev = Device()
         dev.open()
 
-        for host in HOSTS_LIST:
-            ping_result = ping_host(dev, host)
-            timestamp, cpu_percent, mem_percent, disk_percent = get_system_usage()
-            data_queue.put((timestamp, cpu_percent, mem_percent, disk_percent, host, ping_result))
+        for host in prioritize(HOSTS_LIST, HOST_PRIORITY, load_pending(pending_filename)):
+            if not deadline.admits():
+                # No cabe en el tiempo restante: se registra como omitido sin lanzarlo
+                deadline.skip(host)
+                ping_result = SKIPPED_RESULT
+            else:
+                governor.throttle("probe", max_wait=deadline.remaining())
+                probe_start = time.monotonic()
+                ping_result = ping_host(dev, host, deadline.timeout(dev.timeout))
+                if ping_result == "Éxito":
+                    deadline.observe(time.monotonic() - probe_start)
+                elif deadline.expired():
+                    deadline.cancel(host)
+                    ping_result = SKIPPED_RESULT
+            snapshot, age = get_system_usage()
+            data_queue.put(probe_record(snapshot, age, host, ping_result))
 
         dev.close()
     except Exception as e:
-        jcs.syslog("external.crit", f"Error al conectar con JUNOS: {str(e)}")
-
-    # Finaliza monitoreo cuando terminan los pings
-    monitoring_done.set()
-    
-    thread_sys.join()
-    thread_csv.join()
+        log.syslog("external.crit", f"Error al conectar con JUNOS: {str(e)}")
+    finally:
+        # Finaliza monitoreo cuando terminan los pings; el escritor siempre recibe
+        # el fin de flujo y no se queda bloqueado en drain
+        monitoring_done.set()
+        thread_sys.join()
+        # Sin muestras nuevas antes de cerrar la cola
+        sampler.stop()
+        data_queue.close()
+        thread_csv.join()
+
+    log.syslog("external.notice", f"[MONITOREO] Plazo global: {deadline.report()}")
+    try:
+        deadline.save_pending(pending_filename)
+    except OSError as e:
+        log.syslog("external.error", f"Error al guardar hosts pendientes: {str(e)}")
 
     total_time = round(time.time() - start_time, 3)
-    jcs.syslog("external.warning", f"[FINALIZACION] Monitorización completa en {total_time} segundos.")
+    log.syslog("external.notice", f"[MONITOREO] Freno por recursos: {governor.stats()}")
+    log.syslog("external.warning", f"[FINALIZACION] Monitorización completa en {total_time} segundos.")
+    log.close()
 
 if __name__ == "__main__":
     main()
@@ -5,7 +5,7 @@ import time
 import os
 import threading
 import queue
-from jnpr.junos import Device
+from session_pool import SessionPool
 
 # Configuracion
 LOG_INTERVAL = 5
@@ -16,6 +16,8 @@ MAX_MONITOR_TIME = 60
 
 data_queue = queue.Queue()
 monitoring_done = threading.Event()
+# Una sola sesion NETCONF reutilizada por todos los hosts (antes se abria una por host)
+pool = SessionPool(size=1)
 
 # Verificar existencia del archivo CSV y crear encabezados si es necesario
 if not os.path.exists(csv_filename):
@@ -65,7 +67,7 @@ def ping_hosts():
     jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo de conectividad de red...")
     for host in HOSTS_LIST:
         try:
-            with Device() as dev:
+            with pool.session() as dev:
                 result = dev.rpc.ping(host=host, count=str(COUNT))
                 log_msg = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Ping a {host} completado."
                 jcs.syslog("external.warning", log_msg)
@@ -74,6 +76,7 @@ def ping_hosts():
         except Exception:
             jcs.syslog("external.critical", f"[ERROR] Fallo en ping a {host}")
 
+    pool.close()
     jcs.syslog("external.warning", "[MONITOREO] Todos los pings han finalizado. Deteniendo monitoreo del sistema...")
     monitoring_done.set()
 
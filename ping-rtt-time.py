@@ -1,24 +1,51 @@
 import jcs
+import subprocess
 import time
-from jnpr.junos import Device
 from junos import Junos_Context
+from hedging import ping_timeout
+from rtt_stats import stream_probe_rtts, summarize_rtts, timed_parse
 
 # Constantes
 HOSTS_LIST = ["204.124.107.83"]
 COUNT = 1000
+CLI = "/usr/sbin/cli"  # CLI de Junos: su salida XML se lee de la tubería mientras llega
 
-def ping_host(dev, host):
+def ping_stream(host, count=COUNT):
+    """Ping por la CLI con la respuesta XML en bruto; devuelve ``(rtts, enviados)``.
+
+    Con ``count`` grande la respuesta del RPC materializada por PyEZ ocupa
+    memoria proporcional a ``count``; aquí cada ``probe-result`` se parsea y
+    se descarta según sale de la tubería.
+    """
+    command = f"ping {host} count {count} | display xml | no-more"
+    with subprocess.Popen([CLI, "-c", command], stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        try:
+            rtts, sent = stream_probe_rtts(proc.stdout)
+            proc.wait(timeout=ping_timeout(count))
+        except Exception:
+            proc.kill()
+            raise
+        if proc.returncode:
+            raise RuntimeError(proc.stderr.read().decode(errors="replace").strip() or f"cli devolvió {proc.returncode}")
+    return rtts, sent
+
+def ping_host(host):
     """Realiza un ping a un host y registra los resultados."""
     try:
-        result = dev.rpc.ping(host=host, count=str(COUNT))  # Conversión a str
-        rtt_min = result.findtext("probe-results-summary/rtt-minimum", "N/A").strip()
-        rtt_max = result.findtext("probe-results-summary/rtt-maximum", "N/A").strip()
-        rtt_avg = result.findtext("probe-results-summary/rtt-average", "N/A").strip()
-        target_host = result.findtext("target-host", host).strip()
-        
+        # El parseo es incremental y va a la par que el ping: se mide el conjunto
+        rtts, sent, ping_time = timed_parse(ping_stream, host)
+        stats = summarize_rtts(rtts, sent)
+
+        # Mínimo, máximo y promedio salen de los RTT ya leídos, sin volver a buscar en la respuesta
+        if stats["count"]:
+            rtt_min, rtt_max, rtt_avg = stats["min"], stats["max"], round(stats["mean"], 3)
+        else:
+            rtt_min = rtt_max = rtt_avg = "N/A"
         message = (
-            f"RTT details for {target_host} at {Junos_Context['localtime']} | "
-            f"Min: {rtt_min} ms, Max: {rtt_max} ms, Avg: {rtt_avg} ms"
+            f"RTT details for {host} at {Junos_Context['localtime']} | "
+            f"Min: {rtt_min} ms, Max: {rtt_max} ms, Avg: {rtt_avg} ms, "
+            f"P95: {stats['p95']:.2f} ms, P99: {stats['p99']:.2f} ms, Loss: {stats['loss']}% | "
+            f"Ping + parse: {ping_time:.3f} s"
         )
     except Exception as e:
         message = f"Ping to {host} failed at {Junos_Context['localtime']}. Error: {e}"
@@ -26,16 +53,11 @@ def ping_host(dev, host):
     jcs.syslog("external.crit", message)
 
 def main():
-    """Establece conexión con el dispositivo, ejecuta pings y mide el tiempo total de ejecución."""
+    """Ejecuta pings por la CLI y mide el tiempo total de ejecución."""
     start_time = time.time()  # Marca de tiempo inicial
 
-    try:
-        with Device() as dev:
-            for host in HOSTS_LIST:
-                ping_host(dev, host)
-    
-    except Exception as e:
-        jcs.syslog("external.error", f"Error al conectar con el dispositivo: {e}")
+    for host in HOSTS_LIST:
+        ping_host(host)
 
     end_time = time.time()  # Marca de tiempo final
     execution_time = end_time - start_time  # Cálculo del tiempo total
@@ -6,6 +6,8 @@ import jcs
 from jnpr.junos import Device
 from junos import Junos_Context
 from jnpr.junos.exception import RpcError
+from rtt_stats import parse_probe_rtts
+from rtt_sketch import RttSketch
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script on-box para ping con RTT en bloques")
@@ -33,9 +35,7 @@ def log_syslog(message, level="info"):
 # ------------------ Funcion principal de ping ------------------
 def ping_host(dev, host, total_count, chunk_size):
     current_sent = 0
-    total_min = []
-    total_max = []
-    total_avg = []
+    sketch = RttSketch()
 
     while current_sent < total_count:
         try:
@@ -48,9 +48,8 @@ def ping_host(dev, host, total_count, chunk_size):
             rtt_max = result.findtext("probe-results-summary/rtt-maximum", "0").strip()
             rtt_avg = result.findtext("probe-results-summary/rtt-average", "0").strip()
 
-            total_min.append(float(rtt_min))
-            total_max.append(float(rtt_max))
-            total_avg.append(float(rtt_avg))
+            rtts, enviados = parse_probe_rtts(result)
+            sketch.add_probe(rtts, enviados)
 
             msg = (f"[OK] Ping a {target_host} | Bloque: {count_now} paquetes | "
                    f"Min: {rtt_min} ms | Max: {rtt_max} ms | Prom: {rtt_avg} ms")
@@ -60,20 +59,26 @@ def ping_host(dev, host, total_count, chunk_size):
         except RpcError as e:
             error_msg = f"[ERROR] RPC error durante ping a {host}: {str(e)}"
             log_syslog(error_msg, level="error")
+            # El bloque fallido cuenta como enviado y perdido, igual que en los scripts por bloques
+            sketch.add_probe((), count_now)
             break
         except Exception as e:
             error_msg = f"[ERROR] Excepcion durante ping a {host}: {str(e)}"
             log_syslog(error_msg, level="error")
+            sketch.add_probe((), count_now)
             break
 
-    # Resultados finales agregados
-    if total_min and total_max and total_avg:
-        avg_min = round(sum(total_min) / len(total_min), 2)
-        avg_max = round(sum(total_max) / len(total_max), 2)
-        avg_avg = round(sum(total_avg) / len(total_avg), 2)
-        summary_msg = (f"[RESUMEN] Ping total a {host} | Paquetes: {current_sent} | "
-                       f"Promedios - Min: {avg_min} ms | Max: {avg_max} ms | Prom: {avg_avg} ms")
-        log_syslog(summary_msg, level="info")
+    # Resultados finales agregados a partir del sketch combinado (tambien con perdida total)
+    if sketch.count:
+        summary_msg = (f"[RESUMEN] Ping total a {host} | Paquetes: {sketch.sent} | "
+                       f"Min: {round(sketch.min, 2)} ms | Max: {round(sketch.max, 2)} ms | "
+                       f"Prom: {round(sketch.mean, 2)} ms | P95: {round(sketch.quantile(0.95), 2)} ms | "
+                       f"P99: {round(sketch.quantile(0.99), 2)} ms | Perdida: {sketch.loss}%")
+    else:
+        summary_msg = f"[RESUMEN] Ping total a {host} | Paquetes: {sketch.sent} | Sin respuesta | Perdida: {sketch.loss}%"
+    if sketch.sent < total_count:
+        summary_msg += f" | Sin enviar: {total_count - sketch.sent}"
+    log_syslog(summary_msg, level="info" if sketch.count else "error")
 
 # ------------------ Ejecucion general ------------------
 def main():
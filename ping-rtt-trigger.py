@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# Event-script ligero para el modo demonio (ping_daemon.py).
+#
+# El timer de event-options solo llama a este script: si el demonio no esta
+# vivo lo arranca en segundo plano; si ya lo esta no hace nada, porque el
+# demonio lleva su propio intervalo (enviarle SIGUSR1 en cada tick duplicaria
+# la frecuencia de los ciclos). Asi cada tick no paga el arranque de Python,
+# el import de jnpr.junos ni el Device().open().
+#
+# Si los argumentos (hosts, count, interval) no coinciden con los que el
+# demonio tiene en vigor (<pidfile>.json), se reescribe ese fichero y se le
+# envia SIGHUP para que los cargue en el siguiente ciclo.
+
+"""
+Ejemplo de configuracion (cada 60 segundos):
+set event-options generate-event ping-rtt-event time-interval 60
+set event-options policy ping-rtt events ping-rtt-event
+set event-options policy ping-rtt then event-script ping-rtt-trigger.py arguments hosts xx.xx.xx.xx,yy.yy.yy.yy
+set event-options policy ping-rtt then event-script ping-rtt-trigger.py arguments count 5
+set event-options event-script file ping-rtt-trigger.py python-script-user <user-name>
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import jcs
+
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ping_daemon.py")
+DEFAULT_PIDFILE = "/var/tmp/ping-rtt-daemon.pid"
+
+
+def daemon_pid(pidfile):
+    """PID del demonio si esta vivo, ``None`` en otro caso."""
+    try:
+        with open(pidfile) as file:
+            pid = int(file.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def daemon_config(pidfile):
+    """Argumentos en vigor del demonio, ``None`` si no se pueden leer."""
+    try:
+        with open(pidfile + ".json") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def update_config(pidfile, config):
+    tmp = pidfile + ".json.tmp"
+    with open(tmp, "w") as file:
+        json.dump(config, file)
+    os.replace(tmp, pidfile + ".json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispara un ciclo del demonio de ping")
+    parser.add_argument("-hosts", "--hosts", required=True, help="Hosts separados por comas")
+    parser.add_argument("-count", "--count", default="5", help="Paquetes de ping por host")
+    parser.add_argument("-interval", "--interval", default="60", help="Segundos entre ciclos del demonio")
+    parser.add_argument("-pidfile", "--pidfile", default=DEFAULT_PIDFILE, help="PID file del demonio")
+    args = parser.parse_args()
+
+    config = {
+        "hosts": [h.strip() for h in args.hosts.split(",") if h.strip()],
+        "count": int(args.count),
+        "interval": float(args.interval),
+    }
+    pid = daemon_pid(args.pidfile)
+    if pid:
+        # El demonio ya marca la cadencia; solo se le avisa si cambiaron los argumentos
+        if daemon_config(args.pidfile) != config:
+            update_config(args.pidfile, config)
+            os.kill(pid, signal.SIGHUP)
+            jcs.syslog("external.info", "[DEMONIO] Argumentos cambiados, enviado SIGHUP al demonio")
+        return
+
+    subprocess.Popen(
+        [sys.executable, DAEMON_SCRIPT, "--hosts", args.hosts, "--count", args.count,
+         "--interval", args.interval, "--pidfile", args.pidfile],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    jcs.syslog("external.info", "[DEMONIO] Demonio de ping arrancado por el event-script")
+
+
+if __name__ == "__main__":
+    main()
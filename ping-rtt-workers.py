@@ -1,138 +1,274 @@
-import jcs
-import psutil
-import csv
 import time
-import os
 import threading
-import queue
 import argparse
-from jnpr.junos import Device
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from probe_engine import Timed, run_probes
+from aimd import AimdController
+from session_pool import SessionPool
+from coalesce import SingleFlight, ping_key, merge_repeats
+from system_sampler import SystemSampler
+from records import StreamWriters, system_record, probe_record
+from pipeline import RecordPipeline, OVERFLOW_POLICIES
+from syslog_emitter import SyslogEmitter
+from segments import RotationPolicy
+from governor import ResourceGovernor
+from deadline import RunDeadline, SKIPPED_RESULT, load_pending, prioritize
+from host_health import HostHealth, DOWN, DOWN_RESULT, describe
+from rtt_stats import parse_probe_rtts
+from hedging import max_count, ping_timeout
 
 # Configuración de argumentos
 parser = argparse.ArgumentParser(description="Monitoreo de sistema y ping a hosts.")
 parser.add_argument("--count", type=int, default=1, help="Número de pings por host.")
 parser.add_argument("--max-time", type=int, default=60, help="Tiempo máximo de monitoreo en segundos.")
+parser.add_argument("--concurrency", type=int, default=50, help="Número máximo de RPC de ping en vuelo (techo del control AIMD).")
+parser.add_argument("--fixed-concurrency", action="store_true", help="Usa --concurrency fijo sin control AIMD.")
+parser.add_argument("--max-cpu", type=float, default=70.0, help="CPU del RE (%%) a partir de la cual se reduce la concurrencia.")
+parser.add_argument("--probe-timeout", type=int, default=90, help="Plazo máximo por ping en segundos; el plazo real sale de los paquetes de cada ping.")
+parser.add_argument("--sessions", type=int, default=4, help="Número de sesiones NETCONF en el pool.")
+parser.add_argument("--merge-repeats", action="store_true", help="Fusiona hosts repetidos en un solo ping con más paquetes.")
+parser.add_argument("--queue-size", type=int, default=10000, help="Tamaño máximo de la cola de registros.")
+parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="drop-oldest", help="Política al llenarse la cola.")
+parser.add_argument("--max-mem", type=float, default=90.0, help="Memoria del RE (%%) a partir de la cual se frenan pings y escrituras.")
+parser.add_argument("--max-self-cpu", type=float, default=25.0, help="CPU del propio script (%% de un núcleo) a partir de la cual se frena.")
+parser.add_argument("--max-rss-mb", type=float, default=256.0, help="RSS del propio script (MB) a partir de la cual se frena.")
+parser.add_argument("--reserve", type=float, default=5.0, help="Segundos de --max-time reservados para vaciar colas y cerrar ficheros.")
 args = parser.parse_args()
 
 COUNT = args.count
 MAX_MONITOR_TIME = args.max_time
 LOG_INTERVAL = 1
-MAX_WORKERS = 10  # Número de hilos para el executor
-csv_filename = "/var/db/scripts/op/system_monitor.csv"
+BATCH_SIZE = 200         # Filas máximas por escritura
+MAX_WRITE_LATENCY = 1.0  # Segundos máximos que una fila espera antes de escribirse
+CONCURRENCY = args.concurrency  # RPC de ping simultáneas
+PROBE_TIMEOUT = args.probe_timeout
+POOL_SIZE = args.sessions
+MERGE_REPEATS = args.merge_repeats
+system_filename = "/var/db/scripts/op/system_samples.csv"
+probe_filename = "/var/db/scripts/op/probe_results.csv"
+# Rotación por tamaño/antigüedad, gzip en segundo plano y un presupuesto común a los dos flujos
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
+# Hosts no probados en el ciclo anterior por falta de tiempo (se prueban antes en el siguiente);
+# un fichero por script para que ping-rtt-max-monitor.py no lo pise
+pending_filename = "/var/db/scripts/op/pending_hosts_workers.json"
+# Estado up/failing/down por host entre ejecuciones (compartido con system_usage.py: commit fusiona bajo flock)
+health_filename = "/var/db/scripts/op/host_health.json"
 
-# Lista de hosts
+# Lista de hosts y prioridad opcional por host (menor = antes; sin entrada = 100)
 HOSTS_LIST = ["204.124.107.82", "204.124.107.83", "204.124.107.84"] * 30
+HOST_PRIORITY = {}
 
-data_queue = queue.Queue()
-monitoring_done = threading.Event()
+# Un ping que no cabe en --probe-timeout no se recorta: se rechaza antes de empezar
+largest = max(total for _, total, _ in merge_repeats(HOSTS_LIST, COUNT)) if MERGE_REPEATS else COUNT
+if largest > max_count(PROBE_TIMEOUT):
+    parser.error(f"{largest} paquetes por ping no caben en --probe-timeout={PROBE_TIMEOUT}s "
+                 f"(máximo {max_count(PROBE_TIMEOUT)})")
 
-# Crear archivo CSV si no existe
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "CPU (%)", "Memoria (%)", "Disco (%)", "Host", "Ping"])
+data_queue = RecordPipeline(maxsize=args.queue_size, overflow=args.overflow)
+monitoring_done = threading.Event()
+single_flight = SingleFlight()
+# Cada muestra se escribe en el flujo system desde el propio hilo del muestreador
+sampler = SystemSampler(interval=LOG_INTERVAL, on_sample=lambda snapshot: record_sample(snapshot))
+# Syslog agrupado y con límites por severidad, fuera del camino de los pings
+log = SyslogEmitter()
+# Frena pings y escrituras mientras el RE o el propio script superan sus techos
+governor = ResourceGovernor(
+    # Sin esperar a la primera muestra: hasta entonces solo cuentan los techos del propio script
+    sample_fn=lambda: sampler.latest(wait=False)[0],
+    max_cpu=args.max_cpu,
+    max_mem=args.max_mem,
+    max_self_cpu=args.max_self_cpu,
+    max_rss_mb=args.max_rss_mb,
+    log=lambda message: log.syslog("external.notice", message, key="governor"),
+)
+# Plazo global: los pings terminan antes de --max-time menos la reserva de vaciado
+deadline = RunDeadline(MAX_MONITOR_TIME, reserve=args.reserve, estimate=COUNT + 1)
+# Los hosts down solo se comprueban con count=1 y backoff exponencial
+health = HostHealth(health_filename)
 
 def get_system_usage():
-    """Obtiene métricas del sistema (CPU, Memoria y Disco)."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    cpu_percent = round(psutil.cpu_percent(interval=1), 2)
-    
-    mem = psutil.virtual_memory()
-    mem_percent = round((mem.used / mem.total) * 100, 2) if mem.total > 0 else 0.00
-    
-    disk = psutil.disk_usage('/')
-    disk_percent = round(disk.percent, 2)
-    
-    return timestamp, cpu_percent, mem_percent, disk_percent
+    """Devuelve la última muestra del sistema (CPU, Memoria y Disco) y su edad, sin esperar."""
+    return sampler.latest()
+
+def current_cpu():
+    """CPU del RE de la última muestra, o None antes de la primera (sin esperar)."""
+    snapshot, _ = sampler.latest(wait=False)
+    return None if snapshot is None else snapshot.cpu_percent
+
+def record_sample(snapshot):
+    """Registra cada muestra del sistema una sola vez; la llama el muestreador al publicarla."""
+    log.syslog("external.warning", f"[{snapshot.timestamp}] CPU: {snapshot.cpu_percent}%, Memoria: {snapshot.mem_percent}%, Disco: {snapshot.disk_percent}%", key="system-usage")
+    data_queue.put(system_record(snapshot))
 
 def log_system_usage():
-    """Registra el uso del sistema y lo guarda en la cola."""
-    start_time = time.time()
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
+    """Detiene el monitoreo al alcanzar el tiempo máximo (las muestras las entrega el muestreador)."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo...")
+    if not monitoring_done.wait(MAX_MONITOR_TIME):
+        log.syslog("external.warning", "[MONITOREO] Tiempo máximo alcanzado, deteniendo monitoreo.")
+        monitoring_done.set()
 
-    while not monitoring_done.is_set():
-        timestamp, cpu_percent, mem_percent, disk_percent = get_system_usage()
-        jcs.syslog("external.warning", f"[{timestamp}] CPU: {cpu_percent}%, Memoria: {mem_percent}%, Disco: {disk_percent}%")
+def probe_timeout(count):
+    """Plazo de un ping de ``count`` paquetes: envío + espera del último + margen.
 
-        for host in HOSTS_LIST:
-            data_queue.put((timestamp, cpu_percent, mem_percent, disk_percent, host, "N/A"))
+    ``--probe-timeout`` es solo el techo; los counts que no caben en él
+    (también los fusionados con ``--merge-repeats``) se rechazan al arrancar.
+    """
+    return ping_timeout(count)
 
-        elapsed_time = time.time() - start_time
-        if elapsed_time >= MAX_MONITOR_TIME:
-            jcs.syslog("external.warning", "[MONITOREO] Tiempo máximo alcanzado, deteniendo monitoreo.")
-            monitoring_done.set()
-            break
+def _ping_rpc(pool, host, count, timeout):
+    """Ejecuta la RPC de ping con una sesión del pool; devuelve ``(respuesta, latencia, inicio)``.
 
-        time.sleep(LOG_INTERVAL)
+    La latencia se mide ya con la sesión: la espera por una sesión libre es
+    contención local, no lentitud del equipo, y no debe recortar el AIMD.
+    """
+    with pool.session() as dev:
+        start = time.monotonic()
+        result = dev.rpc.ping(host=host, count=str(count), dev_timeout=max(1, timeout))
+        return result, time.monotonic() - start, start
 
-def ping_host(dev, host):
-    """Realiza un ping a un host y guarda el resultado."""
+def ping_host(pool, host, count=COUNT):
+    """Realiza un ping a un host y guarda el resultado; los duplicados en vuelo comparten la RPC."""
+    # La RPC no sigue ocupando la sesión más allá del fin del ciclo
+    timeout = deadline.timeout(probe_timeout(count))
     try:
-        result = dev.rpc.ping(host=host, count=str(COUNT))
+        # Los duplicados reciben la latencia de la RPC compartida, no su espera
+        result, latency, started = single_flight.do(ping_key(host, count), lambda: _ping_rpc(pool, host, count, timeout))
         target_host = result.findtext("target-host", host).strip()
-        jcs.syslog("external.warning", f"Ping exitoso a {target_host}")
-        return host, "Éxito"
+        rtts, _ = parse_probe_rtts(result)
+        health.observe(host, len(rtts) > 0)
+        if not rtts:
+            log.syslog("external.warning", f"Ping sin respuesta de {target_host}", key="ping-no-reply", host=host)
+            return Timed("Sin respuesta", latency, started)
+        log.syslog("external.warning", f"Ping exitoso a {target_host}", key="ping-ok", host=host)
+        return Timed("Éxito", latency, started)
     except Exception as e:
-        jcs.syslog("external.crit", f"Error en ping a {host}: {e}")
-        return host, "Fallo"
+        # Un ping cortado por el fin del ciclo no dice nada de la salud del host: queda pendiente
+        if deadline.expired():
+            deadline.cancel(host)
+            return Timed(SKIPPED_RESULT)
+        health.observe(host, False)
+        log.syslog("external.warning" if health.state(host) == DOWN else "external.crit", f"Error en ping a {host}: {e}")
+        return Timed("Fallo")
 
-def write_to_csv():
-    """Escribe los datos en el archivo CSV en tiempo real."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
+def ping_timed_out(host):
+    """Resultado de un ping que venció su plazo en el motor: cuenta como fallo del host."""
+    health.observe(host, False)
+    return "Timeout"
 
-    while not monitoring_done.is_set() or not data_queue.empty():
-        batch = []
-        while not data_queue.empty():
-            batch.append(data_queue.get())
+def write_to_csv():
+    """Escribe muestras y resultados en sus archivos CSV a medida que llegan a la cola."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
 
-        if batch:
+    with StreamWriters(system_filename, probe_filename, rotation=ROTATION,
+                       batch_size=BATCH_SIZE, flush_interval=MAX_WRITE_LATENCY) as writers:
+        def write_batch(records):
+            # Tras el fin del ciclo las escrituras ya no se frenan: hay que vaciar la cola
+            governor.throttle("write", max_wait=deadline.remaining())
             try:
-                with open(csv_filename, mode="a", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerows(batch)
+                writers.write_batch(records)
             except Exception as e:
-                jcs.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
+                log.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
 
-        time.sleep(1)
+        # Bloquea hasta que hay registros; termina al recibir el fin de flujo
+        data_queue.drain(write_batch, batch_size=BATCH_SIZE, max_latency=MAX_WRITE_LATENCY)
 
-    jcs.syslog("external.warning", "[MONITOREO] Escritura en CSV finalizada.")
+    log.syslog("external.warning", f"[MONITOREO] Escritura en CSV finalizada: {writers.stats()} | Cola: {data_queue.stats()}")
 
 def main():
-    """Inicia monitoreo y ejecuta ping a cada host en `HOSTS_LIST` usando ThreadPoolExecutor."""
-    jcs.syslog("external.warning", f"[MONITOREO] Iniciando con COUNT={COUNT}, MAX_TIME={MAX_MONITOR_TIME}s, MAX_WORKERS={MAX_WORKERS}")
+    """Inicia monitoreo y ejecuta ping a cada host en `HOSTS_LIST` con el motor asíncrono."""
+    log.start()
+    log.syslog("external.warning", f"[MONITOREO] Iniciando con COUNT={COUNT}, MAX_TIME={MAX_MONITOR_TIME}s, CONCURRENCY={CONCURRENCY}")
 
     start_time = time.time()
+    sampler.start()
     thread_sys = threading.Thread(target=log_system_usage)
     thread_csv = threading.Thread(target=write_to_csv)
 
     thread_sys.start()
     thread_csv.start()
 
+    pool = None
     try:
-        dev = Device()
-        dev.open()
-
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {executor.submit(ping_host, dev, host): host for host in HOSTS_LIST}
-            
-            for future in as_completed(futures):
-                host, ping_result = future.result()
-                timestamp, cpu_percent, mem_percent, disk_percent = get_system_usage()
-                data_queue.put((timestamp, cpu_percent, mem_percent, disk_percent, host, ping_result))
-
-        dev.close()
+        pool = SessionPool(size=POOL_SIZE, timeout=PROBE_TIMEOUT)
+
+        if MERGE_REPEATS:
+            counts = {host: total for host, total, _ in merge_repeats(HOSTS_LIST, COUNT)}
+            targets = list(counts)
+        else:
+            counts = {}
+            targets = HOSTS_LIST
+        targets = prioritize(targets, HOST_PRIORITY, load_pending(pending_filename))
+
+        # Salud por host: los down en espera no se prueban y los que toca comprobar van con count=1
+        planned = {host: health.plan(host, counts.get(host, COUNT)) for host in dict.fromkeys(targets)}
+        waiting = [host for host in targets if planned[host] is None]
+        targets = [host for host in targets if planned[host] is not None]
+
+        # AIMD: ajusta las RPC en vuelo según latencia, timeouts y CPU del RE
+        controller = None
+        if not args.fixed_concurrency:
+            # Más pings en vuelo que sesiones solo añade cola en el pool
+            controller = AimdController(
+                maximum=min(CONCURRENCY, POOL_SIZE),
+                max_cpu=args.max_cpu,
+                cpu_fn=current_cpu,
+                log=lambda message: log.syslog("external.notice", message, key="aimd"),
+            )
+
+        def queue_result(host, ping_result):
+            snapshot, age = get_system_usage()
+            data_queue.put(probe_record(snapshot, age, host, ping_result))
+
+        # Cada resultado pasa a la cola de escritura en cuanto termina su ping
+        run_probes(
+            lambda host: ping_host(pool, host, planned[host]),
+            targets,
+            concurrency=CONCURRENCY,
+            timeout=lambda host: probe_timeout(planned[host]),
+            on_timeout=ping_timed_out,
+            controller=controller,
+            deadline=deadline,
+            on_result=queue_result,
+            # El freno por recursos se espera antes de tomar hueco, fuera del plazo del ping
+            throttle=lambda: governor.athrottle("probe", max_wait=deadline.remaining()),
+        )
+
+        for host in waiting:
+            snapshot, age = get_system_usage()
+            data_queue.put(probe_record(snapshot, age, host, DOWN_RESULT))
+
+        for transition in health.commit():
+            log.syslog("external.crit" if transition[2] == DOWN else "external.notice", describe(transition))
+        log.syslog("external.notice", f"[MONITOREO] Salud de hosts: {health.stats()}")
+
+        log.syslog("external.warning", f"[MONITOREO] Coalescencia de pings: {single_flight.stats()}")
+        if controller is not None:
+            log.syslog("external.warning", f"[MONITOREO] Concurrencia AIMD: {controller.stats()}")
     except Exception as e:
-        jcs.syslog("external.crit", f"Error al conectar con JUNOS: {str(e)}")
+        log.syslog("external.crit", f"Error al conectar con JUNOS: {str(e)}")
+    finally:
+        # Las sesiones NETCONF se cierran también si el ciclo falla a medias
+        if pool is not None:
+            pool.close()
+            log.syslog("external.warning", f"[MONITOREO] Pool de sesiones: {pool.stats()}")
+        # Finaliza monitoreo cuando terminan los pings; el escritor siempre recibe
+        # el fin de flujo y no se queda bloqueado en drain
+        monitoring_done.set()
+        thread_sys.join()
+        # Sin muestras nuevas antes de cerrar la cola
+        sampler.stop()
+        data_queue.close()
+        thread_csv.join()
 
-    # Finaliza monitoreo cuando terminan los pings
-    monitoring_done.set()
-    
-    thread_sys.join()
-    thread_csv.join()
+    log.syslog("external.notice", f"[MONITOREO] Plazo global: {deadline.report()}")
+    try:
+        deadline.save_pending(pending_filename)
+    except OSError as e:
+        log.syslog("external.error", f"Error al guardar hosts pendientes: {str(e)}")
 
     total_time = round(time.time() - start_time, 3)
-    jcs.syslog("external.warning", f"[FINALIZACION] Monitorización completa en {total_time} segundos.")
+    log.syslog("external.notice", f"[MONITOREO] Freno por recursos: {governor.stats()}")
+    log.syslog("external.warning", f"[FINALIZACION] Monitorización completa en {total_time} segundos.")
+    log.close()
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,8 @@ import time
 import jcs
 from jnpr.junos import Device
 from junos import Junos_Context
+from rtt_stats import parse_probe_rtts
+from rtt_sketch import RttSketch
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para hacer ping con RTT en Juniper on-box")
@@ -31,9 +33,7 @@ def log_syslog(message, level="info"):
 
 # ------------------ Funcion para hacer ping por bloques ------------------
 def ping_in_chunks(dev, host, total_count, chunk_size):
-    all_min = []
-    all_max = []
-    all_avg = []
+    sketch = RttSketch()
 
     for i in range(0, total_count, chunk_size):
         current_chunk = min(chunk_size, total_count - i)
@@ -44,9 +44,8 @@ def ping_in_chunks(dev, host, total_count, chunk_size):
             rtt_max = result.findtext("probe-results-summary/rtt-maximum", "0").strip()
             rtt_avg = result.findtext("probe-results-summary/rtt-average", "0").strip()
 
-            all_min.append(float(rtt_min))
-            all_max.append(float(rtt_max))
-            all_avg.append(float(rtt_avg))
+            rtts, enviados = parse_probe_rtts(result)
+            sketch.add_probe(rtts, enviados)
 
             msg = (
                 f"[OK] Bloque {i+1}-{i+current_chunk} pings a {host} | "
@@ -57,16 +56,17 @@ def ping_in_chunks(dev, host, total_count, chunk_size):
         except Exception as e:
             error_msg = f"[ERROR] Fallo ping a {host} en bloque {i+1}-{i+current_chunk} | Detalle: {str(e)}"
             log_syslog(error_msg, level="error")
+            sketch.add_probe((), current_chunk)
 
-    return all_min, all_max, all_avg
+    return sketch
 
 # ------------------ Calculo acumulado ------------------
-def calcular_rtt_final(all_min, all_max, all_avg):
-    if not all_min or not all_max or not all_avg:
+def calcular_rtt_final(sketch):
+    if not sketch.count:
         return "0", "0", "0"
-    final_min = str(min(all_min))
-    final_max = str(max(all_max))
-    final_avg = str(round(sum(all_avg) / len(all_avg), 2))
+    final_min = str(sketch.min)
+    final_max = str(sketch.max)
+    final_avg = str(round(sketch.mean, 2))
     return final_min, final_max, final_avg
 
 # ------------------ Ejecucion general ------------------
@@ -84,12 +84,14 @@ def main():
         for host in HOSTS_LIST:
             log_syslog(f"Iniciando ping a {host} con {COUNT} paquetes en bloques de {CHUNK_SIZE}", level="info")
 
-            all_min, all_max, all_avg = ping_in_chunks(dev, host, COUNT, CHUNK_SIZE)
-            final_min, final_max, final_avg = calcular_rtt_final(all_min, all_max, all_avg)
+            sketch = ping_in_chunks(dev, host, COUNT, CHUNK_SIZE)
+            final_min, final_max, final_avg = calcular_rtt_final(sketch)
 
             resumen = (
                 f"[RESUMEN] Host: {host} | RTT Minimo: {final_min} ms | "
-                f"Maximo: {final_max} ms | Promedio: {final_avg} ms"
+                f"Maximo: {final_max} ms | Promedio: {final_avg} ms | "
+                f"P50: {round(sketch.quantile(0.50), 2)} ms | P95: {round(sketch.quantile(0.95), 2)} ms | "
+                f"P99: {round(sketch.quantile(0.99), 2)} ms | Perdida: {sketch.loss}%"
             )
             log_syslog(resumen, level="info")
 
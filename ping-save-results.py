@@ -1,23 +1,37 @@
 import jcs
 import psutil
-import csv
 import time
-import os
-from jnpr.junos import Device
+from session_pool import SessionPool
 from junos import Junos_Context
+from csv_writer import BatchCsvWriter
+from coalesce import merge_repeats
+from segments import RotationPolicy
+from rtt_stats import parse_probe_rtts
+from hedging import ping_timeout
+from rollup import RollupEngine, expire_raw
 
 # Lista de hosts (ejemplo)
 HOSTS_LIST = ["192.168.1.1", "192.168.1.2", "192.168.1.3"]  # Cambia por las IPs reales
 COUNT = 100  # Número de pings por host
+MERGE_REPEATS = False  # Fusiona hosts repetidos en un solo ping de COUNT * repeticiones
 
 # Nombre del archivo CSV donde se guardarán los resultados
 csv_filename = "ping_results.csv"
 
-# Si el archivo no existe, crear con los encabezados
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Host", "CPU (%)", "Memoria (%)", "Disco (%)", "RTT Min (ms)", "RTT Max (ms)", "RTT Prom (ms)", "Hora"])
+# Agregados por host a 1 min / 5 min / 1 h; los crudos se borran pasada la retención
+rollups_dir = "rollups"
+RAW_RETENTION = 7 * 24 * 3600  # Segundos que se conservan los segmentos crudos
+
+# Un solo presupuesto de disco para el CSV crudo y los agregados
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
+
+# Un único descriptor abierto; las filas se escriben por lotes y el fichero se rota
+csv_writer = BatchCsvWriter(csv_filename, header=["Host", "CPU (%)", "Memoria (%)", "Disco (%)", "RTT Min (ms)", "RTT Max (ms)", "RTT Prom (ms)", "Hora"],
+                            rotation=ROTATION)
+rollups = RollupEngine(rollups_dir, rotation=ROTATION)
+
+# Una sola sesión NETCONF reutilizada por todos los hosts (antes se abría una por host)
+pool = SessionPool(size=1)
 
 def log_system_usage():
     """Registra el uso de CPU, memoria y disco en syslog y devuelve los valores."""
@@ -31,18 +45,20 @@ def log_system_usage():
 
     return cpu_percent, mem.percent, disk.percent  # Retorna valores para almacenar en CSV
 
-def ping_host(host):
-    """Realiza un ping a un host con su propia conexión y guarda los resultados en el CSV."""
+def ping_host(host, count=COUNT):
+    """Realiza un ping a un host con la sesión del pool y guarda los resultados en el CSV."""
     jcs.syslog("external.error", f"Iniciando ping a {host}")
     cpu_percent, mem_percent, disk_percent = log_system_usage()  # Registrar métricas antes del ping
 
     try:
-        with Device() as dev:  # Cada host maneja su propia conexión
-            result = dev.rpc.ping(host=host, count=str(COUNT))
+        with pool.session() as dev:  # Sesión compartida del pool
+            # Plazo según los paquetes: un ping fusionado (MERGE_REPEATS) dura más
+            result = dev.rpc.ping(host=host, count=str(count), dev_timeout=ping_timeout(count))
             rtt_min = result.findtext("probe-results-summary/rtt-minimum", "N/A").strip()
             rtt_max = result.findtext("probe-results-summary/rtt-maximum", "N/A").strip()
             rtt_avg = result.findtext("probe-results-summary/rtt-average", "N/A").strip()
             target_host = result.findtext("target-host", host).strip()
+            rtts, sent = parse_probe_rtts(result)
             
             message = (
                 f"RTT para {target_host} a las {Junos_Context['localtime']} | "
@@ -54,24 +70,35 @@ def ping_host(host):
         message = f"Ping a {host} falló en {Junos_Context['localtime']}. Error: {e}"
         jcs.syslog("external.crit", f"Error en ping a {host}: {e}")
         rtt_min, rtt_max, rtt_avg = "N/A", "N/A", "N/A"  # En caso de fallo
+        rtts, sent = [], count  # Cuenta como pérdida total en los agregados
 
     jcs.syslog("external.crit", message)
 
-    # Guardar resultados en CSV (modo 'a' para agregar sin sobrescribir)
-    with open(csv_filename, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([host, cpu_percent, mem_percent, disk_percent, rtt_min, rtt_max, rtt_avg, time.strftime("%Y-%m-%d %H:%M:%S")])
+    # Guardar resultados en CSV (se vuelcan por lotes)
+    csv_writer.writerow([host, cpu_percent, mem_percent, disk_percent, rtt_min, rtt_max, rtt_avg, time.strftime("%Y-%m-%d %H:%M:%S")])
+    rollups.add(host, rtts, sent)
 
 def main():
     """Ejecuta el proceso para cada host y guarda los resultados en CSV."""
     jcs.syslog("external.error", "Iniciando conexión con el dispositivo Juniper")
     log_system_usage()  # Monitorear uso antes de conectar
 
-    for host in HOSTS_LIST:
-        jcs.syslog("external.error", f"Procesando host: {host}")
-        ping_host(host)  # Ahora cada ping maneja su propia conexión
-    
-    jcs.syslog("external.error", "Ejecución del script finalizada")
+    if MERGE_REPEATS:
+        targets = [(host, total) for host, total, _ in merge_repeats(HOSTS_LIST, COUNT)]
+    else:
+        targets = [(host, COUNT) for host in HOSTS_LIST]
+
+    try:
+        for host, count in targets:
+            jcs.syslog("external.error", f"Procesando host: {host}")
+            ping_host(host, count)
+    finally:
+        # Aunque falle un host se vuelcan las filas pendientes y se cierran los ficheros
+        pool.close()
+        csv_writer.close()
+        rollups.close()
+    expired = expire_raw(csv_filename, RAW_RETENTION)
+    jcs.syslog("external.error", f"Ejecución del script finalizada | CSV: {csv_writer.stats()} | Agregados: {rollups.stats()} | Segmentos expirados: {len(expired)} | Sesiones: {pool.stats()}")
     log_system_usage()  # Monitorear uso al finalizar
 
 if __name__ == "__main__":
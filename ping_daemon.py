@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""Modo demonio: ciclos de ping periódicos con sesiones e imports en caliente.
+
+En lugar de arrancar un proceso por cada tick del ``event-options``, este
+proceso se queda residente: abre el pool de sesiones una vez y ejecuta un
+ciclo de pings cada ``--interval`` segundos. El propio demonio marca la
+cadencia: ``ping-rtt-trigger.py`` es el event-script ligero que lo arranca si
+no está vivo y, si ya lo está, no le pide ciclos extra (cada tick del timer
+duplicaría la frecuencia). SIGUSR1 adelanta un ciclo a mano y SIGTERM
+termina el ciclo en curso y sale.
+
+Los argumentos en vigor se guardan junto al PID file (``<pidfile>.json``).
+Si el trigger recibe otros hosts, count o intervalo, reescribe ese fichero y
+envía SIGHUP: el demonio los carga al empezar el siguiente ciclo, que se
+adelanta. El tamaño del pool y el plazo por ping solo cambian reiniciando.
+
+Cada ciclo registra su latencia total y la sobrecarga (latencia del ciclo
+menos la RPC más lenta).
+"""
+
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+import jcs
+from junos import Junos_Context
+from probe_engine import run_probes
+from session_pool import SessionPool
+
+DEFAULT_PIDFILE = "/var/tmp/ping-rtt-daemon.pid"
+
+
+# ------------------ Argumentos CLI ------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Demonio de ping con RTT en Junos (on-box)")
+    parser.add_argument("--hosts", required=True, help="Hosts separados por comas")
+    parser.add_argument("--count", type=int, default=5, help="Paquetes de ping por host")
+    parser.add_argument("--interval", type=float, default=60, help="Segundos entre ciclos")
+    parser.add_argument("--concurrency", type=int, default=50, help="RPC de ping en vuelo")
+    parser.add_argument("--sessions", type=int, default=4, help="Sesiones NETCONF en el pool")
+    parser.add_argument("--probe-timeout", type=int, default=90, help="Plazo por ping en segundos")
+    parser.add_argument("--cycles", type=int, default=0, help="Ciclos a ejecutar (0 = sin límite)")
+    parser.add_argument("--pidfile", default=DEFAULT_PIDFILE, help="Fichero con el PID del demonio")
+    return parser.parse_args(argv)
+
+
+# ------------------ Planificador ------------------
+class ProbeScheduler:
+    """Ejecuta ciclos de ping reutilizando el mismo pool de sesiones."""
+
+    def __init__(self, hosts, count, concurrency, probe_timeout, pool):
+        self.hosts = hosts
+        self.count = count
+        self.concurrency = concurrency
+        self.probe_timeout = probe_timeout
+        self.pool = pool
+        self.interval = None
+        self.config_path = None
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.reload = threading.Event()
+
+    def _ping(self, host):
+        start = time.perf_counter()
+        try:
+            with self.pool.session() as dev:
+                # La RPC termina dentro del plazo: el motor no deja hilos colgados
+                result = dev.rpc.ping(host=host, count=str(self.count), dev_timeout=self.probe_timeout)
+            message = (
+                f"Rtt details for host {result.findtext('target-host', host).strip()} "
+                f"at time {Junos_Context['localtime']} "
+                f"Minimum = {result.findtext('probe-results-summary/rtt-minimum', 'N/A').strip()} "
+                f"Maximum = {result.findtext('probe-results-summary/rtt-maximum', 'N/A').strip()} "
+                f"Average = {result.findtext('probe-results-summary/rtt-average', 'N/A').strip()}"
+            )
+            level = "external.info"
+        except Exception as e:
+            message = f"Ping to host {host} at time {Junos_Context['localtime']} failed: {e}"
+            level = "external.crit"
+        jcs.syslog(level, message)
+        return time.perf_counter() - start
+
+    def run_cycle(self):
+        """Ejecuta un ciclo y devuelve ``(latencia_ciclo, sobrecarga)`` en segundos."""
+        start = time.perf_counter()
+        results = run_probes(self._ping, self.hosts, concurrency=self.concurrency,
+                             timeout=self.probe_timeout, on_timeout=self.probe_timeout)
+        latency = time.perf_counter() - start
+        slowest = max((rpc_time for _, rpc_time in results), default=0.0)
+        return latency, max(latency - slowest, 0.0)
+
+    def apply_config(self):
+        """Carga hosts, count e intervalo de ``config_path`` (tras un SIGHUP)."""
+        self.reload.clear()
+        try:
+            config = read_config(self.config_path)
+            hosts, count, interval = config["hosts"], int(config["count"]), float(config["interval"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            jcs.syslog("external.error", f"[DEMONIO] Configuración no válida en {self.config_path}: {e}")
+            return
+        self.hosts, self.count, self.interval = hosts, count, interval
+        jcs.syslog("external.notice", f"[DEMONIO] Nueva configuración: {len(hosts)} hosts, count {count}, "
+                                      f"cada {interval} s")
+
+    def run(self, interval, cycles=0):
+        self.interval = interval
+        done = 0
+        while not self.stopping.is_set():
+            # Un SIGUSR1 recibido antes de empezar ya queda atendido por este ciclo
+            self.wakeup.clear()
+            if self.reload.is_set() and self.config_path:
+                self.apply_config()
+            latency, overhead = self.run_cycle()
+            done += 1
+            jcs.syslog(
+                "external.info",
+                f"[DEMONIO] Ciclo {done}: {len(self.hosts)} hosts en {latency:.3f} s "
+                f"(sobrecarga {overhead:.3f} s) | Pool: {self.pool.stats()}"
+            )
+            if cycles and done >= cycles:
+                break
+            # SIGUSR1 (o SIGHUP con nueva configuración) adelanta el siguiente ciclo
+            self.wakeup.wait(max(self.interval - latency, 0.0))
+
+
+# ------------------ PID file ------------------
+def write_pidfile(path):
+    with open(path, "w") as file:
+        file.write(str(os.getpid()))
+
+
+def remove_pidfile(path):
+    for name in (path, config_path(path)):
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+
+
+# ------------------ Configuración en vigor ------------------
+def config_path(pidfile):
+    """Fichero con los argumentos en vigor, junto al PID file (lo lee el trigger)."""
+    return pidfile + ".json"
+
+
+def write_config(path, hosts, count, interval):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as file:
+        json.dump({"hosts": hosts, "count": count, "interval": interval}, file)
+    os.replace(tmp, path)
+
+
+def read_config(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+# ------------------ Entrada principal ------------------
+def main(argv=None):
+    args = parse_args(argv)
+    hosts = [h.strip() for h in args.hosts.split(",") if h.strip()]
+
+    pool = SessionPool(size=args.sessions, timeout=args.probe_timeout)
+    scheduler = ProbeScheduler(hosts, args.count, args.concurrency, args.probe_timeout, pool)
+    scheduler.config_path = config_path(args.pidfile)
+
+    def on_reload(signum, frame):
+        scheduler.reload.set()
+        scheduler.wakeup.set()
+
+    def on_stop(signum, frame):
+        scheduler.stopping.set()
+        scheduler.wakeup.set()
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: scheduler.wakeup.set())
+    signal.signal(signal.SIGHUP, on_reload)
+
+    write_config(scheduler.config_path, hosts, args.count, args.interval)
+    write_pidfile(args.pidfile)
+    jcs.syslog("external.info", f"[DEMONIO] Iniciado con {len(hosts)} hosts cada {args.interval} s")
+    try:
+        scheduler.run(args.interval, args.cycles)
+    finally:
+        pool.close()
+        remove_pidfile(args.pidfile)
+        jcs.syslog("external.info", "[DEMONIO] Detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,18 @@ import time
 import jcs
 from jnpr.junos import Device
 from junos import Junos_Context
+from hedging import DEFAULT_WAIT, max_count, ping_timeout
 
 # ------------------ Configuracion global ------------------
-RPC_TIMEOUT = 90  # Timeout en segundos para los RPC
+RPC_TIMEOUT = 90  # Techo del timeout de cada RPC; el plazo real sale de count y wait
 
 # ------------------ Argumentos CLI ------------------
 parser = argparse.ArgumentParser(description="Script para hacer ping con RTT en Junos (on-box)")
 parser.add_argument("--count", type=int, required=True, help="Numero de paquetes de ping por host")
 args = parser.parse_args()
+# Un count cuyo plazo supera el techo no se recorta: se rechaza
+if args.count > max_count(RPC_TIMEOUT):
+    parser.error(f"--count {args.count} no cabe en el timeout de {RPC_TIMEOUT}s (maximo {max_count(RPC_TIMEOUT)})")
 
 COUNT = args.count
 
@@ -33,7 +37,9 @@ def log_syslog(message, level="info"):
 # ------------------ Funcion para ejecutar ping ------------------
 def ping_host(dev, host, count):
     try:
-        result = dev.rpc.ping(host=host, count=str(count))
+        # Plazo propio: envio de count paquetes + espera del ultimo + margen
+        timeout = ping_timeout(count)
+        result = dev.rpc.ping(host=host, count=str(count), wait=str(DEFAULT_WAIT), dev_timeout=timeout)
 
         target_host = result.findtext("target-host", host).strip()
         rtt_min = result.findtext("probe-results-summary/rtt-minimum", "N/A").strip()
@@ -65,7 +71,7 @@ def main():
         dev = Device(timeout=RPC_TIMEOUT)
         dev.open()
         log_syslog("Conexion abierta con el dispositivo", level="info")
-        log_syslog(f"Timeout RPC configurado: {dev.timeout} segundos", level="info")
+        log_syslog(f"Timeout RPC configurado: {dev.timeout} segundos (por ping: {ping_timeout(COUNT)})", level="info")
 
         for host in HOSTS_LIST:
             log_syslog(f"Procesando host: {host}", level="info")
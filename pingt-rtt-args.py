@@ -1,34 +1,40 @@
 import argparse
-import jcs
 import psutil
-import csv
 import time
-import os
 import threading
-import queue
-from jnpr.junos import Device
+from session_pool import SessionPool
+from csv_writer import BatchCsvWriter
+from pipeline import RecordPipeline, OVERFLOW_POLICIES
+from syslog_emitter import SyslogEmitter
+from segments import RotationPolicy
 
 # Argumentos de linea de comandos
 parser = argparse.ArgumentParser(description="Monitoreo de recursos y conectividad de red.")
 parser.add_argument("--count", type=int, default=1, help="Numero de paquetes de ping")
 parser.add_argument("--max_time", type=int, default=60, help="Tiempo maximo de monitoreo en segundos")
+parser.add_argument("--queue_size", type=int, default=10000, help="Tamano maximo de la cola de registros")
+parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="drop-oldest", help="Politica al llenarse la cola")
 args = parser.parse_args()
 
 # Configuracion
 LOG_INTERVAL = 5
+BATCH_SIZE = 200         # Filas maximas por escritura
+MAX_WRITE_LATENCY = 1.0  # Segundos maximos que una fila espera antes de escribirse
 COUNT = args.count
 MAX_MONITOR_TIME = args.max_time
 HOSTS_LIST = ["204.124.107.82"]
 csv_filename = "/var/db/scripts/op/system_monitor.csv"
+# Rotacion por tamano/antiguedad, gzip en segundo plano y presupuesto total de disco
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
 
-data_queue = queue.Queue()
+data_queue = RecordPipeline(maxsize=args.queue_size, overflow=args.overflow)
 monitoring_done = threading.Event()
+# Una sola sesion NETCONF reutilizada por todos los hosts (antes se abria una por host)
+pool = SessionPool(size=1)
+# Syslog agrupado y con limites por severidad, fuera del camino de los pings
+log = SyslogEmitter()
 
-# Verificar existencia del archivo CSV y crear encabezados si es necesario
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)", "Host"])
+CSV_HEADER = ["Timestamp", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)", "Host"]
 
 def convert_bytes(value, unit):
     """Convierte bytes a MB o GB."""
@@ -38,7 +44,7 @@ def convert_bytes(value, unit):
 def log_system_usage():
     """Registra CPU, memoria y disco."""
     start_time = time.time()
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo de recursos del sistema...")
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo de recursos del sistema...")
 
     while not monitoring_done.is_set():
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -55,48 +61,57 @@ def log_system_usage():
 
         log_msg = (f"[{timestamp}] CPU: {cpu_percent}%, Memoria: {memoria_porcentaje}% ({memoria_usada} MB usados, {memoria_libre} MB libres), "
                    f"Disco: {disk_percent}% usado ({disk_free_gb} GB libres)")
-        jcs.syslog("external.warning", log_msg)
+        log.syslog("external.warning", log_msg, key="system-usage")
 
         data_queue.put([timestamp, cpu_percent, memoria_porcentaje, memoria_usada, memoria_libre, disk_percent, disk_free_gb, None])
 
         if time.time() - start_time >= MAX_MONITOR_TIME:
-            jcs.syslog("external.warning", "[MONITOREO] Tiempo maximo alcanzado, deteniendo monitoreo.")
+            log.syslog("external.warning", "[MONITOREO] Tiempo maximo alcanzado, deteniendo monitoreo.")
             monitoring_done.set()
             break
 
-        time.sleep(LOG_INTERVAL)
+        monitoring_done.wait(LOG_INTERVAL)
 
 def ping_hosts():
     """Realiza pings a los hosts."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo de conectividad de red...")
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo de conectividad de red...")
     for host in HOSTS_LIST:
         try:
-            with Device() as dev:
+            with pool.session() as dev:
                 result = dev.rpc.ping(host=host, count=str(COUNT))
                 log_msg = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Ping a {host} completado."
-                jcs.syslog("external.warning", log_msg)
+                log.syslog("external.warning", log_msg, key="ping-ok", host=host)
 
                 data_queue.put([time.strftime("%Y-%m-%d %H:%M:%S"), None, None, None, None, None, None, host])
         except Exception:
-            jcs.syslog("external.critical", f"[ERROR] Fallo en ping a {host}")
+            log.syslog("external.critical", f"[ERROR] Fallo en ping a {host}")
 
-    jcs.syslog("external.warning", "[MONITOREO] Todos los pings han finalizado. Deteniendo monitoreo del sistema...")
+    pool.close()
+    log.syslog("external.warning", "[MONITOREO] Todos los pings han finalizado. Deteniendo monitoreo del sistema...")
     monitoring_done.set()
 
 def write_to_csv():
-    """Escribe los datos almacenados en la cola al archivo CSV."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando escritura de datos en CSV...")
-    while not monitoring_done.is_set() or not data_queue.empty():
-        while not data_queue.empty():
-            with open(csv_filename, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(data_queue.get())
-        time.sleep(1)
-    jcs.syslog("external.warning", "[MONITOREO] Escritura en CSV finalizada.")
+    """Escribe los datos en el archivo CSV a medida que llegan a la cola."""
+    log.syslog("external.warning", "[MONITOREO] Iniciando escritura en CSV...")
+
+    # El escritor vuelca por su cuenta al llegar a BATCH_SIZE filas o MAX_WRITE_LATENCY segundos
+    with BatchCsvWriter(csv_filename, header=CSV_HEADER, rotation=ROTATION,
+                        batch_size=BATCH_SIZE, flush_interval=MAX_WRITE_LATENCY) as writer:
+        def write_batch(rows):
+            try:
+                writer.writerows(rows)
+            except Exception as e:
+                log.syslog("external.error", f"Error al escribir en CSV: {str(e)}")
+
+        # Bloquea hasta que hay registros; termina al recibir el fin de flujo
+        data_queue.drain(write_batch, batch_size=BATCH_SIZE, max_latency=MAX_WRITE_LATENCY)
+
+    log.syslog("external.warning", f"[MONITOREO] Escritura en CSV finalizada: {writer.stats()} | Cola: {data_queue.stats()}")
 
 def main():
     """Inicia los hilos para la monitorizacion y escritura en CSV."""
-    jcs.syslog("external.warning", "[MONITOREO] Iniciando monitoreo del sistema y red...")
+    log.start()
+    log.syslog("external.warning", "[MONITOREO] Iniciando monitoreo del sistema y red...")
 
     start_time = time.time()  # Iniciar temporizador
 
@@ -108,13 +123,18 @@ def main():
     thread_ping.start()
     thread_csv.start()
 
-    thread_ping.join()
-    monitoring_done.set()
-    thread_sys.join()
-    thread_csv.join()
+    try:
+        thread_ping.join()
+    finally:
+        # El escritor siempre recibe el fin de flujo y no se queda bloqueado en drain
+        monitoring_done.set()
+        thread_sys.join()
+        data_queue.close()
+        thread_csv.join()
 
     total_time = round(time.time() - start_time, 3)  # Calcular tiempo total
-    jcs.syslog("external.warning", f"[FINALIZACION] Monitorizacion completa en {total_time} segundos.")
+    log.syslog("external.warning", f"[FINALIZACION] Monitorizacion completa en {total_time} segundos.")
+    log.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,160 @@
+"""Cola productor/consumidor entre muestreadores, pings y escritores.
+
+El consumidor bloquea en ``get()`` en lugar de sondear ``empty()`` con
+``time.sleep(1)``: se despierta solo cuando llega un registro (o vence
+``max_latency``), recoge sin volver a bloquear los que ya esperan en la cola,
+agrupa hasta ``batch_size`` registros y nunca retiene uno más de
+``max_latency`` segundos. ``wakeups`` cuenta esos despertares, no registros.
+``close()`` encola el centinela ``END_OF_STREAM`` para terminar el drenado
+sin carreras.
+
+Con ``maxsize`` la cola queda acotada y ``overflow`` decide qué hacer cuando
+está llena: ``block`` (el productor espera), ``drop-oldest`` (se descarta el
+registro más antiguo), ``drop-newest`` (se descarta el nuevo) o ``sample``
+(solo 1 de cada ``sample_every`` registros desplaza al más antiguo).
+"""
+
+import queue
+import threading
+import time
+
+END_OF_STREAM = object()
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_MAX_LATENCY = 1.0   # Segundos máximos entre la llegada de un registro y su escritura
+DEFAULT_MAXSIZE = 10000
+DEFAULT_SAMPLE_EVERY = 10
+OVERFLOW_POLICIES = ("block", "drop-oldest", "drop-newest", "sample")
+
+
+class RecordPipeline:
+    """Cola de registros acotada con drenado por lotes y métricas de latencia."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, overflow="block", sample_every=DEFAULT_SAMPLE_EVERY):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desbordamiento no válida: {overflow}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._overflowed = 0
+        self._stats = {
+            "records": 0, "batches": 0, "wakeups": 0,
+            "latency_sum": 0.0, "latency_max": 0.0,
+            "high_water": 0, "dropped": 0, "blocked": 0,
+        }
+
+    # ------------------ Productores ------------------
+    def put(self, record):
+        """Encola un registro aplicando la política de desbordamiento; False si se descartó."""
+        item = (time.monotonic(), record)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if not self._overflow(item):
+                return False
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._stats["high_water"]:
+                self._stats["high_water"] = depth
+        return True
+
+    def _overflow(self, item):
+        if self.overflow == "block":
+            with self._lock:
+                self._stats["blocked"] += 1
+            self._queue.put(item)
+            return True
+
+        with self._lock:
+            self._overflowed += 1
+            keep = (self.overflow == "drop-oldest"
+                    or (self.overflow == "sample" and self._overflowed % self.sample_every == 0))
+            self._stats["dropped"] += 1
+            if not keep:
+                return False
+
+        # Hacer sitio descartando el más antiguo (nunca el centinela de fin)
+        while True:
+            try:
+                oldest = self._queue.get_nowait()
+                if oldest[1] is END_OF_STREAM:
+                    self._queue.put(oldest)
+                    return False
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                with self._lock:
+                    self._stats["dropped"] += 1
+
+    def close(self):
+        """Marca el fin del flujo; llamar cuando ya no quedan productores."""
+        self._queue.put((time.monotonic(), END_OF_STREAM))
+
+    # ------------------ Consumidor ------------------
+    def drain(self, handle_batch, batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY):
+        """Entrega lotes a ``handle_batch(registros)`` hasta recibir ``END_OF_STREAM``."""
+        batch = []
+        oldest = None
+        while True:
+            timeout = None if oldest is None else max(oldest + max_latency - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            with self._lock:
+                self._stats["wakeups"] += 1
+            if item is None:
+                self._flush(handle_batch, batch)
+                batch, oldest = [], None
+                continue
+
+            # Un despertar recoge todo lo que ya está en la cola sin volver a bloquear
+            while item is not None:
+                enqueued_at, record = item
+                if record is END_OF_STREAM:
+                    self._flush(handle_batch, batch)
+                    return
+                batch.append((enqueued_at, record))
+                if oldest is None:
+                    oldest = enqueued_at
+                if len(batch) >= batch_size:
+                    self._flush(handle_batch, batch)
+                    batch, oldest = [], None
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+    def _flush(self, handle_batch, batch):
+        if not batch:
+            return
+        handle_batch([record for _, record in batch])
+        now = time.monotonic()
+        with self._lock:
+            self._stats["records"] += len(batch)
+            self._stats["batches"] += 1
+            for enqueued_at, _ in batch:
+                latency = now - enqueued_at
+                self._stats["latency_sum"] += latency
+                self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+
+    # ------------------ Métricas ------------------
+    def stats(self):
+        """Registros, lotes, despertares, profundidad, descartes y latencia en ms."""
+        with self._lock:
+            records = self._stats["records"]
+            return {
+                "records": records,
+                "batches": self._stats["batches"],
+                "wakeups": self._stats["wakeups"],
+                "depth": self._queue.qsize(),
+                "high_water": self._stats["high_water"],
+                "dropped": self._stats["dropped"],
+                "blocked": self._stats["blocked"],
+                "latency_avg_ms": round(1000 * self._stats["latency_sum"] / records, 3) if records else 0.0,
+                "latency_max_ms": round(1000 * self._stats["latency_max"], 3),
+            }
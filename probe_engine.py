@@ -0,0 +1,194 @@
+"""Motor asíncrono de pruebas de ping para Junos (on-box).
+
+Cada RPC de ping en vuelo es una tarea de asyncio con su propio plazo
+(deadline). Un semáforo limita cuántas RPC hay en vuelo a la vez, de forma
+que se pueden lanzar cientos de destinos por ciclo sin crear un hilo por
+destino.
+
+Las RPC de PyEZ son bloqueantes, así que cada tarea ejecuta ``probe_fn`` en
+un ejecutor cuyo tamaño es igual al límite de concurrencia: el número de
+hilos queda acotado por ``concurrency`` y no por ``len(hosts)``.
+
+``wait_for`` abandona la espera al vencer el plazo, pero la RPC sigue en su
+hilo hasta que termina. Por eso el hueco de concurrencia no se libera al
+vencer el plazo sino cuando el hilo acaba: un ping abandonado sigue contando
+como en vuelo, las siguientes tareas nunca esperan en la cola del ejecutor y
+su plazo empieza cuando de verdad arranca su RPC. ``probe_fn`` debe acotar
+la RPC con ``dev_timeout`` para que esos hilos terminen (y el intérprete
+pueda salir) poco después del plazo.
+
+``timeout`` puede ser un número o una función ``timeout(host)`` para pruebas
+de distinto tamaño (p. ej. hosts repetidos fusionados en un ping más largo).
+
+Con ``on_result`` cada par ``(host, resultado)`` se entrega en cuanto termina
+su prueba, sin esperar al resto del lote.
+
+Con ``controller`` (un ``aimd.AimdController``) el límite deja de ser fijo:
+cada tarea espera a que haya menos RPC en vuelo que ``controller.limit`` y
+al terminar informa su latencia y si venció el plazo. ``concurrency`` pasa a
+ser solo el tamaño del ejecutor (el máximo del controlador).
+
+Con ``deadline`` (un ``deadline.RunDeadline``) cada tarea, al obtener su
+turno, comprueba que el ping estimado quepa en el tiempo restante del ciclo;
+si no, devuelve ``on_skip`` sin lanzar la RPC. El plazo de cada ping se acota
+al tiempo restante y los que vencen por el fin del ciclo se registran como
+cancelados. Las tareas obtienen turno en el orden de ``hosts``.
+
+La latencia que se pasa al controlador es, por defecto, la de la tarea desde
+que lanza ``probe_fn``, que incluye esperas locales (sesión del pool, RPC
+compartida). Si ``probe_fn`` devuelve ``Timed(resultado, latencia,
+inicio)``, el controlador recibe solo la latencia medida por ``probe_fn``
+(p. ej. de la RPC tras obtener la sesión) y la tarea entrega ``resultado``;
+con ``latencia`` None la respuesta no cuenta para el controlador.
+
+Con ``throttle`` (una función sin argumentos que devuelve una corutina, p. ej.
+``governor.ResourceGovernor.athrottle``) cada tarea espera el freno por
+recursos antes de pedir hueco, una tras otra: la espera no ocupa hueco de
+concurrencia ni cuenta en el plazo ni en la latencia de la prueba.
+"""
+
+import asyncio
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from deadline import SKIPPED_RESULT
+
+# ------------------ Configuración por defecto ------------------
+DEFAULT_CONCURRENCY = 50   # RPC de ping simultáneas
+DEFAULT_TIMEOUT = 90       # Plazo por prueba en segundos
+TIMEOUT_RESULT = "Timeout"
+
+# Resultado de ``probe_fn`` con la latencia de su RPC (sin esperas locales)
+Timed = namedtuple("Timed", ["result", "latency", "started"], defaults=[None, None])
+
+
+# ------------------ Límite adaptativo ------------------
+class _AdaptiveGate:
+    """Sustituto del semáforo cuyo límite lee de ``controller.limit``."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.in_flight = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        while self.in_flight >= self.controller.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        free = self.controller.limit - self.in_flight
+        while self._waiters and free > 0:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+# ------------------ Tarea individual ------------------
+def _release(semaphore, future):
+    """Libera el hueco de un hilo terminado y recoge su error si nadie lo esperaba ya."""
+    semaphore.release()
+    if not future.cancelled():
+        future.exception()
+
+
+async def _run_probe(executor, semaphore, probe_fn, host, timeout, on_timeout, controller=None,
+                     deadline=None, on_skip=SKIPPED_RESULT, throttle=None, throttle_lock=None):
+    """Ejecuta ``probe_fn(host)`` respetando el freno, el semáforo, el plazo y el fin del ciclo."""
+    loop = asyncio.get_running_loop()
+    if callable(timeout):
+        timeout = timeout(host)
+    if throttle is not None:
+        # Una sola tarea consulta el freno a la vez; las demás esperan su turno detrás
+        async with throttle_lock:
+            await throttle()
+    await semaphore.acquire()
+    if deadline is not None:
+        if not deadline.admits():
+            semaphore.release()
+            deadline.skip(host)
+            return host, on_skip(host) if callable(on_skip) else on_skip
+        probe_timeout = deadline.timeout(timeout)
+    else:
+        probe_timeout = timeout
+    start = time.monotonic()
+    future = loop.run_in_executor(executor, probe_fn, host)
+    # El hueco se libera cuando termina el hilo, no cuando vence el plazo
+    future.add_done_callback(lambda done: _release(semaphore, done))
+    timed_out = False
+    latency, rpc_started = None, start
+    try:
+        result = await asyncio.wait_for(asyncio.shield(future), probe_timeout)
+        if isinstance(result, Timed):
+            result, latency, rpc_started = result.result, result.latency, result.started or start
+        else:
+            latency = time.monotonic() - start
+    except asyncio.TimeoutError:
+        timed_out = True
+        if deadline is not None and probe_timeout < timeout:
+            deadline.cancel(host)
+            return host, on_skip(host) if callable(on_skip) else on_skip
+        result = on_timeout(host) if callable(on_timeout) else on_timeout
+        latency = time.monotonic() - start
+    # Un resultado de omisión (p. ej. la RPC falló al vencer el fin del ciclo) no es una duración real
+    skipped = on_skip(host) if callable(on_skip) else on_skip
+    if deadline is not None and not timed_out and result != skipped:
+        deadline.observe(time.monotonic() - start)
+    if controller is not None and latency is not None:
+        controller.record(latency, timed_out, rpc_started)
+    return host, result
+
+
+# ------------------ Ejecución de un lote ------------------
+async def probe_all(probe_fn, hosts, concurrency=DEFAULT_CONCURRENCY,
+                    timeout=DEFAULT_TIMEOUT, on_timeout=TIMEOUT_RESULT, controller=None,
+                    deadline=None, on_skip=SKIPPED_RESULT, on_result=None, throttle=None):
+    """Lanza una tarea por host y devuelve pares ``(host, resultado)``.
+
+    Los pares se devuelven en orden de finalización, igual que
+    ``as_completed`` en las versiones con ``ThreadPoolExecutor``; si se pasa
+    ``on_result(host, resultado)`` se llama con cada par al terminar.
+    """
+    if controller is not None:
+        semaphore = _AdaptiveGate(controller)
+        concurrency = max(concurrency, controller.maximum)
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+    throttle_lock = asyncio.Lock() if throttle is not None else None
+    results = []
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        tasks = [
+            asyncio.ensure_future(
+                _run_probe(executor, semaphore, probe_fn, host, timeout, on_timeout, controller,
+                           deadline, on_skip, throttle, throttle_lock)
+            )
+            for host in hosts
+        ]
+        for task in asyncio.as_completed(tasks):
+            host, result = await task
+            results.append((host, result))
+            if on_result is not None:
+                on_result(host, result)
+    finally:
+        # No esperar a hilos cuyas RPC ya vencieron su plazo
+        executor.shutdown(wait=False)
+
+    return results
+
+
+def run_probes(probe_fn, hosts, concurrency=DEFAULT_CONCURRENCY,
+               timeout=DEFAULT_TIMEOUT, on_timeout=TIMEOUT_RESULT, controller=None,
+               deadline=None, on_skip=SKIPPED_RESULT, on_result=None, throttle=None):
+    """Punto de entrada síncrono para los scripts: ejecuta ``probe_all``."""
+    return asyncio.run(
+        probe_all(probe_fn, hosts, concurrency=concurrency,
+                  timeout=timeout, on_timeout=on_timeout, controller=controller,
+                  deadline=deadline, on_skip=on_skip, on_result=on_result, throttle=throttle)
+    )
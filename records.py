@@ -0,0 +1,111 @@
+"""Flujos de salida normalizados: muestras del sistema y resultados de ping.
+
+Cada muestra de CPU/memoria/disco se escribe una sola vez en el flujo
+``system`` y cada resultado de ping en el flujo ``probe``; ambos comparten el
+``Sample ID`` de la muestra vigente cuando se registró el ping. Así la
+muestra no se duplica por cada host y ``join_streams`` reconstruye la vista
+combinada cuando hace falta para un informe. Con ``rotation`` cada flujo se
+rota por separado y ``join_streams`` recorre también sus segmentos.
+"""
+
+import csv
+import sys
+import time
+
+from csv_writer import BatchCsvWriter
+from segments import open_segments
+
+SYSTEM_STREAM = "system"
+PROBE_STREAM = "probe"
+
+SYSTEM_HEADER = ["Sample ID", "Timestamp", "CPU (%)", "Memoria (%)", "Disco (%)"]
+PROBE_HEADER = ["Sample ID", "Timestamp", "Host", "Ping", "Edad Muestra (s)"]
+
+
+# ------------------ Registros ------------------
+def system_record(snapshot):
+    """Registro del flujo ``system`` a partir de una ``SystemSnapshot``."""
+    return SYSTEM_STREAM, [snapshot.sample_id, snapshot.timestamp, snapshot.cpu_percent,
+                           snapshot.mem_percent, snapshot.disk_percent]
+
+
+def probe_record(snapshot, age, host, result):
+    """Registro del flujo ``probe`` enlazado a la muestra vigente."""
+    return PROBE_STREAM, [snapshot.sample_id, time.strftime("%Y-%m-%d %H:%M:%S"), host, result, age]
+
+
+# ------------------ Escritura ------------------
+class StreamWriters:
+    """Un ``BatchCsvWriter`` por flujo; reparte los lotes de la cola.
+
+    Cada escritor vuelca según su propio ``batch_size``/``flush_interval``
+    (pasar ``flush_interval`` igual a la latencia máxima de la cola); aquí
+    no se fuerza un volcado por lote, que anularía el agrupamiento.
+    """
+
+    def __init__(self, system_path, probe_path, **writer_options):
+        self._writers = {
+            SYSTEM_STREAM: BatchCsvWriter(system_path, header=SYSTEM_HEADER, **writer_options),
+            PROBE_STREAM: BatchCsvWriter(probe_path, header=PROBE_HEADER, **writer_options),
+        }
+
+    def write_batch(self, records):
+        rows = {stream: [] for stream in self._writers}
+        for stream, row in records:
+            rows[stream].append(row)
+        for stream, writer in self._writers.items():
+            if rows[stream]:
+                writer.writerows(rows[stream])
+            else:
+                # Un flujo sin filas nuevas también vuelca lo pendiente si ya venció su plazo
+                writer.flush_if_due()
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def stats(self):
+        return {stream: writer.stats() for stream, writer in self._writers.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------ Unión para informes ------------------
+def join_streams(system_path, probe_path, start=None, end=None):
+    """Genera un dict por resultado de ping con las métricas de su muestra.
+
+    El flujo ``system`` es pequeño (una fila por muestra) y se indexa en
+    memoria; el flujo ``probe`` se recorre sin cargarlo entero. ``start`` y
+    ``end`` (época) permiten saltar segmentos rotados fuera del rango.
+    """
+    samples = {}
+    for file in open_segments(system_path, start, end):
+        with file:
+            samples.update((row["Sample ID"], row) for row in csv.DictReader(file))
+
+    for file in open_segments(probe_path, start, end):
+        with file:
+            for probe in csv.DictReader(file):
+                sample = samples.get(probe["Sample ID"], {})
+                joined = dict(probe)
+                for column in SYSTEM_HEADER[2:]:
+                    joined[column] = sample.get(column, "")
+                yield joined
+
+
+def main():
+    """Uso: ``python records.py system_samples.csv probe_results.csv > unido.csv``."""
+    if len(sys.argv) != 3:
+        print(main.__doc__, file=sys.stderr)
+        sys.exit(2)
+    writer = csv.DictWriter(sys.stdout, fieldnames=PROBE_HEADER + SYSTEM_HEADER[2:])
+    writer.writeheader()
+    writer.writerows(join_streams(sys.argv[1], sys.argv[2]))
+
+
+if __name__ == "__main__":
+    main()
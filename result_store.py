@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""Almacén binario de resultados de ping, de solo anexado.
+
+Cada resultado es un registro de ancho fijo (``RECORD``, 48 bytes) con
+marca de tiempo en nanosegundos de época, id de host, paquetes enviados y
+recibidos, estadísticas de RTT y métricas del sistema. Escribir es un
+``struct.pack`` sin formatear floats a texto; leer usa ``mmap`` y, si NumPy
+está instalado, devuelve cada columna como vista sin copia del fichero.
+
+Los nombres de host se guardan aparte en ``<fichero>.hosts`` (una línea por
+id). Al abrir, un registro a medio escribir al final (corte durante una
+escritura) se recorta, para que los siguientes queden alineados. Con
+``rotation`` (una ``segments.RotationPolicy``) el fichero se rota como los
+CSV: cada segmento lleva su propio ``.hosts`` y el total respeta el
+presupuesto de disco. La exportación a CSV queda para consultas manuales::
+
+    python result_store.py export /var/db/scripts/op/ping_results.bin > resultados.csv
+"""
+
+import argparse
+import csv
+import gzip
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from segments import SegmentManager
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ------------------ Formato ------------------
+MAGIC = b"PRTT"
+VERSION = 1
+HEADER = struct.Struct("<4sHH8x")                 # magic, versión, tamaño de registro
+RECORD = struct.Struct("<qIIIfffffff")
+FIELDS = (
+    "ts_ns", "host_id", "sent", "received",
+    "rtt_min", "rtt_max", "rtt_avg", "rtt_p95",
+    "cpu", "mem", "disk",
+)
+_TYPECODES = "qIIIfffffff"
+
+
+def _dtype():
+    return np.dtype({
+        "names": list(FIELDS),
+        "formats": ["<i8", "<u4", "<u4", "<u4"] + ["<f4"] * 7,
+        "offsets": [0, 8, 12, 16] + [20 + 4 * i for i in range(7)],
+        "itemsize": RECORD.size,
+    })
+
+
+# ------------------ Tabla de hosts ------------------
+class HostTable:
+    """Asignación host <-> id persistida en ``<fichero>.hosts``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.names = []
+        if os.path.exists(path):
+            with open(path) as file:
+                self.names = [line.rstrip("\n") for line in file]
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+    def id_for(self, host):
+        host_id = self.ids.get(host)
+        if host_id is None:
+            host_id = self.ids[host] = len(self.names)
+            self.names.append(host)
+            with open(self.path, "a") as file:
+                file.write(host + "\n")
+        return host_id
+
+    def name(self, host_id):
+        return self.names[host_id] if host_id < len(self.names) else str(host_id)
+
+
+# ------------------ Escritura ------------------
+def recover(path):
+    """Recorta un registro incompleto al final de ``path``; devuelve los registros completos."""
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    if size < HEADER.size:
+        # Ni la cabecera llegó a escribirse: se vuelve a empezar
+        os.truncate(path, 0)
+        return 0
+    with open(path, "rb") as file:
+        magic, version, record_size = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f"{path} no es un almacén de resultados v{VERSION}")
+    count = (size - HEADER.size) // RECORD.size
+    if HEADER.size + count * RECORD.size != size:
+        os.truncate(path, HEADER.size + count * RECORD.size)
+    return count
+
+
+class ResultStore:
+    """Escritor de registros binarios con un descriptor abierto."""
+
+    # Ficheros que acompañan al activo al rotar
+    COMPANIONS = (".hosts",)
+
+    def __init__(self, path, rotation=None):
+        self.path = path
+        self._segments = SegmentManager(path, rotation, self.COMPANIONS) if rotation is not None else None
+        self._open()
+
+    def _open(self):
+        self._records = recover(self.path)
+        self.hosts = HostTable(self.path + ".hosts")
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def _close_files(self):
+        self._file.close()
+
+    def _rotate(self):
+        self._close_files()
+        self._segments.rotate()
+        self._open()
+
+    def append(self, host, sent, received, rtt_min, rtt_max, rtt_avg, rtt_p95,
+               cpu, mem, disk, ts_ns=None):
+        """Añade un resultado; devuelve el offset en bytes del registro (en el fichero activo)."""
+        ts_ns = time.time_ns() if ts_ns is None else ts_ns
+        if self._segments is not None and self._segments.should_rotate(self._file.tell(), ts_ns / 1e9):
+            self._rotate()
+        offset = self._file.tell()
+        self._file.write(RECORD.pack(
+            ts_ns, self.hosts.id_for(host), sent, received,
+            rtt_min, rtt_max, rtt_avg, rtt_p95, cpu, mem, disk,
+        ))
+        self._records += 1
+        if self._segments is not None:
+            self._segments.record_write(ts_ns / 1e9)
+        return offset
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._close_files()
+        if self._segments is not None:
+            self._segments.close()
+
+    def stats(self):
+        """Registros del fichero activo y, con rotación, los datos de los segmentos."""
+        stats = {"records": self._records}
+        if self._segments is not None:
+            stats["segments"] = self._segments.stats()
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------ Lectura ------------------
+class ResultReader:
+    """Lector por ``mmap``; columnas como arrays de NumPy (o ``array`` sin NumPy).
+
+    Un segmento comprimido (``.gz``) se descomprime entero en memoria.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Los ficheros asociados de un segmento comprimido no llevan el ``.gz``
+        self.base = path[:-3] if path.endswith(".gz") else path
+        self.hosts = HostTable(self.base + ".hosts")
+        if path.endswith(".gz"):
+            self._file = gzip.open(path, "rb")
+            self._map = self._file.read()
+            size = len(self._map)
+        else:
+            self._file = open(path, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size:
+            magic, version, record_size = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{path} no es un almacén de resultados v{VERSION}")
+        # Un registro a medio escribir al final se ignora
+        self.count = max(size - HEADER.size, 0) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, index):
+        return HEADER.size + index * RECORD.size
+
+    def records(self, start=0, stop=None):
+        """Itera tuplas en el orden de ``FIELDS``."""
+        stop = self.count if stop is None else min(stop, self.count)
+        for i in range(start, stop):
+            yield RECORD.unpack_from(self._map, self._offset(i))
+
+    def columns(self, start=0, stop=None):
+        """Dict ``campo -> array`` con los registros ``[start, stop)``."""
+        stop = self.count if stop is None else min(stop, self.count)
+        n = max(stop - start, 0)
+        if np is not None:
+            table = np.frombuffer(self._map, dtype=_dtype(), count=n, offset=self._offset(start)) if n else \
+                np.empty(0, dtype=_dtype())
+            return {name: table[name] for name in FIELDS}
+
+        cols = {name: array(code) for name, code in zip(FIELDS, _TYPECODES)}
+        for record in self.records(start, stop):
+            for name, value in zip(FIELDS, record):
+                cols[name].append(value)
+        return cols
+
+    def export_csv(self, out, start=0, stop=None):
+        """Exporta a CSV legible (hora local y nombre de host)."""
+        writer = csv.writer(out)
+        writer.writerow(["Hora"] + ["Host"] + list(FIELDS[2:]))
+        for record in self.records(start, stop):
+            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record[0] / 1e9))
+            writer.writerow([ts, self.hosts.name(record[1])] + [round(v, 3) for v in record[2:]])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                # Siguen vivas columnas sin copia; el mmap se libera con ellas
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------ CLI ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Consulta del almacén binario de resultados")
+    parser.add_argument("command", choices=["export", "info"])
+    parser.add_argument("path", help="Fichero .bin de resultados")
+    args = parser.parse_args()
+
+    with ResultReader(args.path) as reader:
+        if args.command == "export":
+            reader.export_csv(sys.stdout)
+        else:
+            print(f"{args.path}: {len(reader)} registros de {RECORD.size} bytes, "
+                  f"{len(reader.hosts.names)} hosts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Agregados incrementales de RTT por host a varias resoluciones.
+
+Cada resultado de ping se suma, en O(1) respecto al histórico, a la ventana
+abierta de su host en cada resolución (1 min, 5 min y 1 h por defecto). La
+ventana es un ``RttSketch``: conteo, pérdida, mínimo, máximo, media y
+cuantiles sin guardar los RTT crudos. Cuando llega un resultado de una
+ventana posterior, o al cerrar el motor si la ventana ya venció, se escribe
+una fila en ``<directorio>/rtt_<resolución>.csv``.
+
+Los scripts de ping se ejecutan una vez por invocación, así que las ventanas
+abiertas se guardan en ``<directorio>/state.json`` al cerrar y se recuperan
+en la siguiente ejecución. Con los agregados escritos, ``expire_raw`` puede
+borrar los segmentos crudos (ver ``segments.py``) más antiguos que la
+retención::
+
+    python rollup.py /var/db/scripts/op/rollups 1h --host 204.124.107.82
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+from csv_writer import BatchCsvWriter
+from rtt_sketch import RttSketch
+from segments import SegmentIndex, open_segments, remove_segment
+
+# Nombre, ancho de ventana en segundos
+DEFAULT_RESOLUTIONS = (("1m", 60), ("5m", 300), ("1h", 3600))
+ROLLUP_HEADER = ["Inicio", "Hora", "Host", "Enviados", "Recibidos", "Perdida (%)",
+                 "RTT Min", "RTT Max", "RTT Prom", "RTT p50", "RTT p95", "RTT p99", "Jitter"]
+
+
+def _row(start, host, sketch):
+    summary = sketch.summary()
+    return [
+        start, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start)), host,
+        summary["sent"], summary["count"], summary["loss"],
+        round(summary["min"], 3), round(summary["max"], 3), round(summary["mean"], 3),
+        round(summary["p50"], 3), round(summary["p95"], 3), round(summary["p99"], 3),
+        round(summary["jitter"], 3),
+    ]
+
+
+class RollupEngine:
+    """Mantiene una ventana abierta por (resolución, host) y escribe las cerradas."""
+
+    def __init__(self, directory, resolutions=DEFAULT_RESOLUTIONS, **writer_options):
+        self.directory = directory
+        self.resolutions = resolutions
+        os.makedirs(directory, exist_ok=True)
+        self.state_path = os.path.join(directory, "state.json")
+        self._lock = threading.Lock()
+        self._writers = {
+            name: BatchCsvWriter(os.path.join(directory, f"rtt_{name}.csv"), header=ROLLUP_HEADER, **writer_options)
+            for name, _ in resolutions
+        }
+        # {resolución: {host: (inicio_de_ventana, RttSketch)}}
+        self._open = {name: {} for name, _ in resolutions}
+        self._stats = {"results": 0, "windows_closed": 0, "late": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path) as file:
+            data = json.load(file)
+        for name, hosts in data.items():
+            if name in self._open:
+                for host, (start, sketch) in hosts.items():
+                    self._open[name][host] = (start, RttSketch.from_dict(sketch))
+
+    def _save(self):
+        data = {name: {host: [start, sketch.to_dict()] for host, (start, sketch) in hosts.items()}
+                for name, hosts in self._open.items()}
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp, self.state_path)
+
+    # ------------------ Inserción ------------------
+    def add(self, host, rtts, sent, ts=None):
+        """Suma un resultado (RTT por paquete y paquetes enviados) a cada resolución."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._stats["results"] += 1
+            for name, width in self.resolutions:
+                start = int(ts // width * width)
+                current = self._open[name].get(host)
+                if current is None or current[0] == start:
+                    sketch = current[1] if current else RttSketch()
+                    self._open[name][host] = (start, sketch.add_probe(rtts, sent))
+                elif current[0] < start:
+                    self._emit(name, host, *current)
+                    self._open[name][host] = (start, RttSketch().add_probe(rtts, sent))
+                else:
+                    # Resultado de una ventana ya cerrada (p. ej. reloj ajustado): fila parcial aparte
+                    self._stats["late"] += 1
+                    self._emit(name, host, start, RttSketch().add_probe(rtts, sent))
+
+    def _emit(self, name, host, start, sketch):
+        self._writers[name].writerow(_row(start, host, sketch))
+        self._stats["windows_closed"] += 1
+
+    def close_expired(self, now=None):
+        """Escribe las ventanas que ya terminaron aunque no haya llegado otro resultado."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for name, width in self.resolutions:
+                for host, (start, sketch) in list(self._open[name].items()):
+                    if start + width <= now:
+                        self._emit(name, host, start, sketch)
+                        del self._open[name][host]
+
+    # ------------------ Cierre y métricas ------------------
+    def close(self):
+        """Cierra ventanas vencidas, guarda las abiertas y vuelca los ficheros."""
+        self.close_expired()
+        with self._lock:
+            self._save()
+            for writer in self._writers.values():
+                writer.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_windows"] = sum(len(hosts) for hosts in self._open.values())
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ------------------ Retención de datos crudos ------------------
+def expire_raw(path, retention, now=None, companions=(".hosts", ".idx")):
+    """Borra los segmentos rotados de ``path`` cuya última escritura supera ``retention`` s.
+
+    Con cada segmento se borran sus ``companions`` (los del almacén binario, si los hay).
+    """
+    now = time.time() if now is None else now
+    index = SegmentIndex(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    removed = []
+    for segment in index.snapshot():
+        if segment["last_ts"] >= now - retention:
+            continue
+        remove_segment(directory, segment["file"], companions)
+        index.remove(segment["file"])
+        removed.append(segment["file"])
+    return removed
+
+
+# ------------------ Lectura ------------------
+def read_rollups(directory, resolution, start=None, end=None, host=None):
+    """Genera las filas de una resolución filtradas por rango de época y host.
+
+    Con rotación (``rotation`` en las opciones del escritor) se leen también los segmentos.
+    """
+    # Una fila se escribe al cerrar su ventana, después de "Inicio": el fin se filtra por filas
+    for file in open_segments(os.path.join(directory, f"rtt_{resolution}.csv"), start):
+        with file:
+            for row in csv.DictReader(file):
+                window = int(row["Inicio"])
+                if start is not None and window < start:
+                    continue
+                if end is not None and window > end:
+                    continue
+                if host is not None and row["Host"] != host:
+                    continue
+                yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta de agregados de RTT")
+    parser.add_argument("directory", help="Directorio de agregados")
+    parser.add_argument("resolution", choices=[name for name, _ in DEFAULT_RESOLUTIONS])
+    parser.add_argument("--host", help="Filtrar por host")
+    parser.add_argument("--start", type=float, help="Época inicial")
+    parser.add_argument("--end", type=float, help="Época final")
+    args = parser.parse_args()
+
+    writer = csv.DictWriter(sys.stdout, fieldnames=ROLLUP_HEADER)
+    writer.writeheader()
+    writer.writerows(read_rollups(args.directory, args.resolution, args.start, args.end, args.host))
+
+
+if __name__ == "__main__":
+    main()
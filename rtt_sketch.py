@@ -0,0 +1,178 @@
+"""Resumen de RTT de tamaño fijo y combinable para ejecuciones por bloques.
+
+``RttSketch`` guarda conteo, suma, suma de cuadrados, mínimo, máximo y un
+histograma logarítmico tipo DDSketch: cada cuantil estimado tiene un error
+relativo acotado por ``relative_accuracy``. Cada bloque produce su propio
+sketch y el coordinador los combina con ``merge`` en memoria O(1), sin
+guardar listas de mínimos/máximos/promedios por bloque.
+"""
+
+import math
+
+DEFAULT_RELATIVE_ACCURACY = 0.01   # 1% de error relativo en los cuantiles
+DEFAULT_MAX_BUCKETS = 2048
+MIN_INDEXABLE = 1e-9               # RTT menores cuentan en el cubo cero
+
+
+class RttSketch:
+    """Sketch combinable de RTT (conteo, momentos, extremos y cuantiles)."""
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+                 max_buckets=DEFAULT_MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.sent = 0
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.zero_count = 0
+        self.buckets = {}
+        self.jitter_sum = 0.0    # Suma de |RTT[i] - RTT[i-1]| dentro de cada RPC
+        self.jitter_pairs = 0
+
+    # ------------------ Inserción ------------------
+    def add(self, value, n=1):
+        """Añade ``n`` respuestas con RTT ``value``."""
+        self.count += n
+        self.sum += value * n
+        self.sumsq += value * value * n
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < MIN_INDEXABLE:
+            self.zero_count += n
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + n
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def add_probe(self, rtts, sent=None):
+        """Añade los RTT de una RPC de ping y los paquetes enviados (para la pérdida)."""
+        previous = None
+        for value in rtts:
+            self.add(value)
+            if previous is not None:
+                self.jitter_sum += abs(value - previous)
+                self.jitter_pairs += 1
+            previous = value
+        self.sent += len(rtts) if sent is None else sent
+        return self
+
+    def _collapse(self):
+        """Junta los cubos más bajos para mantener el tamaño fijo."""
+        keys = sorted(self.buckets)
+        extra = len(keys) - self.max_buckets
+        target = keys[extra]
+        for key in keys[:extra]:
+            self.buckets[target] += self.buckets.pop(key)
+
+    # ------------------ Combinación ------------------
+    def merge(self, other):
+        """Combina ``other`` en este sketch; ambos deben tener la misma precisión."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("No se pueden combinar sketches con distinta precisión")
+        self.sent += other.sent
+        self.count += other.count
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.zero_count += other.zero_count
+        self.jitter_sum += other.jitter_sum
+        self.jitter_pairs += other.jitter_pairs
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    # ------------------ Consultas ------------------
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.sumsq - self.sum * self.sum / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def jitter(self):
+        return self.jitter_sum / self.jitter_pairs if self.jitter_pairs else 0.0
+
+    @property
+    def loss(self):
+        return round(100.0 * (self.sent - self.count) / self.sent, 2) if self.sent else 0.0
+
+    def quantile(self, q):
+        """Cuantil ``q`` (0..1) con error relativo acotado."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Diccionario con las mismas claves que ``rtt_stats.summarize_rtts``."""
+        empty = not self.count
+        return {
+            "sent": self.sent,
+            "count": self.count,
+            "loss": self.loss,
+            "sum": self.sum,
+            "sumsq": self.sumsq,
+            "min": 0.0 if empty else self.min,
+            "max": 0.0 if empty else self.max,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "jitter": self.jitter,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    # ------------------ Serialización ------------------
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "sent": self.sent,
+            "count": self.count,
+            "sum": self.sum,
+            "sumsq": self.sumsq,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero_count": self.zero_count,
+            "jitter_sum": self.jitter_sum,
+            "jitter_pairs": self.jitter_pairs,
+            "buckets": {str(k): n for k, n in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.sent = data["sent"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.sumsq = data["sumsq"]
+        if data["min"] is not None:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        sketch.zero_count = data["zero_count"]
+        sketch.jitter_sum = data["jitter_sum"]
+        sketch.jitter_pairs = data["jitter_pairs"]
+        sketch.buckets = {int(k): n for k, n in data["buckets"].items()}
+        return sketch
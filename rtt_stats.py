@@ -0,0 +1,183 @@
+"""Extracción de RTT por paquete y estadísticas por host a partir del RPC de ping.
+
+El resumen ``probe-results-summary`` solo trae mínimo, máximo y promedio. Aquí
+se leen todos los ``probe-result/rtt`` de la respuesta en un ``array('d')``
+compacto y se calculan media, desviación estándar, percentiles exactos,
+jitter y pérdida. Los RTT se mantienen en las unidades de la respuesta RPC.
+
+``parse_probe_rtts`` recorre la respuesta ya materializada por PyEZ con
+``findall``/``findtext`` y queda como referencia. ``stream_probe_rtts``
+consume el XML en bruto (p. ej. la salida de ``cli -c "ping ... | display
+xml"`` leída de la tubería) con un parser incremental: cada ``probe-result``
+se descarta en cuanto se lee su RTT, así que el árbol no crece con ``count``
+y solo quedan los valores en el ``array('d')``. Para comprobar que ambos
+devuelven lo mismo sobre una respuesta guardada::
+
+    python rtt_stats.py compare respuesta.xml
+"""
+
+import argparse
+import io
+import math
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from array import array
+
+PERCENTILES = (50, 95, 99)
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes leídos por iteración del parser
+
+
+# ------------------ Parser de la respuesta RPC ------------------
+def parse_probe_rtts(result):
+    """Devuelve ``(rtts, enviados)`` con el RTT de cada ``probe-result`` respondido."""
+    rtts = array("d")
+    probes = result.findall("probe-result")
+    for probe in probes:
+        rtt = probe.findtext("rtt")
+        if rtt is not None and rtt.strip():
+            rtts.append(float(rtt))
+
+    sent = result.findtext("probe-results-summary/probes-sent")
+    sent = int(sent.strip()) if sent is not None and sent.strip() else len(probes)
+    return rtts, sent
+
+
+# ------------------ Parser incremental ------------------
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def stream_probe_rtts(source, chunk_size=STREAM_CHUNK_SIZE):
+    """Versión incremental de ``parse_probe_rtts`` sobre XML en bruto; devuelve ``(rtts, enviados)``.
+
+    ``source`` es un objeto tipo fichero (p. ej. la salida de un proceso) o
+    la respuesta en ``bytes``/``str``. Cada ``probe-result`` se quita del
+    árbol al cerrarse, con memoria constante respecto a ``count``.
+    """
+    if isinstance(source, str):
+        source = source.encode()
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    rtts = array("d")
+    sent = None
+    probes = 0
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        parser.feed(data)
+        for event, el in parser.read_events():
+            if event == "start":
+                stack.append(el)
+                continue
+            stack.pop()
+            tag = _local(el.tag)
+            if tag == "rtt":
+                if el.text and el.text.strip():
+                    rtts.append(float(el.text))
+            elif tag == "probe-result":
+                probes += 1
+                if stack:
+                    stack[-1].remove(el)
+            elif tag == "probes-sent" and el.text and el.text.strip():
+                sent = int(el.text)
+    parser.close()
+    return rtts, sent if sent is not None else probes
+
+
+def timed_parse(parse_fn, source):
+    """Ejecuta ``parse_fn(source)`` y devuelve ``(rtts, enviados, segundos)``."""
+    start = time.perf_counter()
+    rtts, sent = parse_fn(source)
+    return rtts, sent, time.perf_counter() - start
+
+
+# ------------------ Estadísticas ------------------
+def percentile(sorted_values, p):
+    """Percentil exacto con interpolación lineal sobre valores ya ordenados."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_rtts(rtts, sent=None):
+    """Calcula las estadísticas de un host a partir de sus RTT por paquete."""
+    count = len(rtts)
+    sent = count if sent is None else sent
+    summary = {
+        "sent": sent,
+        "count": count,
+        "loss": round(100.0 * (sent - count) / sent, 2) if sent else 0.0,
+        "sum": math.fsum(rtts),
+        "sumsq": math.fsum(v * v for v in rtts),
+        "min": 0.0, "max": 0.0, "mean": 0.0, "stddev": 0.0, "jitter": 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}"] = 0.0
+    if not count:
+        return summary
+
+    ordered = sorted(rtts)
+    summary["min"] = ordered[0]
+    summary["max"] = ordered[-1]
+    summary["mean"] = summary["sum"] / count
+    summary["stddev"] = _stddev(count, summary["sum"], summary["sumsq"])
+    # Jitter: media simple de |RTT[i] - RTT[i-1]| entre paquetes consecutivos. No es el
+    # estimador suavizado de RFC 3550 (J += (|D| - J) / 16), que depende del orden y no se
+    # puede combinar entre bloques; la media simple sí (ver RttSketch)
+    if count > 1:
+        summary["jitter"] = math.fsum(abs(b - a) for a, b in zip(rtts, rtts[1:])) / (count - 1)
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(ordered, p)
+    return summary
+
+
+def _stddev(count, total, total_sq):
+    if count < 2:
+        return 0.0
+    variance = (total_sq - total * total / count) / (count - 1)
+    return math.sqrt(max(variance, 0.0))
+
+
+# ------------------ CLI ------------------
+def _measure(parse_fn, source):
+    """``(rtts, enviados, segundos, pico de memoria en bytes)`` de un parser."""
+    tracemalloc.start()
+    try:
+        rtts, sent, seconds = timed_parse(parse_fn, source)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return rtts, sent, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el parser incremental con el de referencia")
+    parser.add_argument("command", choices=["compare"])
+    parser.add_argument("path", help="Respuesta XML del RPC de ping")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as file:
+        reference = _measure(lambda f: parse_probe_rtts(ET.parse(f).getroot()), file)
+    with open(args.path, "rb") as file:
+        streamed = _measure(stream_probe_rtts, file)
+    for name, (rtts, sent, seconds, peak) in (("findtext", reference), ("stream", streamed)):
+        print(f"{name:8} {len(rtts)} RTT de {sent} enviados en {1000 * seconds:.1f} ms, "
+              f"pico {peak / 1024:.0f} KiB")
+    if list(reference[0]) != list(streamed[0]) or reference[1] != streamed[1]:
+        print("Los parsers no coinciden")
+        sys.exit(1)
+    print("Mismos RTT y enviados")
+
+
+if __name__ == "__main__":
+    main()
+
@@ -0,0 +1,343 @@
+"""Rotación de ficheros de resultados por tamaño y antigüedad.
+
+Los CSV de ``/var/db/scripts/op`` solo crecían (``mode="a"``) en una flash
+pequeña. ``SegmentManager`` cierra el fichero activo cuando supera
+``max_bytes`` o ``max_age`` segundos, lo renombra como segmento
+(``<base>.<AAAAMMDD-HHMMSS><ext>``), lo comprime con gzip en un hilo de
+fondo y borra los segmentos más antiguos mientras el total supere
+``disk_budget``. El presupuesto es de la política, no de cada fichero: todos
+los ficheros rotados con la misma ``RotationPolicy`` (CSV, ``.bin`` con su
+``.idx``, agregados) suman en él y se borra primero el segmento más antiguo
+de cualquiera de ellos.
+
+Los ficheros asociados al activo (``companions``, sufijos como ``.hosts`` o
+``.idx``) se renombran junto a él y cuentan en el presupuesto; no se
+comprimen, para que se sigan pudiendo leer con ``mmap``.
+
+El índice ``<fichero>.segments`` (JSON) guarda la primera y última escritura
+de cada segmento, de modo que ``open_segments`` salta los que quedan fuera
+del rango de tiempo pedido sin descomprimirlos. Varios scripts pueden rotar
+ficheros del mismo directorio: cada cambio relee el índice bajo ``flock``
+(``<fichero>.segments.lock``) y lo fusiona antes de reescribirlo::
+
+    python segments.py /var/db/scripts/op/system_monitor.csv --start 1760000000
+"""
+
+import argparse
+import fcntl
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024       # 5 MiB por segmento
+DEFAULT_MAX_AGE = 24 * 3600               # Un segmento por día como máximo
+DEFAULT_DISK_BUDGET = 50 * 1024 * 1024    # Total activo + segmentos
+
+
+class RotationPolicy:
+    """Límites de rotación y presupuesto de disco (``None`` desactiva un límite).
+
+    El presupuesto cubre todos los ``SegmentManager`` abiertos con la política.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 disk_budget=DEFAULT_DISK_BUDGET, compress=True):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.disk_budget = disk_budget
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._managers = []
+
+    def register(self, manager):
+        with self._lock:
+            self._managers.append(manager)
+
+    def unregister(self, manager):
+        with self._lock:
+            if manager in self._managers:
+                self._managers.remove(manager)
+
+    def disk_usage(self):
+        """Bytes de todos los ficheros (activos y segmentos) con esta política."""
+        with self._lock:
+            managers = list(self._managers)
+        return sum(manager.disk_usage() for manager in managers)
+
+    def enforce_budget(self):
+        """Borra el segmento más antiguo de cualquier fichero hasta quedar dentro de ``disk_budget``."""
+        if self.disk_budget is None:
+            return
+        with self._lock:
+            managers = list(self._managers)
+            while sum(manager.disk_usage() for manager in managers) > self.disk_budget:
+                oldest = [(segment["first_ts"], i, segment) for i, manager in enumerate(managers)
+                          for segment in manager.index.snapshot()]
+                if not oldest:
+                    return
+                _, i, segment = min(oldest, key=lambda item: item[:2])
+                managers[i].drop(segment["file"])
+
+    def due(self, size, first_ts, now):
+        if self.max_bytes is not None and size >= self.max_bytes:
+            return True
+        return self.max_age is not None and first_ts is not None and now - first_ts >= self.max_age
+
+
+# ------------------ Índice de segmentos ------------------
+class SegmentIndex:
+    """Índice persistente ``<fichero>.segments`` con el rango temporal de cada segmento."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".segments"
+        self._lock = threading.Lock()
+        self.active_first_ts = None
+        self.segments = []
+        self._load()
+
+    def _load(self):
+        """Relee el índice del disco (``os.replace`` nunca deja un JSON a medias)."""
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                data = json.load(file)
+            self.active_first_ts = data.get("active_first_ts")
+            self.segments = data.get("segments", [])
+
+    def _save(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump({"active_first_ts": self.active_first_ts, "segments": self.segments}, file)
+        os.replace(tmp, self.index_path)
+
+    def _modify(self, change):
+        """Aplica ``change`` sobre el índice actual del disco, no sobre la copia de este proceso."""
+        with self._lock, open(self.index_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load()
+            if change() is not False:
+                self._save()
+
+    def start_active(self, ts):
+        # Sin releer mientras el activo ya tiene fecha: se llama en cada escritura
+        if self.active_first_ts is not None:
+            return
+
+        def change():
+            if self.active_first_ts is not None:
+                return False
+            self.active_first_ts = ts
+        self._modify(change)
+
+    def add(self, file, first_ts, last_ts, size):
+        def change():
+            self.segments.append({"file": file, "first_ts": first_ts, "last_ts": last_ts,
+                                  "bytes": size, "compressed": False})
+            self.active_first_ts = None
+        self._modify(change)
+
+    def update(self, name, **fields):
+        def change():
+            for segment in self.segments:
+                if segment["file"] == name:
+                    segment.update(fields)
+        self._modify(change)
+
+    def remove(self, file):
+        def change():
+            self.segments = [s for s in self.segments if s["file"] != file]
+        self._modify(change)
+
+    def snapshot(self):
+        with self._lock:
+            self._load()
+            return [dict(s) for s in self.segments]
+
+    def select(self, start=None, end=None):
+        """Segmentos (más antiguo primero) que se solapan con ``[start, end]``."""
+        return [s for s in self.snapshot()
+                if (start is None or s["last_ts"] >= start) and (end is None or s["first_ts"] <= end)]
+
+
+def remove_segment(directory, name, companions=()):
+    """Borra un segmento y sus ficheros asociados (que nunca llevan ``.gz``)."""
+    path = os.path.join(directory, name)
+    base = path[:-3] if name.endswith(".gz") else path
+    for target in [path] + [base + suffix for suffix in companions]:
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+
+
+# ------------------ Rotación y compresión ------------------
+class SegmentManager:
+    """Rota el fichero activo, comprime segmentos en segundo plano y aplica el presupuesto."""
+
+    def __init__(self, path, policy=None, companions=()):
+        self.path = path
+        self.policy = policy or RotationPolicy()
+        self.companions = tuple(companions)
+        self.index = SegmentIndex(path)
+        self._last_ts = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"rotations": 0, "compressed": 0, "deleted": 0,
+                       "bytes_saved": 0, "compress_seconds": 0.0}
+        self._thread = threading.Thread(target=self._compress_loop, name="segment-compressor", daemon=True)
+        self._thread.start()
+        self.policy.register(self)
+        # Segmentos que quedaron sin comprimir en una ejecución anterior
+        if self.policy.compress:
+            for segment in self.index.snapshot():
+                if not segment["compressed"]:
+                    self._queue.put(segment["file"])
+
+    def _dir(self):
+        return os.path.dirname(os.path.abspath(self.path))
+
+    def record_write(self, ts=None):
+        """Anota una escritura en el fichero activo (marca de tiempo de época)."""
+        ts = time.time() if ts is None else ts
+        self.index.start_active(ts)
+        self._last_ts = ts
+
+    def should_rotate(self, size, now=None):
+        now = time.time() if now is None else now
+        return self.policy.due(size, self.index.active_first_ts, now)
+
+    def rotate(self):
+        """Convierte el fichero activo (ya cerrado por el escritor) en un segmento."""
+        if not os.path.exists(self.path) or self.index.active_first_ts is None:
+            return None
+        first_ts = self.index.active_first_ts
+        # Sin escrituras en esta ejecución, la última es la fecha de modificación del fichero
+        last_ts = self._last_ts if self._last_ts is not None else max(first_ts, os.path.getmtime(self.path))
+        base, ext = os.path.splitext(os.path.basename(self.path))
+        name = f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(first_ts))}{ext}"
+        suffix = 1
+        while os.path.exists(os.path.join(self._dir(), name)) or os.path.exists(os.path.join(self._dir(), name + ".gz")):
+            name = f"{base}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(first_ts))}-{suffix}{ext}"
+            suffix += 1
+
+        segment_path = os.path.join(self._dir(), name)
+        os.replace(self.path, segment_path)
+        for companion in self.companions:
+            if os.path.exists(self.path + companion):
+                os.replace(self.path + companion, segment_path + companion)
+        self.index.add(name, first_ts, last_ts, os.path.getsize(segment_path) + self._companion_bytes(segment_path))
+        self._last_ts = None
+        with self._lock:
+            self._stats["rotations"] += 1
+        if self.policy.compress:
+            self._queue.put(name)
+        else:
+            self.enforce_budget()
+        return segment_path
+
+    def _compress_loop(self):
+        while True:
+            name = self._queue.get()
+            if name is None:
+                return
+            try:
+                self._compress(name)
+            except OSError:
+                pass
+            self.enforce_budget()
+
+    def _compress(self, name):
+        source = os.path.join(self._dir(), name)
+        if not os.path.exists(source):
+            return
+        start = time.perf_counter()
+        target = source + ".gz"
+        with open(source, "rb") as src, gzip.open(target + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(target + ".tmp", target)
+        before, after = os.path.getsize(source), os.path.getsize(target)
+        os.remove(source)
+        self.index.update(name, file=name + ".gz", bytes=after + self._companion_bytes(source), compressed=True)
+        with self._lock:
+            self._stats["compressed"] += 1
+            self._stats["bytes_saved"] += before - after
+            self._stats["compress_seconds"] += time.perf_counter() - start
+
+    def _companion_bytes(self, path):
+        return sum(os.path.getsize(path + suffix) for suffix in self.companions if os.path.exists(path + suffix))
+
+    def _remove(self, name):
+        remove_segment(self._dir(), name, self.companions)
+
+    def disk_usage(self):
+        active = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return active + self._companion_bytes(self.path) + sum(s["bytes"] for s in self.index.snapshot())
+
+    def drop(self, name):
+        """Borra un segmento (y sus asociados) y lo quita del índice."""
+        self._remove(name)
+        self.index.remove(name)
+        with self._lock:
+            self._stats["deleted"] += 1
+
+    def enforce_budget(self):
+        """Aplica el presupuesto de disco de la política (común a sus ficheros)."""
+        self.policy.enforce_budget()
+
+    def close(self):
+        """Espera a que termine la compresión pendiente."""
+        self._queue.put(None)
+        self._thread.join()
+        self.policy.unregister(self)
+
+    def stats(self):
+        """Rotaciones, segmentos comprimidos/borrados, bytes ahorrados y uso de disco."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["compress_seconds"] = round(stats["compress_seconds"], 3)
+        stats["segments"] = len(self.index.snapshot())
+        stats["disk_bytes"] = self.disk_usage()
+        return stats
+
+
+# ------------------ Lectura ------------------
+def open_segments(path, start=None, end=None):
+    """Abre en texto los segmentos de ``[start, end]`` y el fichero activo, en orden.
+
+    Los segmentos fuera del rango se saltan sin descomprimirlos.
+    """
+    index = SegmentIndex(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    for segment in index.select(start, end):
+        segment_path = os.path.join(directory, segment["file"])
+        if not os.path.exists(segment_path):
+            continue
+        if segment["file"].endswith(".gz"):
+            yield gzip.open(segment_path, "rt", newline="")
+        else:
+            yield open(segment_path, newline="")
+    if os.path.exists(path) and (end is None or index.active_first_ts is None or index.active_first_ts <= end):
+        yield open(path, newline="")
+
+
+# ------------------ CLI ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Segmentos rotados de un fichero de resultados")
+    parser.add_argument("path", help="Fichero activo (p. ej. system_monitor.csv)")
+    parser.add_argument("--start", type=float, help="Época inicial")
+    parser.add_argument("--end", type=float, help="Época final")
+    args = parser.parse_args()
+
+    index = SegmentIndex(args.path)
+    for segment in index.select(args.start, args.end):
+        first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(segment["first_ts"]))
+        last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(segment["last_ts"]))
+        print(f"{segment['file']}\t{first}\t{last}\t{segment['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
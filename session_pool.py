@@ -0,0 +1,163 @@
+"""Pool acotado de sesiones NETCONF (``Device``) compartido por los hilos de ping.
+
+Las sesiones se abren una vez por hueco del pool y se reutilizan entre hosts.
+Una sesión solo la usa un hilo a la vez (checkout/checkin), las sesiones
+ociosas demasiado tiempo se cierran y las que fallan se descartan para que el
+siguiente checkout reconecte.
+
+Una sesión se considera sana si el ``Device`` sigue conectado y, además, su
+transporte NETCONF (``dev._conn``) sigue vivo: ``connected`` solo cambia con
+``open()``/``close()`` y no detecta un SSH cortado por mgd. Una RPC que falla
+por error de conexión o por timeout también descarta la sesión, porque la
+respuesta tardía podría llegar en el canal y mezclarse con la siguiente RPC.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from jnpr.junos import Device
+from jnpr.junos.exception import ConnectError, RpcTimeoutError
+
+# ------------------ Configuración por defecto ------------------
+DEFAULT_POOL_SIZE = 4
+DEFAULT_RPC_TIMEOUT = 90      # Timeout RPC de cada sesión en segundos
+DEFAULT_IDLE_TIMEOUT = 300    # Segundos antes de cerrar una sesión ociosa
+
+
+class SessionPool:
+    """Pool de objetos ``Device`` abiertos con checkout/checkin."""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_RPC_TIMEOUT,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, device_factory=None):
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._factory = device_factory or (lambda: Device(timeout=self.timeout))
+        self._idle = []          # Pila LIFO de (dev, ultimo_uso)
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0, "misses": 0, "waits": 0, "wait_seconds": 0.0,
+            "expired": 0, "unhealthy": 0, "reconnects": 0,
+        }
+
+    # ------------------ Sesiones ------------------
+    def _open(self):
+        dev = self._factory()
+        dev.open()
+        return dev
+
+    @staticmethod
+    def _discard(dev):
+        try:
+            dev.close()
+        except Exception:
+            pass
+
+    def _healthy(self, dev):
+        if not getattr(dev, "connected", True):
+            return False
+        # Transporte ncclient: False si el canal SSH se cerró sin pasar por close()
+        transport = getattr(dev, "_conn", None)
+        return transport is None or bool(getattr(transport, "connected", True))
+
+    def checkout(self, wait_timeout=None):
+        """Devuelve una sesión abierta; espera si el pool está agotado."""
+        with self._cond:
+            waited_since = None
+            while True:
+                if self._closed:
+                    raise RuntimeError("Pool de sesiones cerrado")
+
+                while self._idle:
+                    dev, last_used = self._idle.pop()
+                    if time.monotonic() - last_used > self.idle_timeout:
+                        self._stats["expired"] += 1
+                    elif not self._healthy(dev):
+                        self._stats["unhealthy"] += 1
+                    else:
+                        self._stats["hits"] += 1
+                        return dev
+                    self._created -= 1
+                    self._discard(dev)
+
+                if self._created < self.size:
+                    self._created += 1
+                    self._stats["misses"] += 1
+                    break
+
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = None
+                if wait_timeout is not None:
+                    remaining = wait_timeout - (time.monotonic() - waited_since)
+                    if remaining <= 0:
+                        raise TimeoutError("Sin sesiones libres en el pool")
+                self._cond.wait(remaining)
+                self._stats["wait_seconds"] += time.monotonic() - waited_since
+                waited_since = time.monotonic()
+
+        # Abrir la sesión fuera del lock: puede tardar varios segundos
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def checkin(self, dev, healthy=True):
+        """Devuelve una sesión al pool; si falló se cierra y se reconecta después."""
+        with self._cond:
+            if healthy and not self._closed and self._healthy(dev):
+                self._idle.append((dev, time.monotonic()))
+            else:
+                self._created -= 1
+                if not self._closed:
+                    self._stats["reconnects"] += 1
+                self._discard(dev)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, wait_timeout=None):
+        """Context manager: ``with pool.session() as dev: dev.rpc.ping(...)``."""
+        dev = self.checkout(wait_timeout)
+        healthy = True
+        try:
+            yield dev
+        except (ConnectError, RpcTimeoutError):
+            healthy = False
+            raise
+        except Exception:
+            healthy = self._healthy(dev)
+            raise
+        finally:
+            self.checkin(dev, healthy)
+
+    # ------------------ Métricas y cierre ------------------
+    def stats(self):
+        """Contadores de hit/miss/espera para dimensionar el pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._created
+            stats["idle"] = len(self._idle)
+        return stats
+
+    def close(self):
+        """Cierra todas las sesiones ociosas e impide nuevos checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for dev, _ in idle:
+            self._discard(dev)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,20 +1,17 @@
-import jcs
 from jnpr.junos import Device
 from junos import Junos_Context
+from syslog_emitter import SyslogEmitter
 
 # Constantes
 HOSTS_LIST = ["204.124.107.83", "204.124.107.82", "1.1.1.1"]
 COUNT = 5 
 
-def send_syslog_messages(message):
-    """Envía el mismo mensaje a todos los niveles de syslog."""
-    severity_levels = [
-        "external.emerg", "external.alert", "external.crit",
-        "external.err", "external.warning", "external.notice",
-        "external.info", "external.debug"
-    ]
-    for level in severity_levels:
-        jcs.syslog(level, message)
+# Un único envío por mensaje, agrupado y limitado por severidad
+log = SyslogEmitter()
+
+def send_syslog_messages(message, level="external.info"):
+    """Envía el mensaje una sola vez al nivel indicado (antes se repetía en los 8 niveles)."""
+    log.syslog(level, message)
 
 def ping_host(dev, host):
     """Realiza un ping a un host y registra los resultados."""
@@ -29,20 +26,24 @@ def ping_host(dev, host):
             f"RTT details for {target_host} at {Junos_Context['localtime']} | "
             f"Min: {rtt_min} ms, Max: {rtt_max} ms, Avg: {rtt_avg} ms"
         )
+        level = "external.info"
     except Exception as e:
         message = f"Ping to {host} failed at {Junos_Context['localtime']}. Error: {e}"
+        level = "external.err"
 
-    send_syslog_messages(message)
+    send_syslog_messages(message, level)
 
 def main():
     """Establece conexión con el dispositivo y ejecuta pings a los hosts."""
+    log.start()
     try:
         with Device() as dev:
             for host in HOSTS_LIST:
                 ping_host(dev, host)
     
     except Exception as e:
-        send_syslog_messages(f"Error al conectar con el dispositivo: {e}")
+        send_syslog_messages(f"Error al conectar con el dispositivo: {e}", "external.crit")
+    log.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,17 @@
+"""``jcs`` simulado: guarda los mensajes de syslog en ``ping_sim.syslog_messages``."""
+
+import sys
+
+import ping_sim
+
+
+def syslog(level, *messages):
+    message = " ".join(str(m) for m in messages)
+    ping_sim.count("syslog")
+    ping_sim.syslog_messages.append((level, message))
+    if ping_sim.config["syslog"] == "stderr":
+        print(f"{level}: {message}", file=sys.stderr)
+
+
+def output(*messages):
+    print(*messages)
@@ -0,0 +1,59 @@
+"""``Device`` simulado para ejecutar los scripts fuera del equipo.
+
+Cada sesión serializa sus RPC con un lock, como una sesión NETCONF real, y
+las respuestas de ping salen de ``ping_sim`` con latencia, pérdida y
+timeouts configurables.
+"""
+
+import threading
+
+import ping_sim
+from jnpr.junos.exception import ConnectClosedError, RpcTimeoutError
+
+
+class _Rpc:
+    def __init__(self, dev):
+        self._dev = dev
+
+    def ping(self, host=None, count="5", dev_timeout=None, **kwargs):
+        dev = self._dev
+        if not dev.connected:
+            raise ConnectClosedError(dev)
+        timeout = dev.timeout if dev_timeout is None else dev_timeout
+        xml, duration = ping_sim.simulate_ping(host, int(count))
+
+        with dev._session_lock:
+            ping_sim.count("rpcs")
+            if duration > timeout:
+                ping_sim.count("timeouts")
+                ping_sim.sleep(timeout)
+                raise RpcTimeoutError(dev, "ping", timeout)
+            ping_sim.sleep(duration)
+        return ping_sim.parse(xml)
+
+
+class Device:
+    def __init__(self, host=None, user=None, password=None, gather_facts=False,
+                 timeout=30, **kwargs):
+        self.hostname = host or "localhost"
+        self.timeout = timeout
+        self.connected = False
+        self.rpc = _Rpc(self)
+        self._session_lock = threading.Lock()
+
+    def open(self, **kwargs):
+        ping_sim.sleep(ping_sim.config["open_latency"])
+        ping_sim.count("opens")
+        self.connected = True
+        return self
+
+    def close(self):
+        if self.connected:
+            ping_sim.count("closes")
+        self.connected = False
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,31 @@
+"""Excepciones simuladas con los mismos nombres que ``jnpr.junos.exception``."""
+
+
+class ConnectError(Exception):
+    def __init__(self, dev=None, msg=None):
+        self.dev = dev
+        self.msg = msg or "Error de conexión simulado"
+        super().__init__(self.msg)
+
+
+class ConnectClosedError(ConnectError):
+    pass
+
+
+class RpcError(Exception):
+    def __init__(self, cmd=None, rsp=None, errs=None, dev=None, timeout=None, re=None):
+        self.cmd = cmd
+        self.rsp = rsp
+        self.dev = dev
+        self.timeout = timeout
+        super().__init__(f"RpcError(cmd={cmd})")
+
+
+class RpcTimeoutError(RpcError):
+    def __init__(self, dev=None, cmd=None, timeout=None):
+        super().__init__(cmd=cmd, dev=dev, timeout=timeout)
+        self.args = (f"RpcTimeoutError(host: {getattr(dev, 'hostname', 'localhost')}, "
+                     f"cmd: {cmd}, timeout: {timeout})",)
+
+    def __str__(self):
+        return self.args[0]
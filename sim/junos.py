@@ -0,0 +1,23 @@
+"""``junos.Junos_Context`` simulado."""
+
+import time
+
+
+class _Context(dict):
+    """Diccionario cuyo ``localtime`` es siempre la hora actual."""
+
+    def __getitem__(self, key):
+        if key == "localtime":
+            return time.strftime("%a %b %d %H:%M:%S %Y")
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+Junos_Context = _Context(
+    localtime=None,
+    hostname="sim-router",
+    product="mx960",
+    re_master=True,
+)
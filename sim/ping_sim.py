@@ -0,0 +1,158 @@
+"""Configuración y generación de respuestas del simulador de Junos.
+
+El simulador sustituye a ``jcs``, ``jnpr.junos.Device`` y
+``junos.Junos_Context`` para ejecutar los scripts fuera del equipo::
+
+    PYTHONPATH=sim python ping_v1.py --count 5
+
+Todos los parámetros se pueden fijar por variables de entorno ``PING_SIM_*``
+o desde código con ``configure(...)``:
+
+- ``RTT_US`` / ``RTT_SIGMA``: mediana (microsegundos) y dispersión log-normal del RTT.
+- ``LOSS``: probabilidad de pérdida por paquete (0..1).
+- ``UNREACHABLE``: hosts separados por comas que nunca responden.
+- ``RPC_LATENCY``: segundos fijos de cada RPC (procesado en mgd).
+- ``INTERVAL``: segundos entre paquetes; ``WAIT``: espera por paquete perdido.
+- ``OPEN_LATENCY``: segundos de ``Device.open()``.
+- ``TIME_SCALE``: factor aplicado a todas las esperas (0 = sin esperas).
+- ``SEED``: semilla para resultados reproducibles.
+- ``SYSLOG``: ``stderr`` para imprimir los mensajes de ``jcs.syslog``.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+
+try:
+    from lxml import etree
+except ImportError:
+    import xml.etree.ElementTree as etree
+
+
+# ------------------ Configuración ------------------
+def _env(name, default, cast=float):
+    value = os.environ.get(f"PING_SIM_{name}")
+    return default if value in (None, "") else cast(value)
+
+
+config = {
+    "rtt_us": _env("RTT_US", 20000.0),
+    "rtt_sigma": _env("RTT_SIGMA", 0.25),
+    "loss": _env("LOSS", 0.0),
+    "unreachable": set(filter(None, _env("UNREACHABLE", "", str).split(","))),
+    "rpc_latency": _env("RPC_LATENCY", 0.05),
+    "interval": _env("INTERVAL", 0.0),
+    "wait": _env("WAIT", 1.0),
+    "open_latency": _env("OPEN_LATENCY", 0.2),
+    "time_scale": _env("TIME_SCALE", 1.0),
+    "seed": _env("SEED", None, int),
+    "syslog": _env("SYSLOG", "", str),
+}
+
+_rng = random.Random(config["seed"])
+_lock = threading.Lock()
+_stats = {"opens": 0, "closes": 0, "rpcs": 0, "timeouts": 0, "syslog": 0}
+syslog_messages = []
+
+
+def configure(**kwargs):
+    """Cambia parámetros del simulador en caliente (``configure(loss=0.1)``)."""
+    unknown = set(kwargs) - set(config)
+    if unknown:
+        raise KeyError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    if "unreachable" in kwargs:
+        kwargs["unreachable"] = set(kwargs["unreachable"])
+    config.update(kwargs)
+    if "seed" in kwargs:
+        _rng.seed(kwargs["seed"])
+
+
+def stats():
+    """Contadores de sesiones, RPC y mensajes de syslog simulados."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+        del syslog_messages[:]
+
+
+def count(name, n=1):
+    with _lock:
+        _stats[name] += n
+
+
+def sleep(seconds):
+    """Espera simulada escalada por ``time_scale``."""
+    scaled = seconds * config["time_scale"]
+    if scaled > 0:
+        time.sleep(scaled)
+
+
+# ------------------ Respuesta del RPC de ping ------------------
+def simulate_ping(host, count_):
+    """Devuelve ``(xml, duración)`` de un ping con ``count_`` paquetes."""
+    down = host in config["unreachable"]
+    mu = math.log(config["rtt_us"])
+    rtts = []
+    with _lock:
+        for _ in range(count_):
+            if down or _rng.random() < config["loss"]:
+                rtts.append(None)
+            else:
+                rtts.append(int(_rng.lognormvariate(mu, config["rtt_sigma"])))
+
+    duration = config["rpc_latency"]
+    for rtt in rtts:
+        duration += config["interval"] + (config["wait"] if rtt is None else rtt / 1e6)
+    return render_reply(host, rtts), duration
+
+
+def render_reply(host, rtts):
+    """XML de ``<ping-results>`` con el formato del RPC de Junos."""
+    parts = [
+        "<ping-results>",
+        f"<target-host>\n{host}\n</target-host>",
+        f"<target-ip>\n{host}\n</target-ip>",
+        "<packet-size>\n56\n</packet-size>",
+    ]
+    for index, rtt in enumerate(rtts, start=1):
+        if rtt is None:
+            continue
+        parts.append(
+            "<probe-result>"
+            f"<probe-index>\n{index}\n</probe-index>"
+            "<probe-success/>"
+            f"<sequence-number>\n{index - 1}\n</sequence-number>"
+            f"<ip-address>\n{host}\n</ip-address>"
+            "<time-to-live>\n57\n</time-to-live>"
+            "<response-size>\n64\n</response-size>"
+            f"<rtt>\n{rtt}\n</rtt>"
+            "</probe-result>"
+        )
+    received = [rtt for rtt in rtts if rtt is not None]
+    parts.append("<probe-results-summary>")
+    parts.append(f"<probes-sent>\n{len(rtts)}\n</probes-sent>")
+    parts.append(f"<responses-received>\n{len(received)}\n</responses-received>")
+    loss = round(100 * (len(rtts) - len(received)) / len(rtts)) if rtts else 0
+    parts.append(f"<packet-loss>\n{loss}\n</packet-loss>")
+    if received:
+        mean = sum(received) / len(received)
+        stddev = math.sqrt(sum((r - mean) ** 2 for r in received) / len(received))
+        parts.append(f"<rtt-minimum>\n{min(received)}\n</rtt-minimum>")
+        parts.append(f"<rtt-maximum>\n{max(received)}\n</rtt-maximum>")
+        parts.append(f"<rtt-average>\n{int(mean)}\n</rtt-average>")
+        parts.append(f"<rtt-stddev>\n{int(stddev)}\n</rtt-stddev>")
+    parts.append("</probe-results-summary>")
+    parts.append("<ping-success/>" if received else "<ping-failure/>")
+    parts.append("</ping-results>")
+    return "".join(parts)
+
+
+def parse(xml):
+    return etree.fromstring(xml.encode() if isinstance(xml, str) else xml)
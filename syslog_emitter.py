@@ -0,0 +1,208 @@
+"""Envío de syslog fuera del camino de los pings, agrupado y con límites.
+
+Los scripts con hilos llamaban a ``jcs.syslog`` varias veces por host (inicio,
+éxito, RTT, CPU cada segundo) y cargaban el syslogd del RE. ``SyslogEmitter``
+ofrece la misma firma ``syslog(nivel, mensaje)`` pero solo encola; un hilo
+agrupa los mensajes de cada intervalo:
+
+- mensajes repetidos (mismo nivel y texto) se envían una vez con el número
+  de repeticiones;
+- los de una misma ``key`` con textos distintos (p. ej. un "Ping exitoso" por
+  host) se resumen en una línea ``[key] N mensajes / M hosts`` con el último
+  texto como ejemplo, sin atribuir todos los eventos a un solo host;
+- cada severidad tiene un máximo de envíos por intervalo (``rate_limits``) y
+  los que lo superan se cuentan como suprimidos;
+- ``emerg``, ``alert`` y ``crit`` se envían al llegar (sin esperar al
+  intervalo), respetando igualmente su límite;
+- al final de cada intervalo con actividad se envía una línea de resumen con
+  la duración real del intervalo (puede acabar antes por ``close``).
+"""
+
+import queue
+import threading
+import time
+
+import jcs
+
+DEFAULT_INTERVAL = 5.0     # Segundos por intervalo de agrupación
+DEFAULT_MAXSIZE = 10000
+SUMMARY_LEVEL = "external.notice"
+IMMEDIATE = ("emerg", "alert", "crit")
+# Envíos máximos por severidad e intervalo (None = sin límite)
+DEFAULT_RATE_LIMITS = {
+    "emerg": None, "alert": None, "crit": 20, "err": 20,
+    "warning": 10, "notice": 10, "info": 5, "debug": 0,
+}
+_ALIASES = {"error": "err", "warn": "warning", "emergency": "emerg", "critical": "crit"}
+
+_STOP = object()
+
+
+def severity_of(level):
+    """``external.error`` -> ``err`` (severidad normalizada de un nivel jcs)."""
+    severity = level.rsplit(".", 1)[-1].lower()
+    return _ALIASES.get(severity, severity)
+
+
+class SyslogEmitter:
+    """Cola de mensajes syslog con agrupación, límites por severidad y resumen."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, rate_limits=None, maxsize=DEFAULT_MAXSIZE,
+                 send=None):
+        self.interval = interval
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS, **(rate_limits or {}))
+        self._send = send or jcs.syslog
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {"queued": 0, "sent": 0, "coalesced": 0, "suppressed": 0,
+                       "dropped": 0, "summaries": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="syslog-emitter", daemon=True)
+        self._thread.start()
+        return self
+
+    # ------------------ Productores ------------------
+    def syslog(self, level, *messages, key=None, host=None):
+        """Encola un mensaje sin bloquear; ``key`` agrupa mensajes parecidos y ``host`` los cuenta por host."""
+        message = " ".join(str(m) for m in messages)
+        try:
+            self._queue.put_nowait((level, message, key, host))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["queued"] += 1
+
+    def close(self):
+        """Envía lo pendiente y detiene el hilo."""
+        if self._thread is None:
+            return
+        self._queue.put((None, _STOP, None, None))
+        self._thread.join()
+        self._thread = None
+
+    # ------------------ Hilo de envío ------------------
+    def _run(self):
+        while True:
+            deadline = time.monotonic() + self.interval
+            window = _Window()
+            stop = False
+            while not stop:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    level, message, key, host = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if message is _STOP:
+                    stop = True
+                    break
+                if window.add(level, message, key, host) and severity_of(level) in IMMEDIATE:
+                    self._emit(window, window.pending.pop((level, key or message)))
+            for entry in list(window.pending.values()):
+                self._emit(window, entry)
+            self._summarize(window)
+            if stop:
+                return
+
+    def _emit(self, window, entry):
+        level, message, repeats = entry.level, entry.message, entry.repeats
+        severity = severity_of(level)
+        limit = self.rate_limits.get(severity)
+        if limit is not None and window.sent.get(severity, 0) >= limit:
+            window.suppressed[severity] = window.suppressed.get(severity, 0) + repeats
+            return
+        window.sent[severity] = window.sent.get(severity, 0) + 1
+        if entry.distinct:
+            hosts = f" / {len(entry.hosts)} hosts" if entry.hosts else ""
+            message = f"[{entry.key}] {repeats} mensajes{hosts} (último: {message})"
+        elif repeats > 1:
+            message = f"{message} (x{repeats})"
+        try:
+            self._send(level, message)
+        except Exception:
+            pass
+
+    def _summarize(self, window):
+        sent = sum(window.sent.values())
+        suppressed = sum(window.suppressed.values())
+        with self._lock:
+            self._stats["sent"] += sent
+            self._stats["coalesced"] += window.coalesced
+            self._stats["suppressed"] += suppressed
+        if not window.received or (not window.coalesced and not suppressed):
+            return
+        detail = ", ".join(f"{severity}={n}" for severity, n in sorted(window.suppressed.items()))
+        try:
+            self._send(SUMMARY_LEVEL,
+                       f"[SYSLOG] {window.received} mensajes en {time.monotonic() - window.started:.1f}s: {sent} enviados, "
+                       f"{window.coalesced} agrupados, {suppressed} suprimidos" + (f" ({detail})" if detail else ""))
+        except Exception:
+            return
+        with self._lock:
+            self._stats["summaries"] += 1
+
+    # ------------------ Métricas ------------------
+    def stats(self):
+        """Encolados, enviados, agrupados, suprimidos, descartados y resúmenes."""
+        with self._lock:
+            return dict(self._stats)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Entry:
+    """Grupo de mensajes de un intervalo: último texto, repeticiones y hosts."""
+
+    def __init__(self, level, message, key, host):
+        self.level = level
+        self.message = message
+        self.key = key
+        self.repeats = 1
+        self.distinct = False      # Hubo textos distintos en el grupo (solo con ``key``)
+        self.hosts = {host} if host is not None else set()
+
+    def add(self, message, host):
+        self.distinct = self.distinct or message != self.message
+        self.message = message
+        self.repeats += 1
+        if host is not None:
+            self.hosts.add(host)
+
+
+class _Window:
+    """Mensajes de un intervalo agrupados por ``(nivel, key o texto)``."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.pending = {}
+        self.sent = {}
+        self.suppressed = {}
+        self.received = 0
+        self.coalesced = 0
+        self._seen = set()
+
+    def add(self, level, message, key, host=None):
+        """Devuelve True si es el primer mensaje de su grupo en el intervalo."""
+        self.received += 1
+        group = (level, key or message)
+        entry = self.pending.get(group)
+        if entry is not None:
+            entry.add(message, host)
+            self.coalesced += 1
+            return False
+        self.pending[group] = _Entry(level, message, key, host)
+        if group in self._seen:
+            # Grupo inmediato ya enviado en este intervalo: se acumula para el cierre
+            self.coalesced += 1
+            return False
+        self._seen.add(group)
+        return True
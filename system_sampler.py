@@ -0,0 +1,134 @@
+"""Muestreo de CPU, memoria y disco en segundo plano.
+
+``psutil.cpu_percent(interval=1)`` duerme un segundo en cada llamada. Aquí un
+hilo refresca las métricas cada ``interval`` segundos y publica una
+instantánea inmutable; leerla es solo tomar una referencia (sin locks ni
+esperas), y cada lectura devuelve también la edad de la muestra.
+
+``cpu_percent(interval=None)`` mide la CPU desde la llamada anterior: una
+muestra tomada justo después de fijar la referencia no mide nada. Por eso
+``start()`` fija la referencia y la primera instantánea se publica tras un
+intervalo completo. Hasta entonces ``latest()`` espera a esa primera muestra,
+salvo con ``wait=False``, que devuelve ``(None, None)`` sin esperar.
+
+Con ``on_sample`` el propio hilo entrega cada muestra al publicarla (p. ej.
+para escribirla en el flujo ``system``): ninguna se pierde ni se repite, sin
+depender de que otro hilo sondee ``latest()`` al mismo ritmo.
+
+``sample_id`` es un contador: empieza en la época en milisegundos al crear el
+muestreador y suma uno por muestra. Es único y creciente dentro de la
+ejecución aunque el reloj de pared salte, y no se solapa con la ejecución
+anterior (que produjo muchas menos muestras que milisegundos transcurridos).
+"""
+
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+DEFAULT_INTERVAL = 1.0  # Segundos entre muestras
+
+SystemSnapshot = namedtuple("SystemSnapshot", [
+    "sample_id",      # Contador creciente (ver arriba); enlaza los flujos system y probe
+    "timestamp",      # "%Y-%m-%d %H:%M:%S" de la muestra
+    "epoch",          # time.time() de la muestra
+    "sampled_at",     # time.monotonic() de la muestra
+    "cpu_percent",
+    "mem_percent",
+    "mem_used_mb",
+    "mem_free_mb",
+    "disk_percent",
+    "disk_free_gb",
+])
+
+
+def sample_system(sample_id):
+    """Toma una muestra sin bloquear (CPU desde la llamada anterior)."""
+    cpu_percent = round(psutil.cpu_percent(interval=None), 2)
+
+    mem = psutil.virtual_memory()
+    mem_percent = round((mem.used / mem.total) * 100, 2) if mem.total > 0 else 0.00
+
+    disk = psutil.disk_usage('/')
+
+    now = time.time()
+    return SystemSnapshot(
+        sample_id=sample_id,
+        timestamp=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+        epoch=now,
+        sampled_at=time.monotonic(),
+        cpu_percent=cpu_percent,
+        mem_percent=mem_percent,
+        mem_used_mb=round(mem.used / (1024 * 1024), 2),
+        mem_free_mb=round(mem.available / (1024 * 1024), 2),
+        disk_percent=round(disk.percent, 2),
+        disk_free_gb=round(disk.free / (1024 * 1024 * 1024), 2),
+    )
+
+
+class SystemSampler:
+    """Hilo que mantiene la última muestra del sistema."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, on_sample=None):
+        self.interval = interval
+        self.on_sample = on_sample
+        self._ids = itertools.count(int(time.time() * 1000))
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._snapshot = None
+
+    def start(self):
+        # Primera llamada solo fija la referencia de CPU de psutil
+        psutil.cpu_percent(interval=None)
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        return sample_system(next(self._ids))
+
+    def _publish(self, snapshot):
+        # Asignar la referencia es atómico: los lectores nunca ven una muestra a medias
+        self._snapshot = snapshot
+        self._ready.set()
+        if self.on_sample is not None:
+            self.on_sample(snapshot)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._publish(self._sample())
+            except Exception:
+                pass
+
+    def latest(self, wait=True):
+        """Devuelve ``(instantánea, edad_en_segundos)``.
+
+        Solo espera antes de la primera muestra (como mucho dos intervalos; si
+        el hilo no ha publicado nada, toma una muestra directamente). Con
+        ``wait=False`` devuelve ``(None, None)`` mientras no haya muestra.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            if not wait:
+                return None, None
+            self._ready.wait(2 * self.interval)
+            snapshot = self._snapshot
+            if snapshot is None:
+                snapshot = self._sample()
+                self._publish(snapshot)
+        return snapshot, round(time.monotonic() - snapshot.sampled_at, 3)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,25 +1,39 @@
+import time
 import jcs
 import psutil
-import csv
-import time
-import os
-from jnpr.junos import Device
+from session_pool import SessionPool
 from junos import Junos_Context
+from result_index import IndexedResultStore
+from segments import RotationPolicy
+from rtt_stats import parse_probe_rtts, summarize_rtts
+from rollup import RollupEngine
+from host_health import HostHealth, DOWN, describe
 
 # Lista de hosts (ejemplo)
 HOSTS_LIST = [
     "204.124.107.82"
 ]
 COUNT = 1  # Número de pings por host
+NO_RTT = float("nan")  # RTT de un ping sin respuesta: no hay medida, no es 0 ms
+
+# Almacén binario de resultados (exportar a CSV con: python result_store.py export <fichero>)
+results_filename = "/var/db/scripts/op/ping_results.bin"
+
+# Un solo presupuesto de disco para el almacén (.bin, .hosts, .idx) y los agregados
+ROTATION = RotationPolicy(max_bytes=5 * 1024 * 1024, max_age=24 * 3600, disk_budget=50 * 1024 * 1024)
 
-# Nombre del archivo CSV donde se guardarán los resultados
-csv_filename = "/var/db/scripts/op/ping_results.csv"
+# Registros de ancho fijo en un único descriptor abierto, sin formatear a texto;
+# el índice (host, ventana) permite consultar con: python result_index.py range|top <fichero>
+result_store = IndexedResultStore(results_filename, rotation=ROTATION)
 
-# Si el archivo no existe, crear con los encabezados
-if not os.path.exists(csv_filename):
-    with open(csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Host", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)", "RTT Min (ms)", "RTT Max (ms)", "RTT Prom (ms)", "Hora"])
+# Agregados por host a 1 min / 5 min / 1 h que persisten entre ejecuciones
+rollups = RollupEngine("/var/db/scripts/op/rollups", rotation=ROTATION)
+
+# Estado up/failing/down por host; los hosts down solo se comprueban con backoff exponencial
+health = HostHealth("/var/db/scripts/op/host_health.json")
+
+# Una sola sesión NETCONF reutilizada por todos los hosts (antes se abría una por host)
+pool = SessionPool(size=1)
 
 def log_system_usage():
     """Registra el uso de CPU, memoria y disco en syslog y devuelve los valores corregidos."""
@@ -43,58 +57,75 @@ def log_system_usage():
     return cpu_percent, mem_used_percent, mem_used_mb, mem_free_mb, disk_percent, disk_free_gb
 
 def ping_host(host):
-    """Realiza un ping a un host con su propia conexión y guarda los resultados en el CSV."""
+    """Realiza un ping a un host con la sesión del pool y guarda los resultados en el almacén."""
+    count = health.plan(host, COUNT)
+    if count is None:
+        next_check = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(health.next_check(host)))
+        jcs.syslog("external.info", f"Host {host} down, sin probar hasta {next_check}")
+        return
+
     jcs.syslog("external.error", f"Iniciando ping a {host}")
     cpu_percent, mem_percent, mem_used_mb, mem_free_mb, disk_percent, disk_free_gb = log_system_usage()  # Registrar métricas antes del ping
 
     try:
-        with Device() as dev:  # Cada host maneja su propia conexión
-            result = dev.rpc.ping(host=host, count=str(COUNT))
-            rtt_min = round(float(result.findtext("probe-results-summary/rtt-minimum", "0.0")), 2)
-            rtt_max = round(float(result.findtext("probe-results-summary/rtt-maximum", "0.0")), 2)
-            rtt_avg = round(float(result.findtext("probe-results-summary/rtt-average", "0.0")), 2)
+        with pool.session() as dev:  # Sesión compartida del pool
+            result = dev.rpc.ping(host=host, count=str(count))
+            rtts, sent = parse_probe_rtts(result)
+            summary = summarize_rtts(rtts, sent)
+            received = summary["count"]
+            if received:
+                rtt_p95 = summary["p95"]
+                rtt_min = round(float(result.findtext("probe-results-summary/rtt-minimum", "nan")), 2)
+                rtt_max = round(float(result.findtext("probe-results-summary/rtt-maximum", "nan")), 2)
+                rtt_avg = round(float(result.findtext("probe-results-summary/rtt-average", "nan")), 2)
+            else:
+                rtt_min, rtt_max, rtt_avg, rtt_p95 = NO_RTT, NO_RTT, NO_RTT, NO_RTT
             target_host = result.findtext("target-host", host).strip()
             
             message = (
                 f"RTT para {target_host} a las {Junos_Context['localtime']} | "
                 f"Mín: {rtt_min} ms, Máx: {rtt_max} ms, Prom: {rtt_avg} ms"
             )
-            jcs.syslog("external.error", f"Ping exitoso a {target_host}")
+            if received:
+                jcs.syslog("external.error", f"Ping exitoso a {target_host}")
+            else:
+                jcs.syslog("external.warning" if health.state(host) == DOWN else "external.crit",
+                           f"Ping sin respuesta de {target_host}")
 
     except Exception as e:
         message = f"Ping a {host} falló en {Junos_Context['localtime']}. Error: {e}"
-        jcs.syslog("external.crit", f"Error en ping a {host}: {e}")
-        rtt_min, rtt_max, rtt_avg = 0.00, 0.00, 0.00  # En caso de fallo, valores numéricos con 2 decimales
+        # Un host ya down no repite el crit en cada comprobación: su caída se registró al cambiar de estado
+        jcs.syslog("external.warning" if health.state(host) == DOWN else "external.crit", f"Error en ping a {host}: {e}")
+        rtt_min, rtt_max, rtt_avg, rtt_p95 = NO_RTT, NO_RTT, NO_RTT, NO_RTT  # Sin respuesta: sin RTT
+        sent, received = count, 0
+        rtts = []
 
     jcs.syslog("external.crit", message)
+    health.observe(host, received > 0)
 
-    # Guardar resultados en CSV (modo 'a' para agregar sin sobrescribir)
-    with open(csv_filename, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            host,
-            f"{cpu_percent:.2f}",
-            f"{mem_percent:.2f}",
-            f"{mem_used_mb:.2f}",
-            f"{mem_free_mb:.2f}",
-            f"{disk_percent:.2f}",
-            f"{disk_free_gb:.2f}",
-            f"{rtt_min:.2f}",
-            f"{rtt_max:.2f}",
-            f"{rtt_avg:.2f}",
-            time.strftime("%Y-%m-%d %H:%M:%S")
-        ])
+    # Guardar el resultado como registro binario (marca de tiempo en ns de época)
+    result_store.append(host, sent, received, rtt_min, rtt_max, rtt_avg, rtt_p95,
+                        cpu_percent, mem_percent, disk_percent)
+    rollups.add(host, rtts, sent)
 
 def main():
-    """Ejecuta el proceso para cada host y guarda los resultados en CSV."""
+    """Ejecuta el proceso para cada host y guarda los resultados en el almacén binario."""
     jcs.syslog("external.error", "Iniciando conexión con el dispositivo Juniper")
     log_system_usage()  # Monitorear uso antes de conectar
 
-    for host in HOSTS_LIST:
-        jcs.syslog("external.error", f"Procesando host: {host}")
-        ping_host(host)  # Ahora cada ping maneja su propia conexión
-    
-    jcs.syslog("external.error", "Ejecución del script finalizada")
+    try:
+        for host in HOSTS_LIST:
+            jcs.syslog("external.error", f"Procesando host: {host}")
+            ping_host(host)
+
+        for transition in health.commit():
+            jcs.syslog("external.crit" if transition[2] == DOWN else "external.notice", describe(transition))
+    finally:
+        # Aunque falle un host se vuelcan los registros pendientes y se cierran los ficheros
+        pool.close()
+        result_store.close()
+        rollups.close()
+    jcs.syslog("external.error", f"Ejecución del script finalizada | Resultados: {results_filename} | Agregados: {rollups.stats()} | Salud: {health.stats()} | Sesiones: {pool.stats()}")
     log_system_usage()  # Monitorear uso al finalizar
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ import psutil
 import csv
 import time
 import os
-from jnpr.junos import Device
+from session_pool import SessionPool
 from junos import Junos_Context
 
 # Lista de hosts (ejemplo)
@@ -30,6 +30,9 @@ if not os.path.exists(csv_filename):
         writer = csv.writer(file)
         writer.writerow(["Host", "CPU (%)", "Memoria (%)", "Memoria Usada (MB)", "Memoria Libre (MB)", "Disco (%)", "Disco Libre (GB)", "RTT Min (ms)", "RTT Max (ms)", "RTT Prom (ms)", "Hora"])
 
+# Una sola sesión NETCONF reutilizada por todos los hosts (antes se abría una por host)
+pool = SessionPool(size=1)
+
 def log_system_usage():
     """Registra el uso de CPU, memoria y disco en syslog y devuelve los valores corregidos."""
     cpu_percent = round(psutil.cpu_percent(interval=1), 2)
@@ -52,12 +55,12 @@ def log_system_usage():
     return cpu_percent, mem_used_percent, mem_used_mb, mem_free_mb, disk_percent, disk_free_gb
 
 def ping_host(host):
-    """Realiza un ping a un host con su propia conexión y guarda los resultados en el CSV."""
+    """Realiza un ping a un host con la sesión del pool y guarda los resultados en el CSV."""
     jcs.syslog("external.error", f"Iniciando ping a {host}")
     cpu_percent, mem_percent, mem_used_mb, mem_free_mb, disk_percent, disk_free_gb = log_system_usage()  # Registrar métricas antes del ping
 
     try:
-        with Device() as dev:  # Cada host maneja su propia conexión
+        with pool.session() as dev:  # Sesión compartida del pool
             result = dev.rpc.ping(host=host, count=str(COUNT))
             rtt_min = round(float(result.findtext("probe-results-summary/rtt-minimum", "0.0")), 2)
             rtt_max = round(float(result.findtext("probe-results-summary/rtt-maximum", "0.0")), 2)
@@ -89,9 +92,10 @@ def main():
 
     for host in HOSTS_LIST:
         jcs.syslog("external.error", f"Procesando host: {host}")
-        ping_host(host)  # Ahora cada ping maneja su propia conexión
+        ping_host(host)
     
-    jcs.syslog("external.error", "Ejecución del script finalizada")
+    pool.close()
+    jcs.syslog("external.error", f"Ejecución del script finalizada | Sesiones: {pool.stats()}")
     log_system_usage()  # Monitorear uso al finalizar
 
 if __name__ == "__main__":